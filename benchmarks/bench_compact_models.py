@@ -0,0 +1,73 @@
+"""
+Artifact size, load time and predict latency of the compact flat-array
+forests versus the pickled sklearn forests, and a check that predictions
+are identical.
+
+Usage:
+    python benchmarks/bench_compact_models.py
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(project_dir, 'code'))
+
+from model_store import (  # noqa: E402
+    artifact_path, compact_path, load_artifact, load_compact_artifact, load_or_train,
+)
+from prediction_model import apply_transfer_impacts, load_features, predict_raw, prediction_data  # noqa: E402
+from scenarios import evaluate_scenarios, grid_scenarios  # noqa: E402
+
+
+def folder_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+def best_of(repeats, func, *args):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(*args)
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    df = load_features()
+    data_hash = load_or_train(df)['data_hash']
+    load_or_train(df, compact=True)
+
+    prediction_df = apply_transfer_impacts(prediction_data(df), {})
+    teams = prediction_df['Team'].tolist()
+    _, grid = grid_scenarios(teams, np.arange(-10, 11))
+
+    rows = []
+    for label, path, loader in [('sklearn pickle', artifact_path(data_hash), load_artifact),
+                                ('compact arrays', compact_path(data_hash), load_compact_artifact)]:
+        artifact, load_seconds = best_of(args.repeats, loader, data_hash)
+        table, table_seconds = best_of(args.repeats, predict_raw, artifact['models'], prediction_df)
+        sweep, sweep_seconds = best_of(args.repeats, evaluate_scenarios, artifact, prediction_df, grid)
+        rows.append((label, folder_size(path) / 1e6, load_seconds, table_seconds, sweep_seconds, table, sweep))
+
+    print(f"{'':>15} {'size (MB)':>10} {'load (s)':>9} {'20-team predict (ms)':>21} {f'{len(grid)} scenarios (s)':>17}")
+    for label, size, load_seconds, table_seconds, sweep_seconds, _, _ in rows:
+        print(f"{label:>15} {size:>10.1f} {load_seconds:>9.3f} {table_seconds * 1000:>21.1f} {sweep_seconds:>17.3f}")
+
+    identical = all(np.array_equal(rows[0][5][k], rows[1][5][k]) and np.array_equal(rows[0][6][k], rows[1][6][k])
+                    for k in rows[0][5])
+    print(f"\nIdentical predictions: {identical}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Compares the original serial loader from 01_data_preprocessing.py with
+match_loader.load_matches() on 5, 50 and 500 season files.
+
+Season files are made by cycling through the committed raw CSVs (with all of
+their bookmaker columns) into a temporary folder.
+
+Usage:
+    python benchmarks/bench_loader.py
+    python benchmarks/bench_loader.py --files 5 50 --workers 8
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from itertools import cycle, islice
+
+import pandas as pd
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(project_dir, 'code'))
+
+from match_loader import iter_match_chunks, load_matches  # noqa: E402
+
+
+def legacy_load_data(folder_path, league_name):
+    """
+    The original load_data() from 01_data_preprocessing.py, kept for comparison.
+    """
+    all_files = [os.path.join(folder_path, f) for f in os.listdir(folder_path) if f.endswith('.csv')]
+    all_data = []
+    for file in all_files:
+        df = pd.read_csv(file, encoding='latin1')
+        df['League'] = league_name
+        all_data.append(df)
+    combined_df = pd.concat(all_data, ignore_index=True)
+    return combined_df.dropna(axis=1, how='all')
+
+
+def make_season_files(folder, n_files):
+    raw_files = []
+    for league_folder in ('premier_league', 'championship'):
+        league_dir = os.path.join(project_dir, 'data', league_folder)
+        raw_files += sorted(os.path.join(league_dir, f) for f in os.listdir(league_dir) if f.endswith('.csv'))
+    for i, path in enumerate(islice(cycle(raw_files), n_files)):
+        shutil.copy(path, os.path.join(folder, f'season-{i:04d}.csv'))
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, nargs='+', default=[5, 50, 500])
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    print(f"{'files':>6} {'rows':>8} {'legacy (s)':>11} {'legacy MB':>10} {'threads (s)':>12} "
+          f"{'processes (s)':>14} {'new MB':>8} {'streamed (s)':>13}")
+    for n_files in args.files:
+        with tempfile.TemporaryDirectory() as folder:
+            make_season_files(folder, n_files)
+            sources = [(folder, 'League')]
+
+            legacy, legacy_time = timed(legacy_load_data, folder, 'League')
+            new, thread_time = timed(load_matches, sources, workers=args.workers)
+            _, process_time = timed(load_matches, sources, workers=args.workers, use_processes=True)
+            _, stream_time = timed(lambda: sum(len(chunk) for chunk in iter_match_chunks(sources, chunksize=50_000)))
+
+            print(f"{n_files:>6} {len(new):>8} {legacy_time:>11.3f} {legacy.memory_usage(deep=True).sum() / 1e6:>10.1f} "
+                  f"{thread_time:>12.3f} {process_time:>14.3f} {new.memory_usage(deep=True).sum() / 1e6:>8.1f} "
+                  f"{stream_time:>13.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Fit time, predict latency, model size and peak resident memory of the
+three-forest setup versus a single multi-output forest.
+
+Each mode runs in its own subprocess so peak RSS is measured independently.
+
+Usage:
+    python benchmarks/bench_model_modes.py
+"""
+import argparse
+import json
+import os
+import pickle
+import resource
+import subprocess
+import sys
+import time
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(project_dir, 'code'))
+
+MODES = [('separate', False), ('multi_output', False), ('multi_output', True)]
+
+
+def measure(mode, consistent, repeats):
+    from prediction_model import apply_transfer_impacts, load_features, predict_raw, prediction_data, train_models, training_data
+
+    df = load_features()
+    train_data = training_data(df)
+    prediction_df = apply_transfer_impacts(prediction_data(df), {})
+
+    start = time.perf_counter()
+    models = train_models(train_data, mode=mode, consistent=consistent)
+    fit_seconds = time.perf_counter() - start
+
+    predict_raw(models, prediction_df)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        predict_raw(models, prediction_df)
+    predict_ms = (time.perf_counter() - start) / repeats * 1000
+
+    return {
+        'mode': mode + (' (consistent)' if consistent else ''),
+        'fit_s': fit_seconds,
+        'predict_ms': predict_ms,
+        'pickle_mb': len(pickle.dumps(models, protocol=5)) / 1e6,
+        # ru_maxrss is in kilobytes on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=20, help='Predict calls to average latency over')
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'CONSISTENT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child[0], args.child[1] == '1', args.repeats)))
+        return
+
+    print(f"{'mode':>26} {'fit (s)':>8} {'predict (ms)':>13} {'pickle (MB)':>12} {'peak RSS (MB)':>14}")
+    for mode, consistent in MODES:
+        output = subprocess.run(
+            [sys.executable, __file__, '--repeats', str(args.repeats), '--child', mode, str(int(consistent))],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        r = json.loads(output.strip().splitlines()[-1])
+        print(f"{r['mode']:>26} {r['fit_s']:>8.2f} {r['predict_ms']:>13.1f} {r['pickle_mb']:>12.1f} {r['peak_rss_mb']:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""
+Benchmark suite for the pipeline stages at increasing data sizes.
+
+For each scale, synthetic leagues of about that many times the committed data
+are generated (see synthetic_data.py), then the real 01 and 02 scripts run on
+them (EPL_DATA_DIR), followed by fitting the three Random Forests and
+predicting every team-season. Wall time, CPU time and peak RSS of each stage
+come from the profiling records (profiling.py), so `--steps` also breaks
+01/02 down per step.
+
+Results are compared with benchmarks/baseline.json: a stage more than
+--time-tolerance slower or --memory-tolerance larger than its baseline is
+reported as a regression and the suite exits with status 1. Baselines are
+machine-specific; re-record them with --save-baseline after an intended change
+or on new hardware.
+
+Usage:
+    python benchmarks/bench_pipeline.py                         # scales 1 10 100, compared with the baseline
+    python benchmarks/bench_pipeline.py --scales 1 10 --steps
+    python benchmarks/bench_pipeline.py --save-baseline
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(project_dir, 'code'))
+
+from profiling import SCRIPT_STEP  # noqa: E402
+from synthetic_data import make_league_files, scale_shape  # noqa: E402
+
+BASELINE_PATH = os.path.join(script_dir, 'baseline.json')
+
+# Stage -> command; the model stage runs this file again in model-stage mode
+STAGES = {
+    'preprocess': [os.path.join(project_dir, 'code', '01_data_preprocessing.py')],
+    'features': [os.path.join(project_dir, 'code', '02_feature_engineering.py')],
+    'train': [os.path.abspath(__file__), '--model-stage'],
+}
+
+N_ESTIMATORS = 100  # Trees per forest; the pipeline's 1000 would make the large scales dominate the run time
+TIME_TOLERANCE = 0.5
+MEMORY_TOLERANCE = 0.25
+MIN_SECONDS = 0.05  # Differences below this are noise, whatever the ratio
+
+
+def model_stage(n_estimators):
+    """
+    Fits the forests on the current EPL_DATA_DIR features and predicts every team-season (run in its own process).
+    """
+    from prediction_model import FEATURES, load_features, predict_raw, train_models, training_data
+    from profiling import step
+
+    df = load_features()
+    train_data = training_data(df)
+    with step('fit all', rows=len(train_data)):
+        models = train_models(train_data, n_estimators=n_estimators)
+    with step('predict all', rows=len(df)):
+        predict_raw(models, df, FEATURES)
+
+
+def run_stage(stage, data_dir, profile_log, n_estimators):
+    """
+    Runs one stage with profiling on; returns its profiling records.
+    """
+    start = os.path.getsize(profile_log) if os.path.exists(profile_log) else 0
+    env = {**os.environ, 'EPL_DATA_DIR': data_dir, 'EPL_PROFILE': profile_log, 'EPL_STORAGE_FORMAT': 'csv',
+           'PYTHONWARNINGS': 'ignore::FutureWarning'}
+    env.pop('EPL_PROFILE_CPROFILE', None)
+    command = [sys.executable] + STAGES[stage] + (['--n-estimators', str(n_estimators)] if stage == 'train' else [])
+    subprocess.run(command, cwd=project_dir, env=env, check=True, stdout=subprocess.DEVNULL)
+    with open(profile_log) as f:
+        f.seek(start)
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def stage_result(records):
+    """
+    Stage totals from its '(script)' record; the model stage is split into its fit and predict steps.
+    """
+    total = next(r for r in records if r['step'] == SCRIPT_STEP)
+    steps = {r['step']: r for r in records if r['step'] != SCRIPT_STEP}
+    result = {'wall_s': total['wall_s'], 'cpu_s': total['cpu_s'], 'peak_rss_mb': total['process_peak_rss_mb']}
+    if 'fit all' in steps:
+        return {
+            'train': {'wall_s': steps['fit all']['wall_s'], 'cpu_s': steps['fit all']['cpu_s'],
+                      'peak_rss_mb': total['process_peak_rss_mb']},
+            'predict': {'wall_s': steps['predict all']['wall_s'], 'cpu_s': steps['predict all']['cpu_s'],
+                        'peak_rss_mb': total['process_peak_rss_mb']},
+        }, steps
+    return result, steps
+
+
+def run_scale(scale, n_estimators, seed=0):
+    teams, seasons = scale_shape(scale)
+    results, steps = {}, {}
+    with tempfile.TemporaryDirectory() as data_dir:
+        start = time.perf_counter()
+        n_matches = make_league_files(data_dir, teams, seasons, seed=seed)
+        generated = time.perf_counter() - start
+        profile_log = os.path.join(data_dir, 'profile.jsonl')
+        for stage in STAGES:
+            result, stage_steps = stage_result(run_stage(stage, data_dir, profile_log, n_estimators))
+            results.update(result if stage == 'train' else {stage: result})
+            steps[stage] = stage_steps
+    print(f"\nScale {scale:g}: {n_matches:,} matches ({teams} teams, {seasons} seasons), generated in {generated:.1f} s")
+    return results, steps
+
+
+def compare(scale, results, baseline, time_tolerance, memory_tolerance):
+    """
+    Prints one line per stage with the change against the baseline; returns the regressed stages.
+    """
+    regressions = []
+    print(f"{'stage':<12} {'wall s':>8} {'cpu s':>8} {'peak MB':>8} {'base s':>8} {'base MB':>8}  status")
+    for stage, result in results.items():
+        base = baseline.get(str(scale), {}).get(stage)
+        status, base_time, base_memory = 'no baseline', '', ''
+        if base:
+            base_time, base_memory = f"{base['wall_s']:.3f}", f"{base['peak_rss_mb']:.1f}"
+            slower = result['wall_s'] > base['wall_s'] * (1 + time_tolerance) + MIN_SECONDS
+            larger = result['peak_rss_mb'] > base['peak_rss_mb'] * (1 + memory_tolerance)
+            status = 'ok'
+            if slower or larger:
+                status = 'REGRESSION (' + ', '.join(['time'] * slower + ['memory'] * larger) + ')'
+                regressions.append((scale, stage))
+        print(f"{stage:<12} {result['wall_s']:>8.3f} {result['cpu_s']:>8.3f} {result['peak_rss_mb']:>8.1f} "
+              f"{base_time:>8} {base_memory:>8}  {status}")
+    return regressions
+
+
+def print_steps(steps):
+    for stage, stage_steps in steps.items():
+        for name, record in stage_steps.items():
+            rows = '' if record['rows'] is None else f"{record['rows']:,}"
+            print(f"    {stage:<12} {name:<32} {record['wall_s']:>8.3f} s {rows:>12} rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10, 100],
+                        help='Data sizes as multiples of the committed data')
+    parser.add_argument('--n-estimators', type=int, default=N_ESTIMATORS)
+    parser.add_argument('--steps', action='store_true', help='Also print the per-step breakdown of each stage')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='Record these results as the new baseline')
+    parser.add_argument('--time-tolerance', type=float, default=TIME_TOLERANCE)
+    parser.add_argument('--memory-tolerance', type=float, default=MEMORY_TOLERANCE)
+    parser.add_argument('--model-stage', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.model_stage:
+        model_stage(args.n_estimators)
+        return
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            saved = json.load(f)
+        if saved.get('n_estimators') == args.n_estimators:
+            baseline = saved['results']
+        else:
+            print(f"Baseline was recorded with --n-estimators {saved.get('n_estimators')}; not comparing")
+
+    all_results, regressions = {}, []
+    for scale in args.scales:
+        results, steps = run_scale(scale, args.n_estimators)
+        all_results[f'{scale:g}'] = results
+        regressions += compare(f'{scale:g}', results, baseline, args.time_tolerance, args.memory_tolerance)
+        if args.steps:
+            print_steps(steps)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'machine': {'platform': platform.platform(), 'python': platform.python_version(),
+                                   'cpus': os.cpu_count()},
+                       'n_estimators': args.n_estimators, 'results': all_results}, f, indent=2)
+        print(f"\nBaseline saved to `{args.baseline}`")
+    elif regressions:
+        print(f"\n{len(regressions)} regression(s): " + ', '.join(f'{stage} at scale {scale}' for scale, stage in regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
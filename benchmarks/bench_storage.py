@@ -0,0 +1,54 @@
+"""
+Load time and memory of combined_data in CSV vs the typed columnar formats.
+
+The committed combined_data.csv is repeated --copies times to approximate a
+multi-decade archive, then each format is written to a temp directory and read
+back in full and with the column projection used by feature engineering.
+
+Usage:
+    python benchmarks/bench_storage.py --copies 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(project_dir, 'code'))
+
+import storage  # noqa: E402
+from team_stats import MATCH_COLUMNS  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--copies', type=int, default=20)
+    args = parser.parse_args()
+
+    base = pd.read_csv(os.path.join(storage.data_dir, 'combined_data.csv'))
+    df = pd.concat([base] * args.copies, ignore_index=True)
+    print(f"{len(df)} matches x {df.shape[1]} columns\n")
+    print(f"{'format':>8} {'file (MB)':>10} {'full load (s)':>14} {'full mem (MB)':>14} "
+          f"{'projected load (s)':>19} {'projected mem (MB)':>19}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.data_dir = tmp
+        for fmt in storage.FORMATS:
+            os.environ['EPL_STORAGE_FORMAT'] = fmt
+            path = storage.write_table(df, 'combined_data')
+            results = []
+            for columns in (None, MATCH_COLUMNS):
+                start = time.perf_counter()
+                loaded = storage.read_table('combined_data', columns=columns)
+                elapsed = time.perf_counter() - start
+                results += [elapsed, loaded.memory_usage(deep=True).sum() / 1e6]
+            print(f"{fmt:>8} {os.path.getsize(path) / 1e6:>10.1f} {results[0]:>14.3f} {results[1]:>14.1f} "
+                  f"{results[2]:>19.3f} {results[3]:>19.1f}")
+
+
+if __name__ == '__main__':
+    main()
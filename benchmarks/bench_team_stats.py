@@ -0,0 +1,95 @@
+"""
+Scaling benchmark for the team/season aggregation in 02_feature_engineering.py.
+
+Builds synthetic leagues of 10k to 1M matches and times the vectorized
+aggregation engine against the original season x team loop (the loop is
+only run up to --legacy-max matches, since it is quadratic).
+
+Usage:
+    python benchmarks/bench_team_stats.py
+    python benchmarks/bench_team_stats.py --sizes 10000 100000 --legacy-max 100000
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(project_dir, 'code'))
+
+from synthetic_data import make_matches  # noqa: E402
+from team_stats import aggregate_team_seasons, add_season_column  # noqa: E402
+
+
+def get_match_points(row, team):
+    if row['HomeTeam'] == team:
+        if row['FTR'] == 'H': return 3
+        if row['FTR'] == 'D': return 1
+    elif row['AwayTeam'] == team:
+        if row['FTR'] == 'A': return 3
+        if row['FTR'] == 'D': return 1
+    return 0
+
+
+def legacy_aggregate_team_seasons(df):
+    """
+    The original Step 4 loop from 02_feature_engineering.py, kept for comparison.
+    """
+    engineered_df = pd.DataFrame()
+    all_teams = pd.unique(df['HomeTeam'])
+    for season in df['Season'].unique():
+        for team in all_teams:
+            team_games = df[(df['Season'] == season) & ((df['HomeTeam'] == team) | (df['AwayTeam'] == team))].sort_values(by='Date')
+            if not team_games.empty:
+                stats = {
+                    'Team': team,
+                    'Season': season,
+                    'League': team_games['League'].iloc[0],
+                    'Games Played': len(team_games),
+                }
+                home_games = team_games[team_games['HomeTeam'] == team]
+                away_games = team_games[team_games['AwayTeam'] == team]
+                stats['Wins'] = (home_games['FTR'] == 'H').sum() + (away_games['FTR'] == 'A').sum()
+                stats['Draws'] = (home_games['FTR'] == 'D').sum() + (away_games['FTR'] == 'D').sum()
+                stats['Losses'] = (home_games['FTR'] == 'A').sum() + (away_games['FTR'] == 'H').sum()
+                stats['Goals Scored'] = home_games['FTHG'].sum() + away_games['FTAG'].sum()
+                stats['Goals Conceded'] = home_games['FTAG'].sum() + away_games['FTHG'].sum()
+                stats['Points'] = (stats['Wins'] * 3) + stats['Draws']
+                stats['Goal Difference'] = stats['Goals Scored'] - stats['Goals Conceded']
+                last_10_games = team_games.tail(10)
+                stats['Form Points Last 10'] = last_10_games.apply(lambda row: get_match_points(row, team), axis=1).sum()
+                engineered_df = pd.concat([engineered_df, pd.DataFrame([stats])], ignore_index=True)
+    return engineered_df
+
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--legacy-max', type=int, default=20_000,
+                        help='Largest match count to also run the original loop on')
+    args = parser.parse_args()
+
+    print(f"{'matches':>10} {'team-seasons':>13} {'vectorized (s)':>15} {'legacy (s)':>11} {'identical':>10}")
+    for size in args.sizes:
+        df = add_season_column(make_matches(size))
+        result, vectorized_time = time_call(aggregate_team_seasons, df)
+
+        legacy_time, identical = float('nan'), '-'
+        if len(df) <= args.legacy_max:
+            legacy, legacy_time = time_call(legacy_aggregate_team_seasons, df)
+            identical = legacy.to_csv(index=False) == result.to_csv(index=False)
+
+        print(f"{len(df):>10} {len(result):>13} {vectorized_time:>15.3f} {legacy_time:>11.3f} {str(identical):>10}")
+
+
+if __name__ == '__main__':
+    main()
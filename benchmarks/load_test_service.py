@@ -0,0 +1,120 @@
+"""
+Load test for code/prediction_service.py.
+
+Opens `--concurrency` keep-alive connections and sends `--requests` POST /predict
+requests in total, each with random transfer impacts for every team; a
+`--repeat` fraction reuses earlier vectors so the cache is exercised. Reports
+p50/p99 latency and requests per second.
+
+Usage:
+    python benchmarks/load_test_service.py --spawn                   # start a service, test it, stop it
+    python benchmarks/load_test_service.py --port 8000 --requests 5000 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(project_dir, 'code'))
+
+from prediction_model import PL_25_26_TEAMS  # noqa: E402
+
+
+async def request(reader, writer, host, body):
+    writer.write((f"POST /predict HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                  f"Content-Length: {len(body)}\r\n\r\n").encode() + body)
+    await writer.drain()
+    status = await reader.readline()
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    if b' 200 ' not in status:
+        raise RuntimeError(f"Unexpected response: {status!r}")
+
+
+async def client(host, port, bodies, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for body in bodies:
+            start = time.perf_counter()
+            await request(reader, writer, host, body)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+def make_bodies(n_requests, repeat, seed):
+    rng = np.random.default_rng(seed)
+    vectors = rng.integers(-10, 11, size=(n_requests, len(PL_25_26_TEAMS)))
+    reuse = np.flatnonzero(rng.random(n_requests) < repeat)
+    reuse = reuse[reuse > 0]
+    vectors[reuse] = vectors[rng.integers(0, reuse)]
+    return [json.dumps({'transfer_impacts': dict(zip(PL_25_26_TEAMS, map(int, v)))}).encode() for v in vectors]
+
+
+async def run_load(host, port, n_requests, concurrency, repeat, seed):
+    bodies = make_bodies(n_requests, repeat, seed)
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, bodies[i::concurrency], latencies) for i in range(concurrency)))
+    return np.array(latencies), time.perf_counter() - start
+
+
+async def wait_until_up(host, port, timeout=120):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise TimeoutError(f"Service on {host}:{port} did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--repeat', type=float, default=0.2, help='Fraction of requests repeating an earlier vector')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--spawn', action='store_true', help='Start the service for the test and stop it afterwards')
+    parser.add_argument('--compact', action='store_true', help='With --spawn, serve from the compact forests')
+    args = parser.parse_args()
+
+    service = None
+    if args.spawn:
+        command = [sys.executable, os.path.join(project_dir, 'code', 'prediction_service.py'),
+                   '--host', args.host, '--port', str(args.port)] + (['--compact'] if args.compact else [])
+        service = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    try:
+        asyncio.run(wait_until_up(args.host, args.port))
+        latencies, elapsed = asyncio.run(run_load(args.host, args.port, args.requests, args.concurrency,
+                                                  args.repeat, args.seed))
+    finally:
+        if service is not None:
+            service.terminate()
+            service.wait()
+
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"{len(latencies)} requests, {args.concurrency} connections, {args.repeat:.0%} repeated vectors")
+    print(f"p50 {p50:.1f} ms   p99 {p99:.1f} ms   {len(latencies) / elapsed:.0f} requests/s")
+
+
+if __name__ == '__main__':
+    main()
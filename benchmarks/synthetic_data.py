@@ -0,0 +1,316 @@
+"""
+Synthetic football-data.co.uk season files for scaling tests.
+
+Builds a league pyramid of any number of tiers, teams and seasons and writes
+one CSV per league and season with the same columns as the committed raw
+files (results, half-time scores, match stats and every bookmaker's opening
+and closing odds), plus data/xg_team_seasons.csv-style xG. Goals are Poisson
+with drifting team attack/defence strengths, the bottom three of each tier
+swap places with the top three of the tier below after every season, and
+odds are priced from the same scoring rates with a margin per bookmaker.
+
+Tier 0 is written to premier_league/ as 'Premier League', tier 1 to
+championship/ as 'Championship' and lower tiers to league_<n>/, so the
+output directory can stand in for data/ (EPL_DATA_DIR=<dir>). The last
+season is 2024/2025, the season the models predict from.
+
+Usage:
+    python benchmarks/synthetic_data.py /tmp/synthetic --tiers 2 --teams 20 24 --seasons 5
+    python benchmarks/synthetic_data.py /tmp/synthetic --scale 10
+"""
+import argparse
+import math
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_dir = os.path.dirname(script_dir)
+sys.path.insert(0, os.path.join(project_dir, 'code'))
+
+from odds_features import HANDICAP_COLUMNS, MARKETS  # noqa: E402
+
+TEAMS_PER_LEAGUE = 20
+
+# The synthetic files copy the columns of the latest real season file
+HEADER_TEMPLATE = os.path.join(project_dir, 'data', 'premier_league', 'prem-2425.csv')
+
+LAST_SEASON_START = 2024  # 2024/2025
+SEASON_DAYS = (pd.Timestamp('2000-08-10'), pd.Timestamp('2001-05-20'))  # First and last matchday
+KICK_OFF_TIMES = np.array(['12:30', '15:00', '17:30', '19:45', '20:00'])
+REFEREES = np.array(['A Taylor', 'M Oliver', 'C Kavanagh', 'S Hooper', 'J Brooks', 'P Tierney', 'R Jones', 'D Coote'])
+SWAPS = 3  # Teams promoted and relegated between adjacent tiers
+MAX_GOALS = 10
+
+# Base scoring rates (log) for home and away sides; strengths drift by STRENGTH_DRIFT per season
+HOME_RATE, AWAY_RATE = math.log(1.5), math.log(1.2)
+STRENGTH_SPREAD, STRENGTH_DRIFT, TIER_GAP = 0.25, 0.08, 0.15
+
+
+def round_robin(n_teams):
+    """
+    Double round-robin fixtures for `n_teams` (even) via the circle method.
+    Returns (home, away, round) arrays with every team playing once per round.
+    """
+    rotation = np.arange(1, n_teams)
+    home, away, rounds = [], [], []
+    for r in range(n_teams - 1):
+        order = np.concatenate([[0], np.roll(rotation, r)])
+        first, second = order[:n_teams // 2], order[::-1][:n_teams // 2]
+        home += [first, second]
+        away += [second, first]
+        rounds += [np.full(n_teams // 2, r), np.full(n_teams // 2, r + n_teams - 1)]
+    return np.concatenate(home), np.concatenate(away), np.concatenate(rounds)
+
+
+def make_matches(n_matches, teams_per_league=TEAMS_PER_LEAGUE, seed=0):
+    """
+    Generates at least `n_matches` double round-robin matches (Date, teams, score, FTR and League only),
+    spread over as many league-seasons as needed (one round per week from August).
+    """
+    rng = np.random.default_rng(seed)
+    home, away, rounds = round_robin(teams_per_league)
+    per_season = len(home)
+    n_league_seasons = -(-n_matches // per_season)
+    n_leagues = max(1, int(np.sqrt(n_league_seasons / 5)))
+    n_seasons = -(-n_league_seasons // n_leagues)
+
+    league_ids = np.repeat(np.arange(n_leagues), n_seasons * per_season)
+    season_ids = np.tile(np.repeat(np.arange(n_seasons), per_season), n_leagues)
+    home_ids = np.tile(home, n_leagues * n_seasons) + league_ids * teams_per_league
+    away_ids = np.tile(away, n_leagues * n_seasons) + league_ids * teams_per_league
+
+    season_start = pd.to_datetime(season_ids + 1990, format='%Y') + pd.Timedelta(days=220)
+    dates = season_start + pd.to_timedelta(np.tile(rounds, n_leagues * n_seasons) * 7, unit='D')
+
+    fthg = rng.poisson(1.5, len(home_ids))
+    ftag = rng.poisson(1.2, len(home_ids))
+    ftr = np.where(fthg > ftag, 'H', np.where(fthg < ftag, 'A', 'D'))
+    team_names = np.array([f'Team {i}' for i in range(n_leagues * teams_per_league)], dtype=object)
+
+    df = pd.DataFrame({
+        'Date': dates.strftime('%d/%m/%Y'),
+        'HomeTeam': team_names[home_ids],
+        'AwayTeam': team_names[away_ids],
+        'FTHG': fthg,
+        'FTAG': ftag,
+        'FTR': ftr,
+        'League': np.array([f'League {i}' for i in range(n_leagues)], dtype=object)[league_ids],
+    })
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def scale_shape(scale):
+    """
+    Tier sizes and season count for roughly `scale` times the committed data
+    (20- and 24-team tiers over 5 seasons): seasons grow with sqrt(scale), tier sizes with scale ** 0.25.
+    """
+    seasons = max(1, round(5 * math.sqrt(scale)))
+    teams = [2 * max(3, round(n * scale ** 0.25 / 2)) for n in (20, 24)]
+    return teams, seasons
+
+
+def tier_folder(tier):
+    return {0: 'premier_league', 1: 'championship'}.get(tier, f'league_{tier}')
+
+
+def tier_league(tier):
+    return {0: 'Premier League', 1: 'Championship'}.get(tier, f'League {tier}')
+
+
+def outcome_probabilities(home_rate, away_rate, handicap):
+    """
+    Home/draw/away, over 2.5 goals and Asian handicap home-cover probabilities for Poisson scoring rates.
+    """
+    goals = np.arange(MAX_GOALS + 1)
+    log_factorial = np.array([math.lgamma(k + 1) for k in goals])
+    home = np.exp(goals * np.log(home_rate)[:, None] - home_rate[:, None] - log_factorial)
+    away = np.exp(goals * np.log(away_rate)[:, None] - away_rate[:, None] - log_factorial)
+    scores = home[:, :, None] * away[:, None, :]  # (matches, home goals, away goals)
+    margin = goals[:, None] - goals[None, :]
+    total = goals[:, None] + goals[None, :]
+    win, draw, loss = (scores * (margin > 0)).sum((1, 2)), (scores * (margin == 0)).sum((1, 2)), (scores * (margin < 0)).sum((1, 2))
+    over = (scores * (total > 2)).sum((1, 2))
+    adjusted = margin[None] + handicap[:, None, None]
+    cover = (scores * (adjusted > 0)).sum((1, 2)) + 0.5 * (scores * (adjusted == 0)).sum((1, 2))
+    return {'1x2': np.stack([win, draw, loss], axis=1), 'over_under': np.stack([over, 1 - over], axis=1),
+            'asian_handicap': np.stack([cover, 1 - cover], axis=1)}
+
+
+def bookmakers(header, market):
+    """
+    (opening, closing) prefixes with a full set of `market` odds in `header`, including the
+    best-price 'Max' columns that odds_features.find_books() leaves out of the consensus.
+    """
+    suffixes = MARKETS[market]
+    prefixes = {column[:-len(suffixes[0])] for column in header if column.endswith(suffixes[0])}
+    prefixes = sorted(p for p in prefixes if p and all(p + suffix in header for suffix in suffixes)
+                      and not (market == '1x2' and p.endswith('AH')))
+    closing = [p for p in prefixes if p.endswith('C') and p[:-1] in prefixes]
+    return [p for p in prefixes if p not in closing], closing
+
+
+def price_odds(header, rates, rng):
+    """
+    Every bookmaker odds column of `header` plus the handicap lines, for (home_rate, away_rate) opening
+    and closing scoring rates. Each bookmaker has its own margin and noise; 'Max' prices carry no margin.
+    """
+    columns = {}
+    for stage, (home_rate, away_rate) in rates.items():
+        handicap = np.round(-(home_rate - away_rate) * 4) / 4
+        if HANDICAP_COLUMNS[stage] in header:
+            columns[HANDICAP_COLUMNS[stage]] = handicap
+        probabilities = outcome_probabilities(home_rate, away_rate, handicap)
+        for market, suffixes in MARKETS.items():
+            for prefix in bookmakers(header, market)[stage == 'closing']:
+                margin = 0.0 if prefix.startswith('Max') else rng.uniform(0.02, 0.08)
+                noise = np.exp(rng.normal(0, 0.02, probabilities[market].shape))
+                odds = 1 / (np.maximum(probabilities[market], 0.001) * noise * (1 + margin))
+                for i, suffix in enumerate(suffixes):
+                    columns[prefix + suffix] = np.maximum(np.round(odds[:, i], 2), 1.01)
+    return columns
+
+
+def season_matches(tier_teams, attack, defence, start_year, header, rng):
+    """
+    One season of every tier as a football-data frame per tier.
+    """
+    frames = []
+    first_day, last_day = SEASON_DAYS
+    season_start = pd.Timestamp(year=start_year, month=first_day.month, day=first_day.day)
+    for tier, teams in enumerate(tier_teams):
+        home, away, rounds = round_robin(len(teams))
+        home, away = teams[home], teams[away]
+        n_rounds = rounds.max() + 1
+        day = rounds * (last_day - first_day).days // max(n_rounds - 1, 1)
+        dates = season_start + pd.to_timedelta(day, unit='D')
+
+        home_rate = np.exp(HOME_RATE + attack[home] - defence[away])
+        away_rate = np.exp(AWAY_RATE + attack[away] - defence[home])
+        fthg, ftag = rng.poisson(home_rate), rng.poisson(away_rate)
+        hthg, htag = rng.binomial(fthg, 0.45), rng.binomial(ftag, 0.45)
+        hs, as_ = rng.poisson(4 * home_rate + 6), rng.poisson(4 * away_rate + 6)
+        hst, ast = np.maximum(rng.binomial(hs, 0.35), fthg), np.maximum(rng.binomial(as_, 0.35), ftag)
+        hs, as_ = np.maximum(hs, hst), np.maximum(as_, ast)
+
+        # Closing rates move towards the realised strengths a little
+        drift = np.exp(rng.normal(0, 0.05, (2, len(home))))
+        rates = {'opening': (home_rate, away_rate), 'closing': (home_rate * drift[0], away_rate * drift[1])}
+        n = len(home)
+        columns = {
+            'Div': f'E{tier}',
+            'Date': dates.strftime('%d/%m/%Y'),
+            'Time': rng.choice(KICK_OFF_TIMES, n),
+            'HomeTeam': home, 'AwayTeam': away,
+            'FTHG': fthg, 'FTAG': ftag, 'FTR': np.where(fthg > ftag, 'H', np.where(fthg < ftag, 'A', 'D')),
+            'HTHG': hthg, 'HTAG': htag, 'HTR': np.where(hthg > htag, 'H', np.where(hthg < htag, 'A', 'D')),
+            'Referee': rng.choice(REFEREES, n),
+            'HS': hs, 'AS': as_, 'HST': hst, 'AST': ast,
+            'HF': rng.poisson(11, n), 'AF': rng.poisson(11, n),
+            'HC': rng.poisson(5.5, n), 'AC': rng.poisson(4.5, n),
+            'HY': rng.poisson(1.7, n), 'AY': rng.poisson(1.9, n),
+            'HR': rng.poisson(0.06, n), 'AR': rng.poisson(0.07, n),
+            **price_odds(header, rates, rng),
+        }
+        frames.append(pd.DataFrame(columns).reindex(columns=header))
+    return frames
+
+
+def promote_and_relegate(tier_teams, frames):
+    """
+    Swaps the bottom SWAPS of each tier with the top SWAPS of the tier below, ranked by points then goal difference.
+    """
+    ranked = []
+    for teams, df in zip(tier_teams, frames):
+        points = pd.Series(0, index=teams)
+        goal_difference = pd.Series(0, index=teams)
+        home_points = np.select([df['FTR'] == 'H', df['FTR'] == 'D'], [3, 1], 0)
+        away_points = np.select([df['FTR'] == 'A', df['FTR'] == 'D'], [3, 1], 0)
+        points = points.add(pd.Series(home_points).groupby(df['HomeTeam'].to_numpy()).sum(), fill_value=0)
+        points = points.add(pd.Series(away_points).groupby(df['AwayTeam'].to_numpy()).sum(), fill_value=0)
+        margin = (df['FTHG'] - df['FTAG']).to_numpy()
+        goal_difference = goal_difference.add(pd.Series(margin).groupby(df['HomeTeam'].to_numpy()).sum(), fill_value=0)
+        goal_difference = goal_difference.add(pd.Series(-margin).groupby(df['AwayTeam'].to_numpy()).sum(), fill_value=0)
+        order = np.lexsort((-goal_difference[teams].to_numpy(), -points[teams].to_numpy()))
+        ranked.append(teams[order])
+    swaps = min(SWAPS, min(len(teams) for teams in tier_teams) // 2)
+    new_tiers = [teams.copy() for teams in ranked]
+    for tier in range(len(ranked) - 1):
+        new_tiers[tier][-swaps:] = ranked[tier + 1][:swaps]
+        new_tiers[tier + 1][:swaps] = ranked[tier][-swaps:]
+    return new_tiers
+
+
+def make_league_files(out_dir, teams_per_tier=(20, 24), n_seasons=5, seed=0):
+    """
+    Writes `n_seasons` seasons (ending in 2024/2025) of a pyramid with one tier per entry of
+    `teams_per_tier` (even sizes) to out_dir, plus xg_team_seasons.csv. Returns the number of matches.
+    """
+    if any(n % 2 or n < 2 for n in teams_per_tier):
+        raise ValueError(f"Tier sizes must be even and at least 2, got {list(teams_per_tier)}")
+    rng = np.random.default_rng(seed)
+    with open(HEADER_TEMPLATE, encoding='utf-8-sig') as f:
+        header = f.readline().strip().split(',')
+
+    n_teams = sum(teams_per_tier)
+    width = len(str(n_teams))
+    names = np.array([f'Team {i:0{width}d}' for i in range(n_teams)], dtype=object)
+    bounds = np.cumsum([0, *teams_per_tier])
+    tier_teams = [np.arange(bounds[t], bounds[t + 1]) for t in range(len(teams_per_tier))]
+    tier_of_team = np.repeat(np.arange(len(teams_per_tier)), teams_per_tier)
+    attack = rng.normal(0, STRENGTH_SPREAD, n_teams) - TIER_GAP * tier_of_team
+    defence = rng.normal(0, STRENGTH_SPREAD, n_teams) - TIER_GAP * tier_of_team
+
+    for tier in range(len(teams_per_tier)):
+        os.makedirs(os.path.join(out_dir, tier_folder(tier)), exist_ok=True)
+
+    n_matches, xg_rows = 0, []
+    for start_year in range(LAST_SEASON_START - n_seasons + 1, LAST_SEASON_START + 1):
+        frames = season_matches(tier_teams, attack, defence, start_year, header, rng)
+        for tier, df in enumerate(frames):
+            # xG: the scoring rates the goals were drawn from, plus noise, summed per team
+            home_ids, away_ids = df['HomeTeam'].to_numpy(dtype=int), df['AwayTeam'].to_numpy(dtype=int)
+            home_xg = np.exp(HOME_RATE + attack[home_ids] - defence[away_ids] + rng.normal(0, 0.2, len(df)))
+            away_xg = np.exp(AWAY_RATE + attack[away_ids] - defence[home_ids] + rng.normal(0, 0.2, len(df)))
+            xg = np.bincount(home_ids, home_xg, n_teams) + np.bincount(away_ids, away_xg, n_teams)
+            xga = np.bincount(home_ids, away_xg, n_teams) + np.bincount(away_ids, home_xg, n_teams)
+            for team in tier_teams[tier]:
+                xg_rows.append((names[team], f'{start_year}/{start_year + 1}', round(xg[team], 1), round(xga[team], 1)))
+
+            folder = tier_folder(tier)
+            # Four-digit start years, so the loader's name order is season order across centuries
+            path = os.path.join(out_dir, folder, f'{folder}-{start_year}{(start_year + 1) % 100:02d}.csv')
+            df.assign(HomeTeam=names[home_ids], AwayTeam=names[away_ids]).to_csv(path, index=False)
+            n_matches += len(df)
+        tier_teams = promote_and_relegate(tier_teams, frames)
+        attack += rng.normal(0, STRENGTH_DRIFT, n_teams)
+        defence += rng.normal(0, STRENGTH_DRIFT, n_teams)
+
+    pd.DataFrame(xg_rows, columns=['Team', 'Season', 'xG', 'xGA']).to_csv(
+        os.path.join(out_dir, 'xg_team_seasons.csv'), index=False)
+    return n_matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('out_dir')
+    parser.add_argument('--teams', type=int, nargs='+', default=[20, 24], help='Teams in each tier, top tier first')
+    parser.add_argument('--tiers', type=int, help='Number of tiers (default: one per --teams value; '
+                                                  'the last size is repeated for extra tiers)')
+    parser.add_argument('--seasons', type=int, default=5)
+    parser.add_argument('--scale', type=float, help='Roughly this many times the committed data; '
+                                                    'overrides --teams and --seasons')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    teams, seasons = scale_shape(args.scale) if args.scale else (args.teams, args.seasons)
+    if args.tiers:
+        teams = (teams + [teams[-1]] * args.tiers)[:args.tiers]
+    n_matches = make_league_files(args.out_dir, teams, seasons, seed=args.seed)
+    print(f"Wrote {n_matches:,} matches ({len(teams)} tiers of {teams} teams, {seasons} seasons) to `{args.out_dir}`")
+
+
+if __name__ == '__main__':
+    main()
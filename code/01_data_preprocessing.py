@@ -1,43 +1,51 @@
-import pandas as pd
 import os
 
-# Define the paths to your data folders
-pl_path = 'data/premier_league/'
-championship_path = 'data/championship/'
-
-def load_data(folder_path, league_name):
-    """
-    Loads all CSV files from a given folder, combines them,
-    and adds a 'League' column.
-    """
-    all_files = [os.path.join(folder_path, f) for f in os.listdir(folder_path) if f.endswith('.csv')]
-    
-    all_data = []
-    for file in all_files:
-        df = pd.read_csv(file, encoding='latin1')
-        df['League'] = league_name
-        all_data.append(df)
-    
-    combined_df = pd.concat(all_data, ignore_index=True)
-    return combined_df
-
-# Load Premier League and Championship data
-pl_df = load_data(pl_path, 'Premier League')
-championship_df = load_data(championship_path, 'Championship')
-
-# Combine both DataFrames into a single master DataFrame
-master_df = pd.concat([pl_df, championship_df], ignore_index=True)
-
-# Clean the data by dropping empty columns
-master_df = master_df.dropna(axis=1, how='all')
-
-# Let's inspect the combined and cleaned data
-print("Shape of the combined dataframe:", master_df.shape)
-print("\nFirst 5 rows:")
-print(master_df.head())
-print("\nColumns:")
-print(master_df.columns)
-
-# Save the combined dataframe to a new CSV for later use
-master_df.to_csv('data/combined_data.csv', index=False)
-print("\nCombined data saved to `data/combined_data.csv`")
\ No newline at end of file
+from match_loader import load_matches
+from odds_features import add_implied_probabilities, is_odds_column
+from out_of_core import MemoryBudget, max_memory_mb, preprocess_chunked
+from profiling import step
+from storage import data_dir, write_table
+
+# Define the paths to your data folders (in data/, or EPL_DATA_DIR when set)
+pl_path = os.path.join(data_dir, 'premier_league')
+championship_path = os.path.join(data_dir, 'championship')
+
+# Columns to keep on top of Date, HomeTeam, AwayTeam, FTHG, FTAG, FTR and League.
+# Only these are parsed from the raw files: the bookmaker odds, which are converted to probabilities below.
+EXTRA_COLUMNS = is_odds_column
+
+SOURCES = [(pl_path, 'Premier League'), (championship_path, 'Championship')]
+
+max_memory = max_memory_mb()
+if max_memory:
+    # Out-of-core mode (EPL_MAX_MEMORY_MB): season files are read, converted and appended in chunks within
+    # the memory ceiling, with the same result as the in-memory path below (see out_of_core.py)
+    combined_path, n_rows, columns = preprocess_chunked(SOURCES, EXTRA_COLUMNS, MemoryBudget(max_memory))
+    print("Shape of the combined dataframe:", (n_rows, len(columns)))
+    print("\nColumns:")
+    print(columns)
+else:
+    # Load Premier League and Championship data.
+    # Season files are read concurrently, keeping only the columns above, and dates are normalized as they are read.
+    with step('load raw matches') as timed:
+        master_df = load_matches(SOURCES, extra_columns=EXTRA_COLUMNS)
+        timed.rows = len(master_df)
+
+    # Replace the raw odds of every bookmaker with de-margined consensus probabilities (float32)
+    with step('implied probabilities', rows=len(master_df)):
+        master_df = add_implied_probabilities(master_df)
+
+    # Clean the data by dropping empty columns
+    master_df = master_df.dropna(axis=1, how='all')
+
+    # Let's inspect the combined and cleaned data
+    print("Shape of the combined dataframe:", master_df.shape)
+    print("\nFirst 5 rows:")
+    print(master_df.head())
+    print("\nColumns:")
+    print(master_df.columns)
+
+    # Save the combined dataframe for later use (CSV by default, or the columnar format set in EPL_STORAGE_FORMAT)
+    combined_path = write_table(master_df, 'combined_data')
+
+print(f"\nCombined data saved to `{combined_path}`")
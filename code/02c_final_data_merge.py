@@ -1,33 +1,21 @@
-import pandas as pd
-import os
-
-# Get the directory of this script and build paths relative to it
-script_dir = os.path.dirname(os.path.abspath(__file__))
-project_dir = os.path.dirname(script_dir)
-data_dir = os.path.join(project_dir, 'data')
+from profiling import step
+from storage import read_table, write_table
+from xg_store import XGStore
 
 # Load the engineered features with form data
-form_df = pd.read_csv(os.path.join(data_dir, 'final_features_with_form.csv'))
-
-# Load the real xG data you provided
-xg_df = pd.read_csv(os.path.join(data_dir, 'xg_data.csv'))
-
-# Merge the two dataframes on 'Team' and 'Season'
-# We use a left merge to ensure we keep all teams from the form_df
-final_df = pd.merge(form_df, xg_df, on=['Team', 'Season'], how='left')
+form_df = read_table('final_features_with_form')
 
-# Create new features from the xG data
-final_df['xG_diff'] = final_df['xG'] - final_df['xGA']
-final_df['prev_season_xG'] = final_df.groupby('Team')['xG'].shift(1)
-final_df['prev_season_xGA'] = final_df.groupby('Team')['xGA'].shift(1)
-final_df['prev_season_xG_diff'] = final_df.groupby('Team')['xG_diff'].shift(1)
+# Look up the xG data for each team/season from the xG feature store
+# (data/xg_team_seasons.csv, then data/xg_data.csv) and create xG_diff and the lagged xG features
+with step('xg merge', rows=len(form_df)):
+    final_df = XGStore.from_files().add_features(form_df)
 
 # Clean up any NaNs that may have been created during the merge
 final_df = final_df.fillna(0)
 
 # Save the final, complete dataset
-final_df.to_csv(os.path.join(data_dir, 'final_features_complete.csv'), index=False)
+final_path = write_table(final_df, 'final_features_complete')
 
-print(f"Final complete dataset saved to `{os.path.join(data_dir, 'final_features_complete.csv')}`")
+print(f"Final complete dataset saved to `{final_path}`")
 print("\nSample of the final dataframe:")
 print(final_df[['Team', 'Season', 'Points', 'Form Points Last 10', 'xG_diff', 'prev_season_xG_diff']].tail())
\ No newline at end of file
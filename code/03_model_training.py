@@ -1,116 +1,114 @@
-import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_absolute_error
-from sklearn.preprocessing import MinMaxScaler
-import numpy as np
+"""
+Trains the points / goals scored / goals conceded models and predicts the 2025/2026 table.
+
+    python code/03_model_training.py            # train if needed, then ask for transfer ratings
+    python code/03_model_training.py --simulations 100000   # ... and simulate the season
+    python code/03_model_training.py train      # train and save the model artifact
+    python code/03_model_training.py predict --transfer-scores "data/transfer score.csv"
+    python code/03_model_training.py --model-mode multi_output --consistent
+
+Trained models are saved under models/, keyed by a hash of the training data and
+model settings, and reused until the data or settings change.
+"""
+import argparse
 import os
 
-# Get the directory of this script and build paths relative to it
-script_dir = os.path.dirname(os.path.abspath(__file__))
-project_dir = os.path.dirname(script_dir)
-data_dir = os.path.join(project_dir, 'data')
-
-# --- Step 1: Load the final engineered data with all features ---
-df = pd.read_csv(os.path.join(data_dir, 'final_features_complete.csv'))
-
-# --- Step 2: Define features (X) and target (y) ---
-# Add a transfer impact column and fill with 0s for historical data
-df['transfer_impact'] = 0
-
-# --- FIX: Calculate 'adjusted_prev_points' for ALL historical data with a higher IMPACT_FACTOR ---
-IMPACT_FACTOR = 6.0 # SIGNIFICANTLY INCREASED IMPACT FACTOR for stronger effect
-df['adjusted_prev_points'] = df['prev_season_points'] + (df['transfer_impact'] * IMPACT_FACTOR)
-
-features = [
-    'prev_season_gd', 
-    'promoted_from_championship',
-    'prev_season_xG_diff',
-    'prev_season_form',
-    'prev_pl_avg_points', 
-    'adjusted_prev_points' # This is the primary point feature now
-]
-
-target_points = 'Points'
-target_goals_scored = 'Goals Scored'
-target_goals_conceded = 'Goals Conceded'
-
-# --- Step 3: Scale the transfer impact feature on a consistent range ---
-scaler = MinMaxScaler()
-scaler.fit(np.array([-10, 10]).reshape(-1, 1))
-
-# Apply the scaling to the historical data's 'transfer_impact' column
-# This is already implicitly handled within adjusted_prev_points.
-
-# --- Step 4: Split the data into training and prediction sets ---
-df['promoted_from_championship'] = df['promoted_from_championship'].astype(int)
-
-train_data = df[(df['League'] == 'Premier League') & (df['Season'] != '2024/2025')].copy()
-X_train = train_data[features]
-y_train_points = train_data[target_points]
-y_train_goals_scored = train_data[target_goals_scored]
-y_train_goals_conceded = train_data[target_goals_conceded]
-
-# --- Step 5: Train three Random Forest Regression models with optimized hyperparameters ---
-model_points = RandomForestRegressor(n_estimators=1000, max_depth=25, min_samples_leaf=1, random_state=42)
-model_goals_scored = RandomForestRegressor(n_estimators=1000, max_depth=25, min_samples_leaf=1, random_state=42)
-model_goals_conceded = RandomForestRegressor(n_estimators=1000, max_depth=25, min_samples_leaf=1, random_state=42)
-
-model_points.fit(X_train, y_train_points)
-model_goals_scored.fit(X_train, y_train_goals_scored)
-model_goals_conceded.fit(X_train, y_train_goals_conceded)
-
-# --- Step 6: Prepare data for 2025/2026 predictions with interactive input ---
-pl_25_26_teams = [
-    'Arsenal', 'Man City', 'Liverpool', 'Man United', 'Chelsea', 'Tottenham', 'Aston Villa',
-    'Newcastle', 'West Ham', 'Crystal Palace', 'Brighton', 'Fulham', 'Wolves', 'Everton',
-    'Brentford', 'Bournemouth', "Nott'm Forest",
-    'Leeds', 'Burnley', 'Sunderland'
-]
-
-prediction_df = df[df['Season'] == '2024/2025'].copy()
-prediction_df = prediction_df[prediction_df['Team'].isin(pl_25_26_teams)].copy()
-prediction_df['promoted_from_championship'] = prediction_df['League'].apply(lambda x: 1 if x == 'Championship' else 0)
-
-print("\n--- Interactive Transfer Impact Input ---")
-print("Enter a numerical impact for each team's transfers.")
-print("Example: 5 for a major signing, -5 for losing a star player, 0 for no change.")
-print("Press Enter to use a default of 0.")
-
-transfer_impacts = {}
-for team in pl_25_26_teams:
-    while True:
-        try:
-            impact_input = input(f"Enter transfer impact for {team}: ")
-            if impact_input == '':
-                impact_value = 0
-            else:
-                impact_value = float(impact_input)
-            transfer_impacts[team] = impact_value
-            break
-        except ValueError:
-            print("Invalid input. Please enter a number or press Enter for 0.")
-
-prediction_df['transfer_impact'] = prediction_df['Team'].map(transfer_impacts).fillna(0)
-
-# --- Apply transfer impact to create 'adjusted_prev_points' for prediction ---
-prediction_df['adjusted_prev_points'] = prediction_df['prev_season_points'] + (prediction_df['transfer_impact'] * IMPACT_FACTOR)
-
-# --- Step 8: Make the 2025/2026 predictions using all three models ---
-X_predict = prediction_df[features]
-predicted_points = model_points.predict(X_predict)
-predicted_goals_scored = model_goals_scored.predict(X_predict)
-predicted_goals_conceded = model_goals_conceded.predict(X_predict)
-
-prediction_df['Predicted Points'] = predicted_points.round(0)
-prediction_df['Predicted GF'] = predicted_goals_scored.round(0)
-prediction_df['Predicted GA'] = predicted_goals_conceded.round(0)
-prediction_df['Predicted GD'] = prediction_df['Predicted GF'] - prediction_df['Predicted GA']
-
-# Generate the final league table
-final_table = prediction_df[['Team', 'Predicted Points', 'Predicted GF', 'Predicted GA', 'Predicted GD']].sort_values(by=['Predicted Points', 'Predicted GD'], ascending=[False, False])
-final_table = final_table.reset_index(drop=True)
-final_table.index = final_table.index + 1
-final_table.index.name = 'Position'
-
-print("\n\nPredicted 2025/2026 Premier League Table (with all features):")
-print(final_table)
\ No newline at end of file
+from model_store import load_or_train
+from prediction_model import (
+    MODEL_MODES, PL_25_26_TEAMS, apply_transfer_impacts, league_table, load_features, predict_raw,
+    prediction_data, read_transfer_scores,
+)
+from profiling import step
+from season_simulator import simulate_season
+
+N_SIMULATIONS = 100_000  # Suggested number of simulated seasons for title/top-4/relegation odds
+
+
+def ask_transfer_impacts(teams):
+    print("\n--- Interactive Transfer Impact Input ---")
+    print("Enter a numerical impact for each team's transfers.")
+    print("Example: 5 for a major signing, -5 for losing a star player, 0 for no change.")
+    print("Press Enter to use a default of 0.")
+
+    transfer_impacts = {}
+    for team in teams:
+        while True:
+            try:
+                impact_input = input(f"Enter transfer impact for {team}: ")
+                if impact_input == '':
+                    impact_value = 0
+                else:
+                    impact_value = float(impact_input)
+                transfer_impacts[team] = impact_value
+                break
+            except ValueError:
+                print("Invalid input. Please enter a number or press Enter for 0.")
+    return transfer_impacts
+
+
+def predict(artifact, df, transfer_impacts, n_simulations):
+    # --- Prepare data for 2025/2026 predictions and apply the transfer impacts ---
+    prediction_df = prediction_data(df)
+    prediction_df = apply_transfer_impacts(prediction_df, transfer_impacts, artifact['impact_factor'])
+
+    # --- Make the 2025/2026 predictions using all three models ---
+    with step('predict', rows=len(prediction_df)):
+        predictions = predict_raw(artifact['models'], prediction_df, artifact['features'])
+    final_table = league_table(prediction_df['Team'], predictions['points'],
+                               predictions['goals_scored'], predictions['goals_conceded'])
+
+    print("\n\nPredicted 2025/2026 Premier League Table (with all features):")
+    print(final_table)
+
+    # --- Simulate the season many times for title, top-4 and relegation probabilities ---
+    # The unrounded GF/GA predictions become per-fixture Poisson scoring rates
+    if n_simulations:
+        with step('simulate', rows=n_simulations):
+            simulation = simulate_season(prediction_df['Team'], predictions['goals_scored'],
+                                         predictions['goals_conceded'], n_simulations=n_simulations)
+        print(f"\n\nSimulated 2025/2026 outcomes ({n_simulations:,} seasons):")
+        print(simulation[['Team', 'Expected Points', 'Title %', 'Top 4 %', 'Relegation %']].round(1).to_string(index=False))
+    return final_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model-mode', choices=MODEL_MODES, default='separate',
+                        help='One forest per target (default) or a single multi-output forest')
+    parser.add_argument('--consistent', action='store_true',
+                        help='With --model-mode multi_output, make predicted points agree with predicted goal difference')
+    parser.add_argument('--compact', action='store_true',
+                        help='Predict with the flat-array forests (same predictions, faster to load)')
+    parser.add_argument('--simulations', type=int, default=0,
+                        help=f'Number of Monte Carlo seasons to simulate after the prediction '
+                             f'(default: none; {N_SIMULATIONS:,} gives stable odds)')
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('train', help='Train the models and save them, even if saved models are up to date')
+    predict_parser = commands.add_parser('predict', help='Predict the table without prompting for input')
+    predict_parser.add_argument('--transfer-scores', help="CSV of transfer ratings per team, like 'data/transfer score.csv' "
+                                                          "(default: 0 for every team)")
+    # Also accepted after `predict`; SUPPRESS keeps a value given before the command
+    predict_parser.add_argument('--simulations', type=int, default=argparse.SUPPRESS,
+                                help='Number of Monte Carlo seasons to simulate (default: none)')
+    args = parser.parse_args()
+
+    # --- Load the final engineered data with all features ---
+    df = load_features()
+
+    if args.command == 'train':
+        load_or_train(df, retrain=True, mode=args.model_mode, consistent=args.consistent)
+        return
+
+    # --- Load the trained models (training them first if needed) ---
+    with step('load models'):
+        artifact = load_or_train(df, mode=args.model_mode, consistent=args.consistent, compact=args.compact)
+
+    if args.command == 'predict':
+        transfer_impacts = read_transfer_scores(os.path.abspath(args.transfer_scores)) if args.transfer_scores else {}
+        predict(artifact, df, transfer_impacts, args.simulations)
+    else:
+        predict(artifact, df, ask_transfer_impacts(PL_25_26_TEAMS), args.simulations)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Walk-forward backtest and hyperparameter search for the three Random Forests.
+
+For every historical Premier League season N (after the first), each model is
+trained on the seasons before N and scored on N. Every (configuration, season,
+target) fit runs as a separate job on a process pool, and fitted fold models
+are cached under data/cache/backtest/ keyed by a hash of their training data
+and parameters, so re-running with an overlapping grid only fits new jobs.
+
+Usage:
+    python code/backtest.py                                   # current hyperparameters only
+    python code/backtest.py --n-estimators 200 1000 --max-depth 5 25 --min-samples-leaf 1 3
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error
+
+from prediction_model import FEATURES, FOREST_PARAMS, TARGETS, load_features
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_dir = os.path.dirname(script_dir)
+cache_dir = os.path.join(project_dir, 'data', 'cache', 'backtest')
+
+
+def walk_forward_folds(df, min_train_seasons=1):
+    """
+    Yields (season, train_data, test_data) for each Premier League season with
+    at least `min_train_seasons` earlier seasons to train on.
+    """
+    pl = df[df['League'] == 'Premier League']
+    seasons = sorted(pl['Season'].unique())
+    for i, season in enumerate(seasons):
+        if i >= min_train_seasons:
+            yield season, pl[pl['Season'] < season], pl[pl['Season'] == season]
+
+
+def fold_key(train_data, target, params, features):
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(train_data[features + [target]], index=False).to_numpy().tobytes())
+    digest.update(json.dumps({'target': target, 'params': params, 'features': features}, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def fit_fold(job):
+    """
+    Fits (or loads from the cache) one model for one fold and scores it. Runs in a worker process.
+    """
+    config, season, target, train_data, test_data, features = job
+    params = {**FOREST_PARAMS, **config}
+    cache_path = os.path.join(cache_dir, fold_key(train_data, target, params, features) + '.pkl')
+
+    start = time.perf_counter()
+    cached = os.path.exists(cache_path)
+    if cached:
+        with open(cache_path, 'rb') as f:
+            model = pickle.load(f)
+    else:
+        model = RandomForestRegressor(**params).fit(train_data[features], train_data[target])
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_path, 'wb') as f:
+            pickle.dump(model, f, protocol=5)
+    fit_seconds = time.perf_counter() - start
+
+    predictions = model.predict(test_data[features])
+    return {
+        **config,
+        'Season': season,
+        'Target': target,
+        'MAE': mean_absolute_error(test_data[target], predictions),
+        'Fit Seconds': fit_seconds,
+        'Cached': cached,
+    }
+
+
+def run_backtest(df, grid, features=FEATURES, workers=None):
+    """
+    Runs the walk-forward backtest for every configuration in `grid` (a list of
+    RandomForestRegressor parameter dicts). Returns one row per configuration, season and target.
+    """
+    folds = list(walk_forward_folds(df))
+    jobs = [
+        (config, season, target, train_data, test_data, features)
+        for config in grid
+        for season, train_data, test_data in folds
+        for target in TARGETS.values()
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return pd.DataFrame(list(pool.map(fit_fold, jobs)))
+
+
+def parameter_grid(**values):
+    names = list(values)
+    return [dict(zip(names, combination)) for combination in itertools.product(*values.values())]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n-estimators', type=int, nargs='+', default=[FOREST_PARAMS['n_estimators']])
+    parser.add_argument('--max-depth', type=int, nargs='+', default=[FOREST_PARAMS['max_depth']])
+    parser.add_argument('--min-samples-leaf', type=int, nargs='+', default=[FOREST_PARAMS['min_samples_leaf']])
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--output', help='CSV path for the full per-season report')
+    args = parser.parse_args()
+
+    grid = parameter_grid(n_estimators=args.n_estimators, max_depth=args.max_depth,
+                          min_samples_leaf=args.min_samples_leaf)
+    start = time.perf_counter()
+    report = run_backtest(load_features(), grid, workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    config_columns = list(grid[0])
+    print("MAE per target and season:")
+    print(report.pivot_table(index=config_columns + ['Target'], columns='Season', values='MAE').round(2).to_string())
+
+    summary = report.groupby(config_columns).agg(
+        mean_mae=('MAE', 'mean'), fit_seconds=('Fit Seconds', 'sum'), cached_jobs=('Cached', 'sum'))
+    print("\nPer configuration (mean MAE over targets and seasons, total fit time):")
+    print(summary.sort_values('mean_mae').round(3).to_string())
+    print(f"\n{len(report)} fold fits in {elapsed:.1f}s wall-clock")
+
+    if args.output:
+        report.to_csv(os.path.abspath(args.output), index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Inference-only representation of a fitted Random Forest.
+
+All trees are flattened into a few contiguous NumPy arrays: split nodes hold
+a feature, a threshold and two child pointers, and leaves hold only their
+values. A child pointer >= 0 is a split node index, a negative pointer ~i is
+leaf i. Prediction walks every tree for every row of a batch at once, one
+tree level per step, and averages the leaves in the same order as sklearn,
+so predictions are identical to the original forest.
+"""
+import json
+import os
+
+import numpy as np
+
+ARRAYS = ['roots', 'feature', 'threshold', 'left', 'right', 'leaf_values']
+
+# Rows evaluated per step; bounds the (rows x trees) working arrays
+BATCH_ROWS = 2_000
+
+
+class CompactForest:
+
+    def __init__(self, roots, feature, threshold, left, right, leaf_values):
+        self.roots = roots
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.leaf_values = leaf_values  # (n_leaves, n_outputs)
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        roots, feature, threshold, left, right, leaf_values = [], [], [], [], [], []
+        n_split, n_leaf = 0, 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == -1
+            # Position of each node among this tree's split nodes or leaves
+            split_id = np.cumsum(~is_leaf) - 1 + n_split
+            leaf_id = np.cumsum(is_leaf) - 1 + n_leaf
+            pointer = np.where(is_leaf, ~leaf_id, split_id)
+
+            splits = ~is_leaf
+            roots.append(pointer[0])
+            feature.append(tree.feature[splits])
+            threshold.append(tree.threshold[splits])
+            left.append(pointer[tree.children_left[splits]])
+            right.append(pointer[tree.children_right[splits]])
+            leaf_values.append(tree.value[is_leaf][:, :, 0])
+            n_split += splits.sum()
+            n_leaf += is_leaf.sum()
+
+        return cls(
+            roots=np.array(roots, dtype=np.int32),
+            feature=np.concatenate(feature).astype(np.int16),
+            threshold=np.concatenate(threshold).astype(np.float64),
+            left=np.concatenate(left).astype(np.int32),
+            right=np.concatenate(right).astype(np.int32),
+            leaf_values=np.concatenate(leaf_values).astype(np.float64),
+        )
+
+    @property
+    def n_outputs(self):
+        return self.leaf_values.shape[1]
+
+    def leaves(self, X):
+        """
+        Leaf index reached in every tree for every row: an (n_rows, n_trees) array.
+        """
+        n_rows, n_features = X.shape
+        n_trees = len(self.roots)
+        reached = np.tile(self.roots, n_rows)
+        flat_X = np.ascontiguousarray(X).ravel()
+
+        # Only (row, tree) pairs still at a split node are carried to the next level
+        pending = np.flatnonzero(reached >= 0)
+        node = reached[pending]
+        x_offset = (pending // n_trees) * n_features
+        while len(pending):
+            go_left = flat_X.take(x_offset + self.feature.take(node)) <= self.threshold.take(node)
+            node = np.where(go_left, self.left.take(node), self.right.take(node))
+            at_split = node >= 0
+            reached[pending[~at_split]] = node[~at_split]
+            pending, node, x_offset = pending[at_split], node[at_split], x_offset[at_split]
+        return ~reached.reshape(n_rows, n_trees)
+
+    def predict(self, X):
+        # sklearn evaluates trees on float32 copies of the features
+        X = np.asarray(X, dtype=np.float32)
+        # Batches of scenarios repeat many rows, so each distinct row is evaluated once
+        unique_X, inverse = np.unique(X, axis=0, return_inverse=True)
+        predictions = np.empty((len(unique_X), self.n_outputs))
+        for start in range(0, len(unique_X), BATCH_ROWS):
+            values = self.leaf_values[self.leaves(unique_X[start:start + BATCH_ROWS])]  # (rows, trees, outputs)
+            # A running sum over trees matches sklearn's accumulation order exactly
+            predictions[start:start + BATCH_ROWS] = np.cumsum(values, axis=1)[:, -1] / len(self.roots)
+        predictions = predictions[inverse.ravel()]
+        return predictions[:, 0] if self.n_outputs == 1 else predictions
+
+    def save(self, folder, prefix):
+        for name in ARRAYS:
+            np.save(os.path.join(folder, f'{prefix}.{name}.npy'), getattr(self, name))
+
+    @classmethod
+    def load(cls, folder, prefix, mmap_mode='r'):
+        return cls(**{name: np.load(os.path.join(folder, f'{prefix}.{name}.npy'), mmap_mode=mmap_mode)
+                      for name in ARRAYS})
+
+
+def compact_models(models):
+    """
+    Converts a models dict (separate forests, or a MultiOutputForest) to compact forests.
+    """
+    compact = {}
+    for name, model in models.items():
+        if hasattr(model, 'forest'):
+            # MultiOutputForest: keep its consistency projection, swap the forest underneath
+            wrapper = object.__new__(type(model))
+            wrapper.__dict__.update(model.__dict__)
+            wrapper.forest = CompactForest.from_sklearn(model.forest)
+            compact[name] = wrapper
+        else:
+            compact[name] = CompactForest.from_sklearn(model)
+    return compact
+
+
+def save_compact_models(models, folder, metadata):
+    """
+    Saves compact models as .npy arrays plus a meta.json holding `metadata`
+    and any MultiOutputForest settings.
+    """
+    os.makedirs(folder, exist_ok=True)
+    wrappers = {}
+    for name, model in models.items():
+        forest = model.forest if hasattr(model, 'forest') else model
+        forest.save(folder, name)
+        if hasattr(model, 'forest'):
+            wrappers[name] = {k: v for k, v in model.__dict__.items() if k != 'forest'}
+    with open(os.path.join(folder, 'meta.json'), 'w') as f:
+        json.dump({**metadata, 'models': list(models), 'wrappers': wrappers}, f, indent=2)
+
+
+def load_compact_models(folder, wrapper_class=None):
+    """
+    Loads compact models (memory-mapped) and the metadata saved with them.
+    """
+    with open(os.path.join(folder, 'meta.json')) as f:
+        metadata = json.load(f)
+    models = {}
+    for name in metadata['models']:
+        forest = CompactForest.load(folder, name)
+        if name in metadata['wrappers']:
+            wrapper = object.__new__(wrapper_class)
+            wrapper.__dict__.update(metadata['wrappers'][name])
+            wrapper.forest = forest
+            models[name] = wrapper
+        else:
+            models[name] = forest
+    return models, metadata
@@ -0,0 +1,126 @@
+"""
+Team/season feature engineering, shared by 02_feature_engineering.py and the
+multi-league runner (leagues.py).
+
+engineer_features() turns a match table for one league pyramid into one row
+per team and season with the model features. The top division is the league
+the models predict and the second division the one teams are promoted from;
+'prev_pl_avg_points' and 'promoted_from_championship' keep their Premier
+League names but refer to those two divisions.
+"""
+import pandas as pd
+
+from match_index import MatchIndex
+from odds_features import team_odds_features
+from profiling import step
+from ratings import INITIAL_ELO, INITIAL_PI, RatingEngine, match_ratings, preseason_ratings
+from team_stats import add_season_column, aggregate_team_seasons
+from xg_store import XGStore
+
+# Home/away split and schedule columns merged into the team/season features
+SCHEDULE_COLUMNS = ['Team', 'Season', 'Home Points', 'Away Points', 'Strength of Schedule']
+
+
+def division_ratings(top_league, second_league):
+    """
+    Starting Elo and pi ratings for the two divisions, on the Premier League / Championship scale.
+    """
+    return ({top_league: INITIAL_ELO['Premier League'], second_league: INITIAL_ELO['Championship']},
+            {top_league: INITIAL_PI['Premier League'], second_league: INITIAL_PI['Championship']})
+
+
+def engineer_features(df, top_league='Premier League', second_league='Championship', cache_dir=None, xg_store=None):
+    """
+    Features for every team-season of the matches in `df` (as written by 01_data_preprocessing.py).
+    Returns (features, rated_matches), where rated_matches holds the pre-match ratings of every match.
+    Team/season stats are cached per season in `cache_dir` when given; `xg_store` defaults to XGStore.from_files().
+    """
+    # --- Step 1: Create a 'Season' column ---
+    with step('season column', rows=len(df)):
+        df = add_season_column(df)
+
+    # --- Steps 2-4: Calculate core stats and form for each team/season ---
+    # Matches are exploded into one row per team per match and aggregated with grouped operations,
+    # instead of re-filtering the whole match table for every season and team.
+    # Each season's stats are cached by content hash, so only seasons with new matches are recomputed.
+    with step('team/season aggregation', rows=len(df)) as timed:
+        engineered_df = aggregate_team_seasons(df, cache_dir=cache_dir)
+        timed.rows = len(engineered_df)
+
+    # --- Step 5b: Elo and pi ratings ---
+    # All matches are rated once in date order; each team-season gets the ratings it carried into that season,
+    # and the pre-match ratings of every match are returned for match-level models
+    with step('ratings', rows=len(df)):
+        initial_elo, initial_pi = division_ratings(top_league, second_league)
+        rated_matches, _ = match_ratings(df, RatingEngine(initial_elo=initial_elo, initial_pi=initial_pi))
+        preseason = preseason_ratings(rated_matches)
+
+    # --- Step 5c: Bookmaker odds ---
+    # Team/season averages of the de-margined odds from step 01
+    with step('odds features', rows=len(df)):
+        odds = team_odds_features(df)
+
+    # --- Step 5d: Home/away splits and strength of schedule ---
+    # Looked up from a dense season x home x away index of the results instead of masking the match table per team
+    with step('match index', rows=len(df)):
+        schedule = MatchIndex(df).team_season_table()[SCHEDULE_COLUMNS]
+
+    features = team_season_features(engineered_df, preseason, odds, schedule, top_league, second_league, xg_store)
+    return features, rated_matches
+
+
+def team_season_features(engineered_df, preseason, odds, schedule, top_league='Premier League',
+                         second_league='Championship', xg_store=None):
+    """
+    Adds the lagged features to the team/season stats and merges in the preseason ratings,
+    odds features, home/away schedule table and xG (steps 5-6). The match-level inputs come from
+    engineer_features() or, for archives processed in chunks, from out_of_core.py.
+    """
+    # --- Step 5: Calculate League Position and Lagged Features ---
+    with step('lag features', rows=len(engineered_df)):
+        # The lags below take each team's previous row, so rows must be in season order whatever order
+        # the matches were loaded in ('YYYY/YYYY' labels sort chronologically; the sort is stable)
+        engineered_df = engineered_df.sort_values('Season', kind='stable', ignore_index=True)
+        engineered_df['League Position'] = engineered_df.groupby(['Season', 'League'])['Points'].rank(ascending=False, method='min')
+
+        engineered_df['prev_season_points'] = engineered_df.groupby('Team')['Points'].shift(1)
+        engineered_df['prev_season_gd'] = engineered_df.groupby('Team')['Goal Difference'].shift(1)
+        engineered_df['prev_season_league'] = engineered_df.groupby('Team')['League'].shift(1)
+        engineered_df['prev_season_form'] = engineered_df.groupby('Team')['Form Points Last 10'].shift(1)
+
+        # Calculate 'prev_pl_avg_points'
+        engineered_df['prev_pl_avg_points'] = engineered_df[engineered_df['League'] == top_league].groupby('Team')['Points'].rolling(window=3, min_periods=1).mean().reset_index(level=0, drop=True).shift(1)
+        promoted_teams_points = engineered_df[(engineered_df['prev_season_league'] == second_league) & (engineered_df['League'] == top_league)]['Points'].mean()
+        engineered_df['prev_pl_avg_points'] = engineered_df['prev_pl_avg_points'].fillna(promoted_teams_points)
+
+        # Generate a synthetic 'transfer_impact' for historical data
+        # This feature will represent the change in points from the previous season
+        # It will teach the model that 'transfer_impact' can actually influence points.
+        engineered_df['synthetic_transfer_impact'] = engineered_df.groupby('Team')['Points'].diff().fillna(0) / 5 # Divide by 5 to scale it roughly to our -10 to +10 range
+
+        # Cap the synthetic impact to a reasonable range
+        engineered_df['synthetic_transfer_impact'] = engineered_df['synthetic_transfer_impact'].clip(-10, 10)
+
+        # Identify promoted teams for the next season (for the 'promoted_from_championship' feature)
+        engineered_df['promoted_from_championship'] = (engineered_df['prev_season_league'] == second_league) & (engineered_df['League'] == top_league)
+        engineered_df['promoted_from_championship'] = engineered_df['promoted_from_championship'].astype(int)
+
+    # Ratings carried into the season, odds averages with last season's implied win probability,
+    # and home/away points with last season's strength of schedule
+    engineered_df = pd.merge(engineered_df, preseason, on=['Team', 'Season'], how='left')
+    engineered_df = pd.merge(engineered_df, odds, on=['Team', 'Season'], how='left')
+    engineered_df['prev_season_odds_win_prob'] = engineered_df.groupby('Team')['odds_win_prob'].shift(1)
+    engineered_df = pd.merge(engineered_df, schedule, on=['Team', 'Season'], how='left')
+    engineered_df['prev_season_sos'] = engineered_df.groupby('Team')['Strength of Schedule'].shift(1)
+
+    # --- Step 6: Merge with xG data ---
+    # xG/xGA come from the xG feature store (data/xg_team_seasons.csv, then data/xg_data.csv);
+    # it adds 'xG_diff' and the lagged xG features. Leagues the store has no teams for (see leagues.py) get no
+    # xG columns rather than all-zero ones, so their models are trained without them.
+    with step('xg merge', rows=len(engineered_df)):
+        xg_store = XGStore.from_files() if xg_store is None else xg_store
+        features = xg_store.add_features(engineered_df) if xg_store.covers(engineered_df['Team']) else engineered_df
+
+    # Clean up NaNs created by shifting and merging
+    features = features.fillna(0)
+    return features
@@ -0,0 +1,274 @@
+"""
+In-season updates of the projected 2025/2026 table.
+
+`init` stores the pre-season model prediction for every team. `update` then
+ingests played matches as they come in, updating running per-team totals
+(points, goals, last-10 form) in time proportional to the matches added, and
+re-projects the remaining fixtures without re-running the feature pipeline or
+loading the models.
+
+Each team's scoring and conceding rates blend the pre-season prediction with
+its actual per-game record; the prediction counts as PRIOR_GAMES games of
+evidence, so it fades as the season goes on. Remaining fixtures are projected
+with the same Poisson model as season_simulator.py.
+
+Usage:
+    python code/in_season.py init --transfer-scores "data/transfer score.csv"
+    python code/in_season.py update E0.csv                  # a football-data.co.uk season file
+    python code/in_season.py show --simulations 20000
+(already ingested matches in an update file are skipped, so the growing season
+file can be passed every week)
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from season_simulator import HOME_ADVANTAGE, expected_points, fixture_rates, simulate_season
+from team_stats import FORM_WINDOW, parse_match_dates
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_dir = os.path.dirname(script_dir)
+state_path = os.path.join(project_dir, 'data', 'cache', 'in_season.json')
+
+# Games of evidence the pre-season prediction is worth when blended with actual results
+PRIOR_GAMES = 10
+
+NOT_PLAYED = -1
+
+
+class SeasonState:
+    """
+    Running per-team totals for a season under way, with the pre-season prediction they are blended with.
+
+    Results are held in (n_teams, n_teams) home x away goal matrices, NOT_PLAYED
+    for fixtures still to come, and the last FORM_WINDOW points of each team in
+    a ring buffer.
+    """
+
+    def __init__(self, teams, prior_points, prior_goals_for, prior_goals_against):
+        self.teams = list(teams)
+        self.team_index = {team: i for i, team in enumerate(self.teams)}
+        n_teams = len(self.teams)
+        self.prior_points = np.asarray(prior_points, dtype=float)
+        self.prior_goals_for = np.asarray(prior_goals_for, dtype=float)
+        self.prior_goals_against = np.asarray(prior_goals_against, dtype=float)
+
+        self.home_goals = np.full((n_teams, n_teams), NOT_PLAYED, dtype=np.int16)
+        self.away_goals = np.full((n_teams, n_teams), NOT_PLAYED, dtype=np.int16)
+        self.played = np.zeros(n_teams, dtype=np.int64)
+        self.points = np.zeros(n_teams, dtype=np.int64)
+        self.goals_for = np.zeros(n_teams, dtype=np.int64)
+        self.goals_against = np.zeros(n_teams, dtype=np.int64)
+        self.recent = np.zeros((n_teams, FORM_WINDOW), dtype=np.int8)
+
+    @property
+    def n_games(self):
+        return 2 * (len(self.teams) - 1)
+
+    def add_result(self, home_team, away_team, home_goals, away_goals):
+        """
+        Records one played match. Returns False if it was already recorded with the same score.
+        """
+        try:
+            home, away = self.team_index[home_team], self.team_index[away_team]
+        except KeyError as e:
+            raise ValueError(f"Unknown team {e.args[0]!r}, expected one of {self.teams}") from None
+        if self.home_goals[home, away] != NOT_PLAYED:
+            if (self.home_goals[home, away], self.away_goals[home, away]) != (home_goals, away_goals):
+                raise ValueError(f"{home_team} v {away_team} is already recorded as "
+                                 f"{self.home_goals[home, away]}-{self.away_goals[home, away]}")
+            return False
+
+        self.home_goals[home, away] = home_goals
+        self.away_goals[home, away] = away_goals
+        home_points = 3 if home_goals > away_goals else 1 if home_goals == away_goals else 0
+        away_points = 3 if away_goals > home_goals else 1 if home_goals == away_goals else 0
+        for team, scored, conceded, points in [(home, home_goals, away_goals, home_points),
+                                               (away, away_goals, home_goals, away_points)]:
+            self.recent[team, self.played[team] % FORM_WINDOW] = points
+            self.played[team] += 1
+            self.points[team] += points
+            self.goals_for[team] += scored
+            self.goals_against[team] += conceded
+        return True
+
+    def add_matches(self, matches):
+        """
+        Records every match in a football-data.co.uk style frame (HomeTeam, AwayTeam, FTHG, FTAG
+        and optionally Date), in date order. Returns the number of new matches.
+        """
+        matches = matches.dropna(subset=['FTHG', 'FTAG'])
+        if 'Date' in matches:
+            matches = matches.assign(Date=parse_match_dates(matches['Date'])).sort_values('Date', kind='stable')
+        added = 0
+        for home_team, away_team, home_goals, away_goals in zip(
+                matches['HomeTeam'], matches['AwayTeam'], matches['FTHG'].astype(int), matches['FTAG'].astype(int)):
+            added += self.add_result(home_team, away_team, home_goals, away_goals)
+        return added
+
+    def form(self):
+        """
+        Points from each team's last FORM_WINDOW matches.
+        """
+        return self.recent.sum(axis=1, dtype=np.int64)
+
+    def blended_rates(self, prior_games=PRIOR_GAMES):
+        """
+        Full-season goals for/against implied by blending the pre-season prediction with actual results.
+        """
+        weight = prior_games + self.played
+        goals_for = (self.prior_goals_for / self.n_games * prior_games + self.goals_for) / weight
+        goals_against = (self.prior_goals_against / self.n_games * prior_games + self.goals_against) / weight
+        return goals_for * self.n_games, goals_against * self.n_games
+
+    def remaining(self):
+        """
+        (n_teams, n_teams) home x away mask of the fixtures still to play.
+        """
+        return (self.home_goals == NOT_PLAYED) & ~np.eye(len(self.teams), dtype=bool)
+
+    def projected_table(self, prior_games=PRIOR_GAMES, home_advantage=HOME_ADVANTAGE):
+        """
+        Current standings plus expected final points and goals, sorted by projected points and goal difference.
+        """
+        goals_for, goals_against = self.blended_rates(prior_games)
+        home, away, home_rate, away_rate = fixture_rates(goals_for, goals_against, home_advantage)
+        to_play = self.remaining()[home, away]
+        home, away, home_rate, away_rate = home[to_play], away[to_play], home_rate[to_play], away_rate[to_play]
+        home_points, away_points = expected_points(home_rate, away_rate)
+
+        n_teams = len(self.teams)
+
+        def remaining_total(home_values, away_values):
+            return np.bincount(home, home_values, n_teams) + np.bincount(away, away_values, n_teams)
+
+        table = pd.DataFrame({
+            'Team': self.teams,
+            'Played': self.played,
+            'Points': self.points,
+            'GD': self.goals_for - self.goals_against,
+            'Form': self.form(),
+            'Pre-season Points': self.prior_points,
+            'Projected Points': self.points + remaining_total(home_points, away_points),
+            'Projected GF': self.goals_for + remaining_total(home_rate, away_rate),
+            'Projected GA': self.goals_against + remaining_total(away_rate, home_rate),
+        })
+        table['Projected GD'] = table['Projected GF'] - table['Projected GA']
+        table = table.sort_values(['Projected Points', 'Projected GD'], ascending=False).reset_index(drop=True)
+        table.index = table.index + 1
+        table.index.name = 'Position'
+        return table
+
+    def simulate(self, n_simulations, prior_games=PRIOR_GAMES, seed=42, workers=1):
+        """
+        Monte Carlo title/top-4/relegation odds from the current standings over the remaining fixtures.
+        """
+        goals_for, goals_against = self.blended_rates(prior_games)
+        return simulate_season(self.teams, goals_for, goals_against, n_simulations=n_simulations, seed=seed,
+                               workers=workers, remaining=self.remaining(),
+                               standings=(self.points, self.goals_for, self.goals_against))
+
+    def save(self, path=state_path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        state = {
+            'teams': self.teams,
+            'prior_points': self.prior_points.tolist(),
+            'prior_goals_for': self.prior_goals_for.tolist(),
+            'prior_goals_against': self.prior_goals_against.tolist(),
+            'home_goals': self.home_goals.tolist(),
+            'away_goals': self.away_goals.tolist(),
+            'recent': self.recent.tolist(),
+            'played': self.played.tolist(),
+        }
+        with open(path, 'w') as f:
+            json.dump(state, f)
+
+    @classmethod
+    def load(cls, path=state_path):
+        with open(path) as f:
+            state = json.load(f)
+        season = cls(state['teams'], state['prior_points'], state['prior_goals_for'], state['prior_goals_against'])
+        season.home_goals[:] = state['home_goals']
+        season.away_goals[:] = state['away_goals']
+        season.recent[:] = state['recent']
+        season.played[:] = state['played']
+
+        # Totals follow from the recorded results
+        played = season.home_goals != NOT_PLAYED
+        home_goals = np.where(played, season.home_goals, 0)
+        away_goals = np.where(played, season.away_goals, 0)
+        home_points = np.where(home_goals > away_goals, 3, np.where(home_goals == away_goals, 1, 0)) * played
+        away_points = np.where(away_goals > home_goals, 3, np.where(home_goals == away_goals, 1, 0)) * played
+        season.points[:] = home_points.sum(axis=1) + away_points.sum(axis=0)
+        season.goals_for[:] = home_goals.sum(axis=1) + away_goals.sum(axis=0)
+        season.goals_against[:] = away_goals.sum(axis=1) + home_goals.sum(axis=0)
+        return season
+
+
+def preseason_state(transfer_impacts, mode='separate', consistent=False, compact=False):
+    """
+    Starts a season from the pre-season model prediction for PL_25_26_TEAMS.
+    """
+    # The models are only needed here, so `update` and `show` don't pay for importing sklearn
+    from model_store import load_or_train
+    from prediction_model import apply_transfer_impacts, load_features, predict_raw, prediction_data
+
+    df = load_features()
+    artifact = load_or_train(df, mode=mode, consistent=consistent, compact=compact)
+    prediction_df = apply_transfer_impacts(prediction_data(df), transfer_impacts, artifact['impact_factor'])
+    predictions = predict_raw(artifact['models'], prediction_df, artifact['features'])
+    return SeasonState(prediction_df['Team'], predictions['points'],
+                       predictions['goals_scored'], predictions['goals_conceded'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--state', default=state_path, help='Season state file (default: data/cache/in_season.json)')
+    parser.add_argument('--prior-games', type=float, default=PRIOR_GAMES,
+                        help='Games of evidence the pre-season prediction is worth')
+    commands = parser.add_subparsers(dest='command', required=True)
+    init_parser = commands.add_parser('init', help='Start the season from the pre-season prediction')
+    init_parser.add_argument('--transfer-scores', help="CSV of transfer ratings per team (default: 0 for every team)")
+    init_parser.add_argument('--model-mode', default='separate',
+                             help="Model layout, as 03_model_training.py's --model-mode (default: separate)")
+    init_parser.add_argument('--consistent', action='store_true')
+    init_parser.add_argument('--compact', action='store_true')
+    update_parser = commands.add_parser('update', help='Ingest played matches and show the projected table')
+    update_parser.add_argument('matches', nargs='+', help='CSVs with HomeTeam, AwayTeam, FTHG and FTAG columns')
+    for command_parser in (update_parser, commands.add_parser('show', help='Show the projected table')):
+        command_parser.add_argument('--simulations', type=int, default=0,
+                                    help='Monte Carlo seasons to simulate from the current standings (default: none)')
+    args = parser.parse_args()
+    path = os.path.abspath(args.state)
+
+    if args.command == 'init':
+        from prediction_model import MODEL_MODES, read_transfer_scores
+        # Checked here rather than with choices=, so `update` and `show` don't import sklearn to build the parser
+        if args.model_mode not in MODEL_MODES:
+            init_parser.error(f"argument --model-mode: invalid choice: '{args.model_mode}' "
+                              f"(choose from {', '.join(map(repr, MODEL_MODES))})")
+        transfer_impacts = read_transfer_scores(os.path.abspath(args.transfer_scores)) if args.transfer_scores else {}
+        season = preseason_state(transfer_impacts, args.model_mode, args.consistent, args.compact)
+        season.save(path)
+        print(f"Season state saved to `{path}`")
+        return
+
+    season = SeasonState.load(path)
+    if args.command == 'update':
+        added = sum(season.add_matches(pd.read_csv(os.path.abspath(file))) for file in args.matches)
+        season.save(path)
+        print(f"{added} new matches added ({int(season.played.sum() // 2)} played in total)")
+
+    print("\nProjected table:")
+    print(season.projected_table(args.prior_games).round(1).to_string())
+    if args.simulations:
+        simulation = season.simulate(args.simulations, args.prior_games)
+        print(f"\n\nSimulated outcomes ({args.simulations:,} seasons from the current standings):")
+        print(simulation[['Team', 'Expected Points', 'Title %', 'Top 4 %', 'Relegation %']].round(1).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""
+Multi-league runner: the preprocessing, feature, training and prediction
+flow of steps 01-03 for every league group in LEAGUES, in parallel.
+
+A league group is a pyramid of football-data.co.uk divisions linked by
+promotion and relegation: its divisions are listed top tier first, each with
+the folder (under data/, or EPL_DATA_DIR) holding its season CSVs. The first
+division is the one predicted, for the group's `teams` of the upcoming
+season; the second is the one teams are promoted from. Groups share no
+matches, so each is processed in its own worker process.
+
+Read-only inputs used by every group (the xG store and the configuration)
+are loaded once before the pool starts; with the default 'fork' start method
+the workers share those pages with the parent instead of receiving copies.
+
+Each group writes data/leagues/<group>/final_features and predicted_table
+(in the EPL_STORAGE_FORMAT format); trained models are cached in models/
+like step 03's, keyed by the group's training data. Groups none of whose
+teams are in the xG store get no xG columns and are modelled without them.
+
+Usage:
+    python code/leagues.py                        # every group with data
+    python code/leagues.py england spain --workers 2
+    python code/leagues.py --config my_leagues.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from features import engineer_features
+from match_loader import load_matches
+from model_store import load_or_train
+from odds_features import add_implied_probabilities, is_odds_column
+from prediction_model import FEATURES, PL_25_26_TEAMS, PREDICTION_SEASON, predict_table, prediction_data, prepare_features
+from storage import data_dir, write_table
+from xg_store import XGStore
+
+# Group -> divisions (top tier first) and the top division's teams for the upcoming season.
+# Team names follow football-data.co.uk.
+LEAGUES = {
+    'england': {
+        'divisions': [
+            {'league': 'Premier League', 'code': 'E0', 'folder': 'premier_league'},
+            {'league': 'Championship', 'code': 'E1', 'folder': 'championship'},
+        ],
+        'teams': PL_25_26_TEAMS,
+    },
+    'spain': {
+        'divisions': [
+            {'league': 'La Liga', 'code': 'SP1', 'folder': 'la_liga'},
+            {'league': 'Segunda Division', 'code': 'SP2', 'folder': 'segunda_division'},
+        ],
+        'teams': [
+            'Alaves', 'Ath Bilbao', 'Ath Madrid', 'Barcelona', 'Betis', 'Celta', 'Elche', 'Espanol', 'Getafe',
+            'Girona', 'Levante', 'Mallorca', 'Osasuna', 'Oviedo', 'Real Madrid', 'Sevilla', 'Sociedad',
+            'Valencia', 'Vallecano', 'Villarreal',
+        ],
+    },
+    'italy': {
+        'divisions': [
+            {'league': 'Serie A', 'code': 'I1', 'folder': 'serie_a'},
+            {'league': 'Serie B', 'code': 'I2', 'folder': 'serie_b'},
+        ],
+        'teams': [
+            'Atalanta', 'Bologna', 'Cagliari', 'Como', 'Cremonese', 'Fiorentina', 'Genoa', 'Inter', 'Juventus',
+            'Lazio', 'Lecce', 'Milan', 'Napoli', 'Parma', 'Pisa', 'Roma', 'Sassuolo', 'Torino', 'Udinese', 'Verona',
+        ],
+    },
+    'germany': {
+        'divisions': [
+            {'league': 'Bundesliga', 'code': 'D1', 'folder': 'bundesliga'},
+            {'league': '2. Bundesliga', 'code': 'D2', 'folder': 'bundesliga_2'},
+        ],
+        'teams': [
+            'Augsburg', 'Bayern Munich', 'Dortmund', 'Ein Frankfurt', 'FC Koln', 'Freiburg', 'Hamburg',
+            'Heidenheim', 'Hoffenheim', 'Leverkusen', "M'gladbach", 'Mainz', 'RB Leipzig', 'St Pauli', 'Stuttgart',
+            'Union Berlin', 'Werder Bremen', 'Wolfsburg',
+        ],
+    },
+}
+
+# Filled in before the worker pool starts and inherited by forked workers
+_shared = {}
+
+
+def load_config(path=None):
+    """
+    LEAGUES, with the groups in the JSON file at `path` (same layout) added or replacing groups of the same name.
+    """
+    config = dict(LEAGUES)
+    if path:
+        with open(path) as f:
+            config.update(json.load(f))
+    for group, league in config.items():
+        if len(league['divisions']) < 2:
+            raise ValueError(f"League group '{group}' needs a top division and the division below it")
+    return config
+
+
+def division_sources(league):
+    """
+    (folder path, league name) for each division with season files, top tier first, as match_loader expects.
+    """
+    sources = []
+    for division in league['divisions']:
+        folder = os.path.join(data_dir, division['folder'])
+        if os.path.isdir(folder) and any(f.endswith('.csv') for f in os.listdir(folder)):
+            sources.append((folder, division['league']))
+    return sources
+
+
+def has_data(league):
+    """
+    Whether the top division (the one predicted) has season files.
+    """
+    sources = division_sources(league)
+    return bool(sources) and sources[0][1] == league['divisions'][0]['league']
+
+
+def output_name(group, table):
+    os.makedirs(os.path.join(data_dir, 'leagues', group), exist_ok=True)
+    return os.path.join('leagues', group, table)
+
+
+def run_group(group):
+    """
+    Steps 01-03 for one league group. Runs in a worker process; returns a summary of the run.
+    """
+    start = time.perf_counter()
+    league = _shared['config'][group]
+    top_league, second_league = (division['league'] for division in league['divisions'][:2])
+
+    # --- Step 01: load every division and convert the odds to probabilities ---
+    matches = load_matches(division_sources(league), extra_columns=is_odds_column)
+    matches = add_implied_probabilities(matches).dropna(axis=1, how='all')
+
+    # --- Step 02: team/season features ---
+    features, _ = engineer_features(matches, top_league, second_league,
+                                    cache_dir=os.path.join(data_dir, 'cache', 'team_seasons', group),
+                                    xg_store=_shared['xg_store'])
+    write_table(features, output_name(group, 'final_features'))
+
+    # --- Step 03: train (or load the cached models) and predict the upcoming season ---
+    # Leagues without xG in the store have no xG columns, and their models are trained without them
+    df = prepare_features(features)
+    artifact = load_or_train(df, league=top_league, features=[column for column in FEATURES if column in df])
+    prediction_df = prediction_data(df, league['teams'], league=top_league)
+    if prediction_df.empty:
+        raise ValueError(f"None of the {group} teams have {PREDICTION_SEASON} data")
+    table = predict_table(artifact['models'], prediction_df, artifact['features'])
+    table_path = write_table(table.reset_index(), output_name(group, 'predicted_table'))
+
+    return {
+        'group': group,
+        'matches': len(matches),
+        'team_seasons': len(features),
+        'predicted': len(table),
+        'missing_teams': sorted(set(league['teams']) - set(prediction_df['Team'])),
+        'seconds': time.perf_counter() - start,
+        'output': table_path,
+    }
+
+
+def _init_worker(shared):
+    _shared.update(shared)
+
+
+def run_groups(groups, config, workers=None):
+    """
+    Runs every group on a process pool and returns the summaries in `groups` order.
+    A group that fails gets a summary with its 'error' instead, without stopping the others.
+    """
+    _shared['config'] = config
+    _shared['xg_store'] = XGStore.from_files()
+    context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+    # Forked workers inherit _shared; spawned workers don't share the parent's memory and get their own copy
+    initializer, initargs = (None, ()) if context.get_start_method() == 'fork' else (_init_worker, (dict(_shared),))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=initializer, initargs=initargs) as pool:
+        futures = {group: pool.submit(run_group, group) for group in groups}
+    summaries = []
+    for group, future in futures.items():
+        try:
+            summaries.append(future.result())
+        except Exception as e:
+            summaries.append({'group': group, 'error': f"{type(e).__name__}: {e}"})
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('groups', nargs='*', help='League groups to run (default: every group with season files)')
+    parser.add_argument('--config', help='JSON file of league groups to add to (or replace in) the built-in ones')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: one per CPU)')
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    unknown = set(args.groups) - set(config)
+    if unknown:
+        parser.error(f"Unknown league groups: {sorted(unknown)}; known: {sorted(config)}")
+    groups = args.groups or list(config)
+    without_data = [group for group in groups if not has_data(config[group])]
+    for group in without_data:
+        folder = config[group]['divisions'][0]['folder']
+        print(f"Skipping {group}: no season files in `{os.path.join(data_dir, folder)}`")
+    groups = [group for group in groups if group not in without_data]
+    if not groups:
+        return
+
+    start = time.perf_counter()
+    summaries = run_groups(groups, config, args.workers)
+    print(f"\n{'group':<12} {'matches':>9} {'team-seasons':>13} {'predicted':>10} {'seconds':>8}  table")
+    for summary in summaries:
+        if 'error' in summary:
+            print(f"{summary['group']:<12} failed: {summary['error']}")
+            continue
+        print(f"{summary['group']:<12} {summary['matches']:>9} {summary['team_seasons']:>13} {summary['predicted']:>10} "
+              f"{summary['seconds']:>8.1f}  {summary['output']}")
+        if summary['missing_teams']:
+            print(f"    no {PREDICTION_SEASON} data for: {', '.join(summary['missing_teams'])}")
+    failed = [summary['group'] for summary in summaries if 'error' in summary]
+    print(f"\n{len(summaries) - len(failed)} of {len(summaries)} league group(s) in {time.perf_counter() - start:.1f} s")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Index over the match table for per-team lookups without scanning every match.
+
+Teams and seasons are interned to integer ids once. Results go into dense
+(season, home team, away team) arrays counting wins, draws, losses and goals
+(a count rather than a single result, since a season label can hold the same
+fixture twice around the August cut-off). Every team's matches are kept
+date-sorted in one flat array, grouped by team and then season, with
+cumulative points. Last-N form is then O(1), head-to-head records
+O(seasons) and home/away splits and strength of schedule O(teams), or one
+array operation for every team-season at once.
+"""
+import numpy as np
+import pandas as pd
+
+from team_stats import FORM_WINDOW
+
+
+def match_points(goals_for, goals_against):
+    return np.where(goals_for > goals_against, 3, np.where(goals_for == goals_against, 1, 0))
+
+
+class MatchIndex:
+
+    def __init__(self, df):
+        """
+        Builds the index from a match table with 'Season', 'Date', 'HomeTeam', 'AwayTeam', 'FTHG' and 'FTAG'.
+        """
+        self.teams = pd.Index(np.union1d(df['HomeTeam'].astype(str), df['AwayTeam'].astype(str)))
+        # Season labels ('2020/2021') sort chronologically, so season ids do too
+        self.seasons = pd.Index(np.unique(np.asarray(df['Season'], dtype=str)))
+        n_seasons, n_teams = len(self.seasons), len(self.teams)
+
+        season = self.seasons.get_indexer(np.asarray(df['Season'], dtype=str))
+        home = self.teams.get_indexer(df['HomeTeam'].astype(str))
+        away = self.teams.get_indexer(df['AwayTeam'].astype(str))
+        home_goals = df['FTHG'].to_numpy(dtype=np.int16)
+        away_goals = df['FTAG'].to_numpy(dtype=np.int16)
+
+        shape = (n_seasons, n_teams, n_teams)
+        fixture = (season, home, away)
+        self.home_wins, self.draws, self.away_wins = (np.zeros(shape, dtype=np.int16) for _ in range(3))
+        self.home_goals, self.away_goals = np.zeros(shape, dtype=np.int16), np.zeros(shape, dtype=np.int16)
+        np.add.at(self.home_wins, fixture, home_goals > away_goals)
+        np.add.at(self.draws, fixture, home_goals == away_goals)
+        np.add.at(self.away_wins, fixture, home_goals < away_goals)
+        np.add.at(self.home_goals, fixture, home_goals)
+        np.add.at(self.away_goals, fixture, away_goals)
+
+        # Both sides of every match, sorted by team, season and date (ties keep the row order)
+        rows = np.arange(len(df))
+        team = np.concatenate([home, away])
+        side_season = np.concatenate([season, season])
+        dates = np.concatenate([df['Date'].to_numpy(), df['Date'].to_numpy()])
+        order = np.lexsort((np.concatenate([rows, rows]), dates, side_season, team))
+        self.match_team = team[order]
+        self.match_season = side_season[order]
+        self.match_row = np.concatenate([rows, rows])[order]
+        self.match_is_home = np.repeat([True, False], len(df))[order]
+        self.match_opponent = np.concatenate([away, home])[order]
+        self.match_goals_for = np.concatenate([home_goals, away_goals])[order]
+        self.match_goals_against = np.concatenate([away_goals, home_goals])[order]
+        self.match_points = match_points(self.match_goals_for, self.match_goals_against)
+        self.cumulative_points = np.concatenate([[0], np.cumsum(self.match_points)])
+
+        # offsets[t * n_seasons + s] is where team t's season s starts in the match arrays
+        keys = np.arange(n_teams * n_seasons + 1)
+        self.offsets = np.searchsorted(self.match_team * n_seasons + self.match_season, keys)
+
+    def team_id(self, team):
+        return self.teams.get_loc(team)
+
+    def season_id(self, season):
+        return self.seasons.get_loc(season)
+
+    def _span(self, team, season=None):
+        t = self.team_id(team)
+        n_seasons = len(self.seasons)
+        if season is None:
+            return self.offsets[t * n_seasons], self.offsets[(t + 1) * n_seasons]
+        key = t * n_seasons + self.season_id(season)
+        return self.offsets[key], self.offsets[key + 1]
+
+    def matches(self, team, season=None):
+        """
+        A team's matches in date order (within `season`, or across all seasons), from its own side.
+        """
+        start, end = self._span(team, season)
+        span = slice(start, end)
+        return pd.DataFrame({
+            'Season': self.seasons[self.match_season[span]],
+            'Opponent': self.teams[self.match_opponent[span]],
+            'is_home': self.match_is_home[span],
+            'GF': self.match_goals_for[span],
+            'GA': self.match_goals_against[span],
+            'Points': self.match_points[span],
+            'match_row': self.match_row[span],
+        })
+
+    def form(self, team, season=None, n=FORM_WINDOW):
+        """
+        Points from a team's last `n` matches of `season` (or its last `n` overall).
+        """
+        start, end = self._span(team, season)
+        return int(self.cumulative_points[end] - self.cumulative_points[max(start, end - n)])
+
+    def head_to_head(self, team, opponent, seasons=None):
+        """
+        `team`'s record against `opponent` over `seasons` (default: all), home and away.
+        """
+        t, o = self.team_id(team), self.team_id(opponent)
+        s = slice(None) if seasons is None else self.seasons.get_indexer(list(seasons))
+        wins = self.home_wins[s, t, o].sum() + self.away_wins[s, o, t].sum()
+        draws = self.draws[s, t, o].sum() + self.draws[s, o, t].sum()
+        losses = self.away_wins[s, t, o].sum() + self.home_wins[s, o, t].sum()
+        return {
+            'Played': int(wins + draws + losses),
+            'Wins': int(wins),
+            'Draws': int(draws),
+            'Losses': int(losses),
+            'GF': int(self.home_goals[s, t, o].sum() + self.away_goals[s, o, t].sum()),
+            'GA': int(self.away_goals[s, t, o].sum() + self.home_goals[s, o, t].sum()),
+        }
+
+    def _split(self, home_total, away_total):
+        """
+        Home and away totals, where `home_total(array)` sums a fixture array over a team's
+        home fixtures and `away_total(array)` over its away fixtures.
+        """
+        home_wins, home_draws, home_losses = (home_total(a) for a in (self.home_wins, self.draws, self.away_wins))
+        away_wins, away_draws, away_losses = (away_total(a) for a in (self.away_wins, self.draws, self.home_wins))
+        return {
+            'Home Games': home_wins + home_draws + home_losses,
+            'Home Points': 3 * home_wins + home_draws,
+            'Home GF': home_total(self.home_goals),
+            'Home GA': home_total(self.away_goals),
+            'Away Games': away_wins + away_draws + away_losses,
+            'Away Points': 3 * away_wins + away_draws,
+            'Away GF': away_total(self.away_goals),
+            'Away GA': away_total(self.home_goals),
+        }
+
+    def home_away_split(self, team, season):
+        """
+        Games, points and goals for and against at home and away in one season.
+        """
+        s, t = self.season_id(season), self.team_id(team)
+        split = self._split(lambda a: a[s, t].sum(), lambda a: a[s, :, t].sum())
+        return {name: int(value) for name, value in split.items()}
+
+    def home_away_table(self):
+        """
+        (n_seasons, n_teams) arrays of home and away games, points and goals for every team-season.
+        """
+        return self._split(lambda a: a.sum(axis=2, dtype=np.int64), lambda a: a.sum(axis=1, dtype=np.int64))
+
+    def strength_of_schedule(self):
+        """
+        (n_seasons, n_teams) average points per game, over that season, of the opponents each team played.
+        """
+        split = self.home_away_table()
+        games = split['Home Games'] + split['Away Games']
+        points_per_game = np.divide(split['Home Points'] + split['Away Points'], games,
+                                    out=np.zeros(games.shape), where=games > 0)
+        played = (self.home_wins + self.draws + self.away_wins).astype(float)
+        # Home games face the away side's PPG and vice versa
+        opponent_points = (np.einsum('sha,sa->sh', played, points_per_game)
+                           + np.einsum('sha,sh->sa', played, points_per_game))
+        return np.divide(opponent_points, games, out=np.full(games.shape, np.nan), where=games > 0)
+
+    def team_season_table(self):
+        """
+        Home/away splits and strength of schedule for every team-season with matches.
+        """
+        split = self.home_away_table()
+        season_ids, team_ids = np.nonzero(split['Home Games'] + split['Away Games'])
+        table = pd.DataFrame({'Team': self.teams[team_ids], 'Season': self.seasons[season_ids]})
+        for name, values in split.items():
+            table[name] = values[season_ids, team_ids]
+        table['Strength of Schedule'] = self.strength_of_schedule()[season_ids, team_ids]
+        return table
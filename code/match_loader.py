@@ -0,0 +1,80 @@
+"""
+Loader for raw football-data.co.uk season CSVs.
+
+Files are read concurrently, only the columns the pipeline uses are parsed,
+and dates are normalized as each file is read. iter_match_chunks() streams
+the same normalized rows in fixed-size chunks for archives too large to hold
+in memory at once.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pandas as pd
+
+from team_stats import parse_match_dates
+
+# Columns read from every raw file; 'League' is added by the loader
+BASE_COLUMNS = ['Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'FTR']
+
+
+def list_season_files(folder_path):
+    """
+    Season CSVs in `folder_path`, sorted by name (e.g. prem-2021.csv, prem-2122.csv) so the
+    row order does not depend on the filesystem.
+    """
+    return sorted(os.path.join(folder_path, f) for f in os.listdir(folder_path) if f.endswith('.csv'))
+
+
+def column_selector(extra_columns=()):
+    """
+    Returns a usecols callable keeping the base columns plus `extra_columns`,
+    which is either a list of names or a predicate on the column name.
+    """
+    if callable(extra_columns):
+        return lambda column: column in BASE_COLUMNS or extra_columns(column)
+    wanted = set(BASE_COLUMNS) | set(extra_columns)
+    return lambda column: column in wanted
+
+
+def normalize_matches(df, league_name):
+    """
+    Drops rows without teams (football-data files sometimes end in blank lines),
+    parses dates and adds the 'League' column.
+    """
+    df = df.dropna(subset=['HomeTeam', 'AwayTeam'])
+    df['Date'] = parse_match_dates(df['Date'])
+    df['League'] = league_name
+    return df
+
+
+def read_season_file(path, league_name, extra_columns=()):
+    df = pd.read_csv(path, encoding='latin1', usecols=column_selector(extra_columns))
+    return normalize_matches(df, league_name)
+
+
+def load_matches(sources, extra_columns=(), workers=None, use_processes=False):
+    """
+    Loads every season file for each (folder_path, league_name) in `sources`
+    concurrently and concatenates them in folder/file order.
+    """
+    jobs = [(path, league) for folder, league in sources for path in list_season_files(folder)]
+    if not jobs:
+        raise FileNotFoundError(f"No season CSVs found in {[folder for folder, _ in sources]}")
+
+    pool_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with pool_class(max_workers=workers) as pool:
+        # map() yields results in submission order, so row order doesn't depend on scheduling
+        frames = list(pool.map(read_season_file, *zip(*jobs), [extra_columns] * len(jobs)))
+    return pd.concat(frames, ignore_index=True)
+
+
+def iter_match_chunks(sources, chunksize=100_000, extra_columns=()):
+    """
+    Yields normalized matches in chunks of at most `chunksize` rows, one file at a time,
+    so only a single chunk is held in memory.
+    """
+    for folder, league in sources:
+        for path in list_season_files(folder):
+            reader = pd.read_csv(path, encoding='latin1', usecols=column_selector(extra_columns), chunksize=chunksize)
+            for chunk in reader:
+                yield normalize_matches(chunk, league)
@@ -0,0 +1,136 @@
+"""
+Versioned on-disk artifacts for the trained models.
+
+An artifact holds the three fitted forests together with the feature list,
+IMPACT_FACTOR and forest parameters they were trained with. It is keyed by a
+hash of the training data and that configuration, so changing the data or
+the settings gives a different key and a stale artifact is never loaded.
+"""
+import hashlib
+import json
+import os
+import pickle
+
+import pandas as pd
+import sklearn
+
+from compact_forest import compact_models, load_compact_models, save_compact_models
+from prediction_model import (
+    FEATURES, FOREST_PARAMS, IMPACT_FACTOR, LEAGUE, TARGETS, MultiOutputForest, train_models, training_data,
+)
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_dir = os.path.dirname(script_dir)
+models_dir = os.path.join(project_dir, 'models')
+
+ARTIFACT_VERSION = 1
+
+
+def training_hash(train_data, features, targets, impact_factor, forest_params, model_options=None):
+    """
+    Content hash of the training rows and everything that affects the fitted models.
+    """
+    digest = hashlib.sha256()
+    columns = list(features) + list(targets)
+    digest.update(pd.util.hash_pandas_object(train_data[columns], index=False).to_numpy().tobytes())
+    config = {
+        'version': ARTIFACT_VERSION,
+        'features': list(features),
+        'targets': list(targets),
+        'impact_factor': impact_factor,
+        'forest_params': forest_params,
+        'model_options': model_options or {},
+        'sklearn': sklearn.__version__,
+    }
+    digest.update(json.dumps(config, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def artifact_path(data_hash):
+    return os.path.join(models_dir, f'epl_models_v{ARTIFACT_VERSION}_{data_hash[:16]}.pkl')
+
+
+def save_artifact(models, data_hash, features, impact_factor, forest_params, model_options=None):
+    os.makedirs(models_dir, exist_ok=True)
+    artifact = {
+        'version': ARTIFACT_VERSION,
+        'data_hash': data_hash,
+        'features': list(features),
+        'impact_factor': impact_factor,
+        'forest_params': forest_params,
+        'model_options': model_options or {},
+        'models': models,
+    }
+    path = artifact_path(data_hash)
+    # Plain pickle (protocol 5) loads the thousands of small tree arrays several times faster than joblib
+    with open(path, 'wb') as f:
+        pickle.dump(artifact, f, protocol=5)
+    return path
+
+
+def compact_path(data_hash):
+    return os.path.join(models_dir, f'epl_models_v{ARTIFACT_VERSION}_{data_hash[:16]}.compact')
+
+
+def save_compact_artifact(artifact):
+    """
+    Exports an artifact's forests as flat arrays (see compact_forest.py) next to the pickled artifact.
+    """
+    metadata = {k: artifact[k] for k in ('version', 'data_hash', 'features', 'impact_factor', 'forest_params', 'model_options')}
+    path = compact_path(artifact['data_hash'])
+    save_compact_models(compact_models(artifact['models']), path, metadata)
+    return path
+
+
+def load_compact_artifact(data_hash):
+    """
+    Loads the compact, memory-mapped form of an artifact, or returns None if it hasn't been exported.
+    """
+    path = compact_path(data_hash)
+    if not os.path.exists(os.path.join(path, 'meta.json')):
+        return None
+    models, metadata = load_compact_models(path, wrapper_class=MultiOutputForest)
+    if metadata.get('version') != ARTIFACT_VERSION or metadata.get('data_hash') != data_hash:
+        return None
+    return {**metadata, 'models': models}
+
+
+def load_artifact(data_hash):
+    """
+    Loads the artifact trained on data with `data_hash`, or returns None if there isn't one.
+    """
+    path = artifact_path(data_hash)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        artifact = pickle.load(f)
+    if artifact.get('version') != ARTIFACT_VERSION or artifact.get('data_hash') != data_hash:
+        return None
+    return artifact
+
+
+def load_or_train(df, retrain=False, mode='separate', consistent=False, compact=False, league=LEAGUE, features=FEATURES):
+    """
+    Loads the model artifact for the current training data, training and saving it if it is missing or stale.
+    `mode` and `consistent` select the model layout (see prediction_model.train_models).
+    With `compact`, the inference-only compact forests are returned instead, exported on first use.
+    The models are trained on `league` (see prediction_model.training_data), using the `features` columns.
+    """
+    train_data = training_data(df, league=league)
+    model_options = {'mode': mode, 'consistent': consistent}
+    data_hash = training_hash(train_data, features, TARGETS.values(), IMPACT_FACTOR, FOREST_PARAMS, model_options)
+    if compact and not retrain:
+        artifact = load_compact_artifact(data_hash)
+        if artifact is not None:
+            return artifact
+    artifact = None if retrain else load_artifact(data_hash)
+    if artifact is None:
+        print("Training models (no saved models for the current training data)...")
+        models = train_models(train_data, features, mode=mode, consistent=consistent)
+        path = save_artifact(models, data_hash, features, IMPACT_FACTOR, FOREST_PARAMS, model_options)
+        print(f"Models saved to `{path}`")
+        artifact = load_artifact(data_hash)
+    if compact:
+        save_compact_artifact(artifact)
+        artifact = load_compact_artifact(data_hash)
+    return artifact
@@ -0,0 +1,135 @@
+"""
+Bookmaker odds as de-margined implied probabilities.
+
+football-data.co.uk files carry 1X2, over/under 2.5 goals and Asian handicap
+odds from many bookmakers, both when the odds were collected and at kick-off
+(closing odds, where the bookmaker prefix gains a 'C': B365H -> B365CH).
+add_implied_probabilities() turns every bookmaker's odds into probabilities
+with the margin removed, averages them into a consensus per market in one
+vectorized pass, and replaces the ~100 raw odds columns with a few float32
+columns. team_odds_features() aggregates those to team/season features.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from team_stats import build_team_matches
+
+# Market -> outcome suffixes; a bookmaker's odds for a market are its prefix plus each suffix
+MARKETS = {
+    '1x2': ['H', 'D', 'A'],
+    'over_under': ['>2.5', '<2.5'],
+    'asian_handicap': ['AHH', 'AHA'],
+}
+
+# Asian handicap line offered to the home side
+HANDICAP_COLUMNS = {'opening': 'AHh', 'closing': 'AHCh'}
+
+# Best and average prices across bookmakers rather than one bookmaker's book, so left out of the consensus
+# (the averages would count the books they average a second time)
+EXCLUDED_PREFIXES = ('Max', 'BbMx', 'Avg', 'BbAv')
+
+# Consensus columns written per match, for the odds when collected and at kick-off
+MATCH_ODDS_COLUMNS = [
+    f'{prefix}{name}'
+    for prefix in ('odds_', 'odds_closing_')
+    for name in ('home_prob', 'draw_prob', 'away_prob', 'over25_prob', 'ah_home_prob', 'handicap')
+]
+
+TEAM_ODDS_COLUMNS = ['odds_win_prob', 'odds_draw_prob', 'odds_closing_drift', 'odds_expected_margin']
+
+_ODDS_PATTERN = re.compile(r'.+(H|D|A|>2\.5|<2\.5)')
+
+
+def is_odds_column(column):
+    """
+    Whether a raw column holds bookmaker odds or a handicap line (usable as match_loader extra_columns).
+    """
+    return column in HANDICAP_COLUMNS.values() or _ODDS_PATTERN.fullmatch(column) is not None
+
+
+def find_books(columns, market):
+    """
+    Bookmaker prefixes with a complete set of odds for `market`, split into (opening, closing).
+    """
+    suffixes = MARKETS[market]
+    columns = set(columns)
+    prefixes = {column[:-len(suffixes[0])] for column in columns if column.endswith(suffixes[0])}
+    prefixes = sorted(p for p in prefixes if p and all(p + suffix in columns for suffix in suffixes)
+                      and not p.startswith(EXCLUDED_PREFIXES))
+    if market == '1x2':
+        # Asian handicap home/away columns (B365AHH, B365AHA) end in H and A too, but never come with a D
+        prefixes = [p for p in prefixes if not p.endswith('AH')]
+    closing = [p for p in prefixes if p.endswith('C') and p[:-1] in prefixes]
+    opening = [p for p in prefixes if p not in closing]
+    return opening, closing
+
+
+def consensus_probabilities(df, prefixes, suffixes):
+    """
+    Average de-margined probabilities over the bookmakers in `prefixes`: an (n_matches, n_outcomes) float32 array.
+    Bookmakers with a missing price for a match are left out of that match's average.
+    """
+    if not prefixes:
+        return np.full((len(df), len(suffixes)), np.nan, dtype=np.float32)
+    columns = [prefix + suffix for prefix in prefixes for suffix in suffixes]
+    odds = df[columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float32)
+    # Decimal odds are above 1; anything else (e.g. a 0 placeholder) counts as not quoted
+    odds[~(odds > 1)] = np.nan
+    implied = 1 / odds.reshape(len(df), len(prefixes), len(suffixes))  # (matches, books, outcomes)
+    probabilities = implied / implied.sum(axis=2, keepdims=True)
+
+    quoted = ~np.isnan(probabilities).any(axis=2, keepdims=True)
+    total = np.where(quoted, probabilities, 0).sum(axis=1)
+    count = quoted.sum(axis=1)
+    return np.divide(total, count, out=np.full_like(total, np.nan), where=count > 0)
+
+
+def add_implied_probabilities(df):
+    """
+    Replaces the raw odds columns of a match table with the MATCH_ODDS_COLUMNS consensus probabilities.
+    """
+    consensus = {}
+    for stage in ('opening', 'closing'):
+        prefix = 'odds_' if stage == 'opening' else 'odds_closing_'
+        books = {market: find_books(df.columns, market)[stage == 'closing'] for market in MARKETS}
+        home, draw, away = consensus_probabilities(df, books['1x2'], MARKETS['1x2']).T
+        consensus[prefix + 'home_prob'] = home
+        consensus[prefix + 'draw_prob'] = draw
+        consensus[prefix + 'away_prob'] = away
+        consensus[prefix + 'over25_prob'] = consensus_probabilities(df, books['over_under'], MARKETS['over_under'])[:, 0]
+        consensus[prefix + 'ah_home_prob'] = consensus_probabilities(
+            df, books['asian_handicap'], MARKETS['asian_handicap'])[:, 0]
+        handicap = HANDICAP_COLUMNS[stage]
+        consensus[prefix + 'handicap'] = (pd.to_numeric(df[handicap], errors='coerce').to_numpy(dtype=np.float32)
+                                          if handicap in df else np.full(len(df), np.nan, dtype=np.float32))
+
+    df = df.drop(columns=[column for column in df.columns if is_odds_column(column)])
+    return pd.concat([df, pd.DataFrame(consensus, index=df.index)[MATCH_ODDS_COLUMNS]], axis=1)
+
+
+def team_odds_features(df):
+    """
+    Team/season averages of the odds consensus, seen from each team's side:
+    win and draw probability, closing-line drift of the win probability
+    (positive when the market moved towards the team before kick-off) and the
+    goal margin implied by the Asian handicap line.
+    """
+    team_matches = build_team_matches(df)
+    match_row = team_matches['match_row'].to_numpy()
+    is_home = team_matches['is_home'].to_numpy()
+
+    def own_side(home_column, away_column):
+        return np.where(is_home, df[home_column].to_numpy()[match_row], df[away_column].to_numpy()[match_row])
+
+    win_prob = own_side('odds_home_prob', 'odds_away_prob')
+    team_matches['odds_win_prob'] = win_prob
+    team_matches['odds_draw_prob'] = df['odds_draw_prob'].to_numpy()[match_row]
+    team_matches['odds_closing_drift'] = own_side('odds_closing_home_prob', 'odds_closing_away_prob') - win_prob
+    # The handicap is quoted for the home side: -1 means the home side is expected to win by a goal
+    handicap = df['odds_handicap'].to_numpy()[match_row]
+    team_matches['odds_expected_margin'] = np.where(is_home, -handicap, handicap)
+
+    stats = team_matches.groupby(['Team', 'Season'], observed=True)[TEAM_ODDS_COLUMNS].mean().reset_index()
+    return stats.astype({'Team': str, 'Season': str})
@@ -0,0 +1,529 @@
+"""
+Out-of-core mode for steps 01 and 02, for match archives too large to load at once.
+
+Set EPL_MAX_MEMORY_MB (or run the pipeline with `run_pipeline.py --max-memory MB`)
+and 01_data_preprocessing.py and 02_feature_engineering.py stream the matches in
+chunks instead of loading them whole. Chunk sizes come from the ceiling: the
+memory left once the libraries are loaded, divided by the measured size of a row
+times the working copies a chunk needs. The peak RSS is checked after every
+chunk, and a run that passes the ceiling stops with a MemoryError.
+
+Step 01 reads each season file in chunks, converts each chunk's odds and appends
+it to combined_data. Columns that turn out to be empty in every chunk are dropped
+in a second streaming pass.
+
+Step 02 makes two passes over combined_data, reading only the columns it uses:
+1. In file order, it records what the in-memory path derives from the row order
+   (team and season order, and the league each team starts its ratings in), and
+   spills every chunk, sorted by date, to data/cache/out_of_core/.
+2. It merges the sorted runs into one date-ordered stream of chunks, rates each
+   chunk, appends its pre-match ratings to match_ratings and folds it into
+   per-team-season accumulators: results, last-10 form, odds averages, home/away
+   points, preseason ratings and per-season fixture counts for strength of schedule.
+Only one chunk (split across the runs during the merge) and the accumulators,
+whose size grows with the number of team-seasons, are in memory at once. The
+accumulators repeat the in-memory arithmetic in the same order, including the
+compensated summation pandas uses for grouped means, so the outputs are identical
+to the in-memory path.
+
+Tables are appended chunk by chunk, so this mode reads and writes CSV only.
+"""
+import os
+import tempfile
+from contextlib import ExitStack
+
+import numpy as np
+import pandas as pd
+
+from features import SCHEDULE_COLUMNS, division_ratings, team_season_features
+from match_index import match_points
+from match_loader import column_selector, iter_match_chunks, list_season_files
+from odds_features import TEAM_ODDS_COLUMNS, add_implied_probabilities
+from profiling import peak_rss_mb, rss_mb, step
+from ratings import MATCH_RATING_COLUMNS, RatingEngine
+from storage import data_dir, iter_table_chunks, storage_format, table_path, write_table_chunks
+from team_stats import FORM_WINDOW, TEAM_SEASON_COLUMNS, add_season_column
+
+MEMORY_ENV = 'EPL_MAX_MEMORY_MB'
+SAMPLE_ROWS = 1_000  # Rows read to measure the in-memory size of a row
+MIN_CHUNK_ROWS = 1_000
+# Copies of a chunk's in-memory size to allow for: step 02's parsed table, sorted run and side arrays,
+# and, for the wider raw rows of step 01, every bookmaker's odds parsed, converted and reshaped per market
+# plus the allocator holding on to freed parser buffers between files
+WORKING_COPIES = 6
+RAW_WORKING_COPIES = 12
+
+# Match columns step 02 reads; the odds ones are those team_odds_features() uses
+MATCH_COLUMNS = ['Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'FTR', 'League']
+ODDS_COLUMNS = ['odds_home_prob', 'odds_draw_prob', 'odds_away_prob',
+                'odds_closing_home_prob', 'odds_closing_away_prob', 'odds_handicap']
+RESULTS = ['H', 'D', 'A']
+
+# One spilled match: the date and file row are the sort key, names are integer codes
+RUN_DTYPE = np.dtype(
+    [('date', 'i8'), ('row', 'i8'), ('season', 'i4'), ('league', 'i4'), ('home', 'i4'), ('away', 'i4'),
+     ('fthg', 'i8'), ('ftag', 'i8'), ('ftr', 'i1')]
+    + [(column, 'f8') for column in ODDS_COLUMNS]
+)
+
+
+def max_memory_mb():
+    """
+    The memory ceiling in MB from EPL_MAX_MEMORY_MB, or None when the out-of-core mode is off.
+    """
+    value = os.environ.get(MEMORY_ENV, '')
+    return float(value) if value else None
+
+
+class MemoryBudget:
+    """
+    Chunk sizing and enforcement for a process-wide memory ceiling.
+    """
+
+    def __init__(self, max_memory_mb):
+        if storage_format() != 'csv':
+            raise ValueError(f"The out-of-core mode ({MEMORY_ENV}) reads and writes CSV; unset EPL_STORAGE_FORMAT")
+        self.max_memory_mb = max_memory_mb
+        self.available_mb = max_memory_mb - rss_mb()
+        if self.available_mb <= 0:
+            raise ValueError(f"A {max_memory_mb:g} MB ceiling is below the {rss_mb():.0f} MB in use before any data is read")
+
+    def chunk_rows(self, sample, copies=WORKING_COPIES):
+        """
+        Rows per chunk for rows like those of the `sample` DataFrame.
+        """
+        bytes_per_row = sample.memory_usage(deep=True).sum() / max(len(sample), 1)
+        rows = int(self.available_mb * (1 << 20) / (bytes_per_row * copies))
+        if rows < MIN_CHUNK_ROWS:
+            raise ValueError(f"A {self.max_memory_mb:g} MB ceiling leaves room for only {rows} rows per chunk "
+                             f"({bytes_per_row:.0f} bytes per row); raise {MEMORY_ENV}")
+        return rows
+
+    def check(self, where):
+        peak = peak_rss_mb()
+        if peak > self.max_memory_mb:
+            raise MemoryError(f"Peak memory {peak:.0f} MB passed the {self.max_memory_mb:g} MB ceiling {where}")
+
+
+def check_results(chunk):
+    """
+    Matches without a full-time result would change the column types of the in-memory path, so they are refused.
+    """
+    if chunk[['FTHG', 'FTAG', 'FTR']].isna().any().any():
+        raise ValueError("The out-of-core mode expects played matches only; found rows without a full-time result")
+
+
+# --- Step 01 ---
+
+def preprocess_chunked(sources, extra_columns, budget, name='combined_data'):
+    """
+    Step 01 in chunks: loads the season files of `sources`, converts the odds to probabilities,
+    and writes data/<name> without the columns that are empty in every row. Returns (path, rows, columns).
+    """
+    paths = [path for folder, _ in sources for path in list_season_files(folder)]
+    if not paths:
+        raise FileNotFoundError(f"No season CSVs found in {[folder for folder, _ in sources]}")
+    sample = pd.read_csv(paths[0], encoding='latin1', usecols=column_selector(extra_columns), nrows=SAMPLE_ROWS)
+    chunksize = budget.chunk_rows(sample, RAW_WORKING_COPIES)
+
+    columns, non_empty = [], set()
+
+    def converted():
+        for chunk in iter_match_chunks(sources, chunksize, extra_columns):
+            check_results(chunk)
+            chunk = add_implied_probabilities(chunk)
+            if not columns:
+                columns.extend(chunk.columns)
+            elif set(chunk.columns) - set(columns):
+                raise ValueError(f"Columns {sorted(set(chunk.columns) - set(columns))} are missing from the first season file")
+            chunk = chunk.reindex(columns=columns)
+            non_empty.update(chunk.columns[chunk.notna().any()])
+            budget.check('while converting the raw matches')
+            yield chunk
+
+    partial = name + '.partial'
+    with step('load and convert chunks') as timed:
+        partial_path, rows = write_table_chunks(converted(), partial)
+        timed.rows = rows
+
+    # Drop the columns that are empty everywhere, passing the text of the others through unchanged
+    keep = [column for column in columns if column in non_empty]
+    path = table_path(name, 'csv')
+    if keep == columns:
+        os.replace(partial_path, path)
+    else:
+        with step('drop empty columns', rows=rows):
+            write_table_chunks(iter_table_chunks(partial, chunksize, keep, dtype=str, keep_default_na=False), name)
+        os.remove(partial_path)
+    return path, rows, keep
+
+
+# --- Step 02 ---
+
+class Codes:
+    """
+    Interns names to integer codes in order of first appearance.
+    """
+
+    def __init__(self):
+        self.index = {}
+
+    def encode(self, values):
+        codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+        mapping = np.array([self.index.setdefault(value, len(self.index)) for value in uniques], dtype=np.int32)
+        return mapping[codes]
+
+    def names(self):
+        return np.array(list(self.index), dtype=object)
+
+
+class FileOrder:
+    """
+    What the in-memory path takes from the file order of the matches: team, league and season
+    codes, the order teams first appear as the home side, and each team's first home and away
+    match (date, row, league) for its starting rating.
+    """
+
+    def __init__(self):
+        self.teams, self.leagues, self.seasons = Codes(), Codes(), Codes()
+        self.home_order = {}
+        self.first_match = {'home': {}, 'away': {}}
+
+    def encode(self, chunk, first_row):
+        """
+        The chunk (with 'Season' and parsed dates) as a date-sorted run of RUN_DTYPE records.
+        """
+        run = np.empty(len(chunk), dtype=RUN_DTYPE)
+        run['date'] = chunk['Date'].to_numpy(dtype='datetime64[ns]').view('i8')
+        run['row'] = np.arange(first_row, first_row + len(chunk))
+        run['season'] = self.seasons.encode(chunk['Season'])
+        run['league'] = self.leagues.encode(chunk['League'])
+        run['home'] = self.teams.encode(chunk['HomeTeam'])
+        run['away'] = self.teams.encode(chunk['AwayTeam'])
+        run['fthg'] = chunk['FTHG'].to_numpy()
+        run['ftag'] = chunk['FTAG'].to_numpy()
+        run['ftr'] = pd.Categorical(chunk['FTR'], categories=RESULTS).codes
+        for column in ODDS_COLUMNS:
+            run[column] = chunk[column].to_numpy(dtype=float)
+        for code in pd.unique(run['home']).tolist():
+            self.home_order.setdefault(code, len(self.home_order))
+
+        # Rows are already in file order, so a stable sort by date orders by (date, row)
+        run = run[np.argsort(run['date'], kind='stable')]
+        for side in ('home', 'away'):
+            teams, first = np.unique(run[side], return_index=True)
+            seen = self.first_match[side]
+            for team, i in zip(teams.tolist(), first.tolist()):
+                key = (int(run['date'][i]), int(run['row'][i]), int(run['league'][i]))
+                if team not in seen or key < seen[team]:
+                    seen[team] = key
+        return run
+
+    def rating_engine(self, initial_elo, initial_pi):
+        """
+        An engine with every team registered in the order match_ratings() meets them: by first home
+        match in date order, then teams only seen away by first away match, each starting in that match's league.
+        """
+        engine = RatingEngine(initial_elo=initial_elo, initial_pi=initial_pi)
+        names, leagues = self.teams.names(), self.leagues.names()
+        home = self.first_match['home']
+        away_only = {team: key for team, key in self.first_match['away'].items() if team not in home}
+        for first in (home, away_only):
+            teams = sorted(first, key=first.get)
+            engine.team_ids(names[teams], leagues[[first[team][2] for team in teams]])
+        return engine, np.array([engine.team_index[name] for name in names], dtype=np.int64)
+
+
+def spill_sorted_runs(name, chunksize, budget, spill_dir):
+    """
+    Pass 1: reads data/<name> in file order and writes each chunk, sorted by date, as a run in `spill_dir`.
+    Returns the run paths and the FileOrder.
+    """
+    order, paths, rows = FileOrder(), [], 0
+    for chunk in iter_table_chunks(name, chunksize, MATCH_COLUMNS + ODDS_COLUMNS):
+        check_results(chunk)
+        run = order.encode(add_season_column(chunk), rows)
+        rows += len(chunk)
+        paths.append(os.path.join(spill_dir, f'run{len(paths):05d}.npy'))
+        np.save(paths[-1], run)
+        budget.check('while spilling sorted runs')
+    return paths, order
+
+
+def merge_runs(paths, chunksize):
+    """
+    Pass 2: yields the records of the date-sorted runs in (date, row) order, in chunks,
+    holding at most about `chunksize` rows of the runs in memory.
+    """
+    with ExitStack() as stack:
+        # Plain file reads rather than memory maps, whose pages would count towards the RSS
+        files, sizes = [], []
+        for path in paths:
+            f = stack.enter_context(open(path, 'rb'))
+            version = np.lib.format.read_magic(f)
+            read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+            files.append(f)
+            sizes.append(read_header(f)[0][0])
+        per_run = max(1, chunksize // max(len(files), 1))
+        loaded = [0] * len(files)
+        buffers = [np.empty(0, dtype=RUN_DTYPE) for _ in files]
+        while True:
+            for i, f in enumerate(files):
+                if not len(buffers[i]) and loaded[i] < sizes[i]:
+                    buffers[i] = np.fromfile(f, dtype=RUN_DTYPE, count=min(per_run, sizes[i] - loaded[i]))
+                    loaded[i] += len(buffers[i])
+            if not any(len(buffer) for buffer in buffers):
+                return
+            # Rows not loaded yet sort after the last loaded row of their run, so everything up to
+            # the smallest such last row (among runs with rows left on disk) is final
+            bounds = [(buffer['date'][-1], buffer['row'][-1])
+                      for buffer, size, n in zip(buffers, sizes, loaded) if n < size]
+            if bounds:
+                date, row = min(bounds)
+                ready = [(buffer['date'] < date) | ((buffer['date'] == date) & (buffer['row'] <= row))
+                         for buffer in buffers]
+            else:
+                ready = [np.ones(len(buffer), dtype=bool) for buffer in buffers]
+            chunk = np.concatenate([buffer[mask] for buffer, mask in zip(buffers, ready)])
+            buffers = [buffer[~mask] for buffer, mask in zip(buffers, ready)]
+            yield chunk[np.lexsort((chunk['row'], chunk['date']))]
+
+
+def _grow(array, size):
+    if len(array) >= size:
+        return array
+    grown = np.zeros((max(size, 2 * len(array)),) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class TeamSeasonAccumulator:
+    """
+    Per team-season state folded from date-ordered match chunks: what aggregate_team_seasons(),
+    preseason_ratings(), team_odds_features() and MatchIndex.team_season_table() compute from the whole table.
+    """
+
+    INT_FIELDS = ['season', 'team', 'league', 'games', 'wins', 'draws', 'losses', 'goals_for', 'goals_against',
+                  'points', 'seen', 'home_points', 'away_points']
+
+    def __init__(self, n_teams, capacity=1024):
+        self.slots = {}
+        self.n_teams = n_teams
+        self.ints = {name: np.zeros(capacity, dtype=np.int64) for name in self.INT_FIELDS}
+        self.recent = np.zeros((capacity, FORM_WINDOW), dtype=np.int64)
+        self.preseason = np.zeros((capacity, 2))
+        # Compensated (Kahan) sums of the odds features, as pandas computes grouped means
+        self.odds_sum = np.zeros((capacity, len(TEAM_ODDS_COLUMNS)))
+        self.odds_compensation = np.zeros((capacity, len(TEAM_ODDS_COLUMNS)))
+        self.odds_count = np.zeros((capacity, len(TEAM_ODDS_COLUMNS)), dtype=np.int64)
+        self.fixtures = {}  # season -> (n_teams, n_teams) home x away match counts, until the season ends
+        self.strength_of_schedule = {}  # slot -> value, for finished seasons
+
+    def _slot_ids(self, seasons, teams):
+        keys = seasons.astype(np.int64) * self.n_teams + teams
+        uniques, inverse = np.unique(keys, return_inverse=True)
+        new = [key for key in uniques.tolist() if key not in self.slots]
+        for key in new:
+            self.slots[key] = len(self.slots)
+        size = len(self.slots)
+        for name in self.INT_FIELDS:
+            self.ints[name] = _grow(self.ints[name], size)
+        self.recent, self.preseason = _grow(self.recent, size), _grow(self.preseason, size)
+        self.odds_sum, self.odds_compensation = _grow(self.odds_sum, size), _grow(self.odds_compensation, size)
+        self.odds_count = _grow(self.odds_count, size)
+        slots = np.array([self.slots[key] for key in uniques.tolist()], dtype=np.int64)[inverse]
+        return slots, size - len(new)
+
+    def update(self, chunk, pre_match, team_positions):
+        """
+        Folds in a date-ordered chunk of RUN_DTYPE records and its pre-match ratings (match_ratings() columns).
+        `team_positions` maps team codes to MatchIndex team positions.
+        """
+        n = len(chunk)
+        # Both sides of every match, interleaved so each team's sides stay in date order
+        is_home = np.tile([True, False], n)
+        team = np.column_stack([chunk['home'], chunk['away']]).ravel()
+        season = np.repeat(chunk['season'], 2)
+        league = np.repeat(chunk['league'], 2)
+        home_goals, away_goals = np.repeat(chunk['fthg'], 2), np.repeat(chunk['ftag'], 2)
+        goals_for = np.where(is_home, home_goals, away_goals)
+        goals_against = np.where(is_home, away_goals, home_goals)
+        result = np.repeat(chunk['ftr'], 2)
+        wins = np.where(is_home, result == 0, result == 2).astype(np.int64)
+        draws = (result == 1).astype(np.int64)
+        losses = np.where(is_home, result == 2, result == 0).astype(np.int64)
+        points = wins * 3 + draws
+        # MatchIndex scores home/away points from the goals rather than FTR
+        goal_points = match_points(goals_for, goals_against)
+
+        def own_side(home_values, away_values):
+            return np.where(is_home, np.repeat(home_values, 2), np.repeat(away_values, 2))
+
+        win_prob = own_side(chunk['odds_home_prob'], chunk['odds_away_prob'])
+        handicap = np.repeat(chunk['odds_handicap'], 2)
+        odds = np.column_stack([
+            win_prob,
+            np.repeat(chunk['odds_draw_prob'], 2),
+            own_side(chunk['odds_closing_home_prob'], chunk['odds_closing_away_prob']) - win_prob,
+            np.where(is_home, -handicap, handicap),
+        ])
+        elo = own_side(pre_match[:, 0], pre_match[:, 1])
+        pi = (own_side(pre_match[:, 2], pre_match[:, 4]) + own_side(pre_match[:, 3], pre_match[:, 5])) / 2
+
+        slots, n_old = self._slot_ids(season, team)
+        ints = self.ints
+        first_slots, first = np.unique(slots, return_index=True)
+        new = first_slots >= n_old
+        for name, values in (('season', season), ('team', team), ('league', league)):
+            ints[name][first_slots[new]] = values[first[new]]
+        self.preseason[first_slots[new]] = np.column_stack([elo, pi])[first[new]]
+
+        for name, values in (('games', 1), ('wins', wins), ('draws', draws), ('losses', losses),
+                             ('goals_for', goals_for), ('goals_against', goals_against), ('points', points),
+                             ('home_points', np.where(is_home, goal_points, 0)),
+                             ('away_points', np.where(is_home, 0, goal_points))):
+            np.add.at(ints[name], slots, values)
+
+        # Last-N form: a ring buffer of each team-season's latest points
+        occurrence = pd.Series(slots).groupby(slots).cumcount().to_numpy()
+        in_chunk = np.bincount(slots, minlength=len(self.slots))
+        last = occurrence >= in_chunk[slots] - FORM_WINDOW
+        self.recent[slots[last], (ints['seen'][slots] + occurrence)[last] % FORM_WINDOW] = points[last]
+        ints['seen'][:len(in_chunk)] += in_chunk
+
+        # Odds: one compensated-sum step per occurrence, so each team-season adds its values in date order
+        for k in range(occurrence.max() + 1 if n else 0):
+            rows = occurrence == k
+            s, values = slots[rows], odds[rows]
+            valid = ~np.isnan(values)
+            y = values - self.odds_compensation[s]
+            t = self.odds_sum[s] + y
+            compensation = t - self.odds_sum[s] - y
+            compensation[np.isnan(compensation)] = 0
+            self.odds_compensation[s] = np.where(valid, compensation, self.odds_compensation[s])
+            self.odds_sum[s] = np.where(valid, t, self.odds_sum[s])
+            self.odds_count[s] += valid
+
+        for code in np.unique(chunk['season']).tolist():
+            in_season = chunk['season'] == code
+            fixtures = self.fixtures.setdefault(code, np.zeros((len(team_positions),) * 2, dtype=np.int64))
+            np.add.at(fixtures, (team_positions[chunk['home'][in_season]], team_positions[chunk['away'][in_season]]), 1)
+
+    def finish_seasons(self, seasons, team_positions):
+        """
+        Strength of schedule for each finished season in `seasons` (codes), computed like MatchIndex.
+        """
+        n_positions = len(team_positions)
+        for code in seasons:
+            fixtures = self.fixtures.pop(code)
+            slots = np.array([slot for key, slot in self.slots.items() if key // self.n_teams == code], dtype=np.int64)
+            positions = team_positions[self.ints['team'][slots]]
+            home_points, away_points, games = (np.zeros((1, n_positions), dtype=np.int64) for _ in range(3))
+            home_points[0, positions] = self.ints['home_points'][slots]
+            away_points[0, positions] = self.ints['away_points'][slots]
+            games[0, positions] = self.ints['games'][slots]
+
+            points_per_game = np.divide(home_points + away_points, games, out=np.zeros(games.shape), where=games > 0)
+            played = fixtures[None].astype(float)
+            opponent_points = (np.einsum('sha,sa->sh', played, points_per_game)
+                               + np.einsum('sha,sh->sa', played, points_per_game))
+            strength = np.divide(opponent_points, games, out=np.full(games.shape, np.nan), where=games > 0)
+            self.strength_of_schedule.update(zip(slots.tolist(), strength[0, positions].tolist()))
+
+    def tables(self, order):
+        """
+        (team/season stats, preseason ratings, odds features, schedule) for the teams seen at home,
+        ordered season by season (first appearance) and by first appearance as the home side.
+        """
+        ints = self.ints
+        slots = np.array([slot for slot in range(len(self.slots)) if ints['team'][slot] in order.home_order])
+        home_rank = np.array([order.home_order[team] for team in ints['team'][slots].tolist()])
+        slots = slots[np.lexsort((home_rank, ints['season'][slots]))]
+
+        teams, seasons = order.teams.names()[ints['team'][slots]], order.seasons.names()[ints['season'][slots]]
+        engineered = pd.DataFrame({
+            'Team': teams,
+            'Season': seasons,
+            'League': order.leagues.names()[ints['league'][slots]],
+            'Games Played': ints['games'][slots],
+            'Wins': ints['wins'][slots],
+            'Draws': ints['draws'][slots],
+            'Losses': ints['losses'][slots],
+            'Goals Scored': ints['goals_for'][slots],
+            'Goals Conceded': ints['goals_against'][slots],
+            'Points': ints['points'][slots],
+            'Goal Difference': ints['goals_for'][slots] - ints['goals_against'][slots],
+            'Form Points Last 10': self.recent[slots].sum(axis=1),
+        })[TEAM_SEASON_COLUMNS]
+        keys = {'Team': teams, 'Season': seasons}
+        preseason = pd.DataFrame({**keys, 'preseason_elo': self.preseason[slots, 0],
+                                  'preseason_pi': self.preseason[slots, 1]})
+        count = self.odds_count[slots]
+        means = np.divide(self.odds_sum[slots], count, out=np.full(count.shape, np.nan), where=count > 0)
+        odds = pd.DataFrame({**keys, **dict(zip(TEAM_ODDS_COLUMNS, means.T))})
+        schedule = pd.DataFrame({
+            **keys,
+            'Home Points': ints['home_points'][slots],
+            'Away Points': ints['away_points'][slots],
+            'Strength of Schedule': [self.strength_of_schedule[slot] for slot in slots.tolist()],
+        })[SCHEDULE_COLUMNS]
+        return engineered, preseason, odds, schedule
+
+
+def rated_chunks(runs, chunksize, order, engine, engine_ids, accumulator, budget):
+    """
+    Rates the merged date-ordered chunks, folds them into `accumulator` and yields the match_ratings rows.
+    """
+    teams, leagues, seasons = order.teams.names(), order.leagues.names(), order.seasons.names()
+    # MatchIndex orders teams by name
+    team_positions = np.argsort(np.argsort(teams.astype(str), kind='stable'))
+    open_seasons = set()
+    for chunk in merge_runs(runs, chunksize):
+        # Seasons are date ranges, so a season is over once a chunk starts in a later one
+        first_season = seasons[chunk['season'][0]]
+        finished = [code for code in open_seasons if seasons[code] < first_season]
+        accumulator.finish_seasons(finished, team_positions)
+        open_seasons.difference_update(finished)
+        open_seasons.update(np.unique(chunk['season']).tolist())
+
+        pre_match = engine.rate(engine_ids[chunk['home']], engine_ids[chunk['away']], chunk['fthg'], chunk['ftag'])
+        accumulator.update(chunk, pre_match, team_positions)
+        rated = pd.DataFrame({
+            'Date': chunk['date'].view('datetime64[ns]'),
+            'Season': seasons[chunk['season']],
+            'League': leagues[chunk['league']],
+            'HomeTeam': teams[chunk['home']],
+            'AwayTeam': teams[chunk['away']],
+            'FTHG': chunk['fthg'],
+            'FTAG': chunk['ftag'],
+            'FTR': np.array(RESULTS, dtype=object)[chunk['ftr']],
+        })
+        rated[MATCH_RATING_COLUMNS] = pre_match
+        budget.check('while rating and aggregating')
+        yield rated
+    accumulator.finish_seasons(sorted(open_seasons), team_positions)
+
+
+def engineer_features_chunked(budget, name='combined_data', ratings_name='match_ratings',
+                              top_league='Premier League', second_league='Championship', xg_store=None):
+    """
+    Step 02 in bounded memory: the features.engineer_features() output for data/<name>, with the
+    pre-match ratings written to data/<ratings_name> as they are computed. Returns the features.
+    """
+    sample = next(iter_table_chunks(name, SAMPLE_ROWS, MATCH_COLUMNS + ODDS_COLUMNS))
+    chunksize = budget.chunk_rows(sample)
+    spill_root = os.path.join(data_dir, 'cache', 'out_of_core')
+    os.makedirs(spill_root, exist_ok=True)
+
+    with tempfile.TemporaryDirectory(dir=spill_root) as spill_dir:
+        with step('spill sorted runs'):
+            runs, order = spill_sorted_runs(name, chunksize, budget, spill_dir)
+        with step('merge, rate and accumulate') as timed:
+            engine, engine_ids = order.rating_engine(*division_ratings(top_league, second_league))
+            accumulator = TeamSeasonAccumulator(len(order.teams.index))
+            _, rows = write_table_chunks(
+                rated_chunks(runs, chunksize, order, engine, engine_ids, accumulator, budget), ratings_name)
+            timed.rows = rows
+
+    engineered, preseason, odds, schedule = accumulator.tables(order)
+    return team_season_features(engineered, preseason, odds, schedule, top_league, second_league, xg_store)
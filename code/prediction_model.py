@@ -0,0 +1,193 @@
+"""
+Features, training and prediction for the 2025/26 table, shared by
+03_model_training.py and the tools built on top of the trained models.
+"""
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+from profiling import step
+from storage import read_table
+
+IMPACT_FACTOR = 6.0  # Points added to prev_season_points per unit of transfer impact
+PREDICTION_SEASON = '2024/2025'  # Stats from this season are used to predict the next one
+LEAGUE = 'Premier League'  # The league the models are trained on and predict
+
+FEATURES = [
+    'prev_season_gd',
+    'promoted_from_championship',
+    'prev_season_xG_diff',
+    'prev_season_form',
+    'prev_pl_avg_points',
+    'adjusted_prev_points'  # This is the primary point feature now
+]
+
+# Model name -> target column
+TARGETS = {
+    'points': 'Points',
+    'goals_scored': 'Goals Scored',
+    'goals_conceded': 'Goals Conceded',
+}
+
+FOREST_PARAMS = {'n_estimators': 1000, 'max_depth': 25, 'min_samples_leaf': 1, 'random_state': 42}
+
+# 'separate' fits one forest per target; 'multi_output' fits a single forest predicting all targets
+MODEL_MODES = ['separate', 'multi_output']
+MULTI_OUTPUT_MODEL = 'multi_output'
+
+# Only the columns used for training and prediction are loaded
+TRAINING_COLUMNS = [
+    'Team', 'Season', 'League', 'Points', 'Goals Scored', 'Goals Conceded',
+    'prev_season_points', 'prev_season_gd', 'promoted_from_championship',
+    'prev_season_xG_diff', 'prev_season_form', 'prev_pl_avg_points'
+]
+
+PL_25_26_TEAMS = [
+    'Arsenal', 'Man City', 'Liverpool', 'Man United', 'Chelsea', 'Tottenham', 'Aston Villa',
+    'Newcastle', 'West Ham', 'Crystal Palace', 'Brighton', 'Fulham', 'Wolves', 'Everton',
+    'Brentford', 'Bournemouth', "Nott'm Forest",
+    'Leeds', 'Burnley', 'Sunderland'
+]
+
+
+def load_features(name='final_features_complete'):
+    """
+    Loads the engineered features. Historical rows get a transfer impact of 0,
+    so 'adjusted_prev_points' equals 'prev_season_points' for them.
+    """
+    return prepare_features(read_table(name, columns=TRAINING_COLUMNS))
+
+
+def prepare_features(df):
+    """
+    Adds the model inputs derived at load time to an engineered feature table (see load_features).
+    """
+    df = df[[column for column in df.columns if column in TRAINING_COLUMNS]].copy()
+    df['transfer_impact'] = 0
+    df['adjusted_prev_points'] = df['prev_season_points'] + (df['transfer_impact'] * IMPACT_FACTOR)
+    df['promoted_from_championship'] = df['promoted_from_championship'].astype(int)
+    return df
+
+
+def training_data(df, prediction_season=PREDICTION_SEASON, league=LEAGUE):
+    """
+    Team-seasons of `league` (the Premier League by default) before the season used for prediction.
+    """
+    return df[(df['League'] == league) & (df['Season'] != prediction_season)].copy()
+
+
+class MultiOutputForest:
+    """
+    A single Random Forest predicting every target in TARGETS order.
+
+    With `consistent=True`, predictions are projected onto the line
+    Points = intercept + slope * (GF - GA) fitted on the training targets,
+    so predicted points always agree with the predicted goal difference.
+    """
+
+    def __init__(self, consistent=False, **forest_params):
+        self.consistent = consistent
+        self.forest = RandomForestRegressor(**forest_params)
+
+    def fit(self, X, y):
+        y = np.asarray(y, dtype=float)
+        self.forest.fit(X, y)
+        if self.consistent:
+            goal_difference = y[:, 1] - y[:, 2]
+            self.slope, self.intercept = np.polyfit(goal_difference, y[:, 0], 1)
+        return self
+
+    def predict(self, X):
+        y = self.forest.predict(X)
+        if self.consistent:
+            # Orthogonal projection onto the plane Points - slope * GF + slope * GA = intercept
+            normal = np.array([1.0, -self.slope, self.slope])
+            violation = y @ normal - self.intercept
+            y = y - np.outer(violation / (normal @ normal), normal)
+        return y
+
+
+def train_models(train_data, features=FEATURES, mode='separate', consistent=False, **forest_params):
+    """
+    Fits the models for `mode` and returns them keyed by model name: one Random Forest
+    per target, or a single MultiOutputForest under MULTI_OUTPUT_MODEL.
+    """
+    params = {**FOREST_PARAMS, **forest_params}
+    if mode == 'multi_output':
+        model = MultiOutputForest(consistent=consistent, **params)
+        with step(f'fit {MULTI_OUTPUT_MODEL}', rows=len(train_data)):
+            return {MULTI_OUTPUT_MODEL: model.fit(train_data[features], train_data[list(TARGETS.values())])}
+    if mode != 'separate':
+        raise ValueError(f"Unknown model mode '{mode}', expected one of {MODEL_MODES}")
+    models = {}
+    for name, target in TARGETS.items():
+        models[name] = RandomForestRegressor(**params)
+        with step(f'fit {name}', rows=len(train_data)):
+            models[name].fit(train_data[features], train_data[target])
+    return models
+
+
+def prediction_data(df, teams=PL_25_26_TEAMS, prediction_season=PREDICTION_SEASON, league=LEAGUE):
+    """
+    The last season's rows for next season's teams. Teams coming up from the
+    division below `league` (the Championship) are flagged as promoted.
+    """
+    prediction_df = df[df['Season'] == prediction_season].copy()
+    prediction_df = prediction_df[prediction_df['Team'].isin(teams)].copy()
+    prediction_df['promoted_from_championship'] = (prediction_df['League'] != league).astype(int)
+    return prediction_df
+
+
+def apply_transfer_impacts(prediction_df, transfer_impacts, impact_factor=IMPACT_FACTOR):
+    """
+    Sets 'transfer_impact' from a team -> impact mapping (missing teams get 0)
+    and recalculates 'adjusted_prev_points'.
+    """
+    prediction_df = prediction_df.copy()
+    prediction_df['transfer_impact'] = prediction_df['Team'].map(transfer_impacts).fillna(0)
+    prediction_df['adjusted_prev_points'] = prediction_df['prev_season_points'] + (prediction_df['transfer_impact'] * impact_factor)
+    return prediction_df
+
+
+def predict_raw(models, prediction_df, features=FEATURES):
+    """
+    Unrounded predictions for every target, keyed by model name.
+    """
+    X_predict = prediction_df[features]
+    if MULTI_OUTPUT_MODEL in models:
+        predicted = models[MULTI_OUTPUT_MODEL].predict(X_predict)
+        return {name: predicted[:, i] for i, name in enumerate(TARGETS)}
+    return {name: model.predict(X_predict) for name, model in models.items()}
+
+
+def league_table(teams, predicted_points, predicted_goals_scored, predicted_goals_conceded):
+    """
+    Builds the sorted predicted league table, indexed by position.
+    """
+    table = pd.DataFrame({
+        'Team': np.asarray(teams),
+        'Predicted Points': np.asarray(predicted_points).round(0),
+        'Predicted GF': np.asarray(predicted_goals_scored).round(0),
+        'Predicted GA': np.asarray(predicted_goals_conceded).round(0),
+    })
+    table['Predicted GD'] = table['Predicted GF'] - table['Predicted GA']
+    table = table.sort_values(by=['Predicted Points', 'Predicted GD'], ascending=[False, False])
+    table = table.reset_index(drop=True)
+    table.index = table.index + 1
+    table.index.name = 'Position'
+    return table
+
+
+def predict_table(models, prediction_df, features=FEATURES):
+    predictions = predict_raw(models, prediction_df, features)
+    return league_table(prediction_df['Team'], predictions['points'],
+                        predictions['goals_scored'], predictions['goals_conceded'])
+
+
+def read_transfer_scores(path):
+    """
+    Reads team -> transfer impact from a CSV like 'data/transfer score.csv'.
+    """
+    scores = pd.read_csv(path)
+    rating_column = 'Transfer Impact Rating' if 'Transfer Impact Rating' in scores else 'transfer_impact'
+    return dict(zip(scores['Team'], pd.to_numeric(scores[rating_column])))
@@ -0,0 +1,269 @@
+"""
+Local HTTP prediction service.
+
+Loads the trained models once and serves predicted tables over HTTP, using
+only asyncio from the standard library. Requests arriving while a batch is
+being predicted are queued and predicted together in one batched call (see
+scenarios.evaluate_scenarios), and tables for recently seen transfer-impact
+vectors are served from an LRU cache.
+
+Usage:
+    python code/prediction_service.py --port 8000 [--compact]
+
+    POST /predict   {"transfer_impacts": {"Arsenal": 5, "Chelsea": -2}}   (missing teams get 0;
+                    impacts must be finite numbers and are clipped to -10..10)
+                    -> {"table": [{"Position": 1, "Team": ..., "Predicted Points": ...}, ...]}
+    GET  /health    -> {"status": "ok", "batches": ..., "cache_hits": ...}
+"""
+import argparse
+import asyncio
+import json
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+from model_store import load_or_train
+from prediction_model import load_features, prediction_data
+from scenarios import evaluate_scenarios, scenario_tables
+
+MAX_BATCH = 256  # Scenarios predicted per call
+BATCH_WINDOW = 0.002  # Seconds to wait for more requests once the first one of a batch arrives
+CACHE_SIZE = 4096  # Tables kept in the LRU cache
+MAX_BODY = 1 << 20
+IMPACT_RANGE = (-10, 10)  # Transfer impacts are clipped to the rating range
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+               500: 'Internal Server Error'}
+
+
+class BadRequest(Exception):
+    pass
+
+
+class TablePredictor:
+    """
+    Predicts tables for transfer-impact vectors, batching concurrent requests and caching results.
+    """
+
+    def __init__(self, artifact, prediction_df, max_batch=MAX_BATCH, batch_window=BATCH_WINDOW,
+                 cache_size=CACHE_SIZE):
+        self.artifact = artifact
+        self.prediction_df = prediction_df
+        self.teams = prediction_df['Team'].tolist()
+        self.team_index = {team: i for i, team in enumerate(self.teams)}
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.queue = asyncio.Queue()
+        self.stats = {'requests': 0, 'cache_hits': 0, 'batches': 0, 'predicted': 0}
+
+    def impact_vector(self, transfer_impacts):
+        if not isinstance(transfer_impacts, dict):
+            raise BadRequest("'transfer_impacts' must be an object mapping team to impact")
+        unknown = set(transfer_impacts) - set(self.team_index)
+        if unknown:
+            raise BadRequest(f"Unknown teams: {sorted(unknown)}")
+        impacts = np.zeros(len(self.teams))
+        for team, impact in transfer_impacts.items():
+            if isinstance(impact, bool) or not isinstance(impact, (int, float)):
+                raise BadRequest(f"Impact for {team} must be a number")
+            # json.loads accepts NaN and Infinity, which the forests would predict from without complaint
+            if not math.isfinite(impact):
+                raise BadRequest(f"Impact for {team} must be finite")
+            impacts[self.team_index[team]] = impact
+        return np.clip(impacts, *IMPACT_RANGE)
+
+    async def predict(self, transfer_impacts):
+        impacts = self.impact_vector(transfer_impacts)
+        key = impacts.tobytes()
+        self.stats['requests'] += 1
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.stats['cache_hits'] += 1
+            return self.cache[key]
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((key, impacts, future))
+        return await future
+
+    async def run(self):
+        """
+        Batching loop: takes the first queued request, waits up to batch_window for more,
+        and predicts every distinct impact vector in the batch in one call.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0 and self.queue.empty():
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), max(timeout, 0)))
+                except asyncio.TimeoutError:
+                    break
+
+            # Identical vectors in the same batch (or cached while queued) are predicted once.
+            # Tables are handed back from `results`: storing them may evict others of the same batch from the LRU.
+            results, pending = {}, {}
+            for key, impacts, _ in batch:
+                if key in self.cache:
+                    results[key] = self.cache[key]
+                else:
+                    pending.setdefault(key, impacts)
+            try:
+                if pending:
+                    tables = await loop.run_in_executor(None, self.predict_tables, list(pending.values()))
+                    self.stats['batches'] += 1
+                    self.stats['predicted'] += len(pending)
+                    results.update(zip(pending, tables))
+                    for key, table in zip(pending, tables):
+                        self.remember(key, table)
+                for key, _, future in batch:
+                    if not future.done():
+                        future.set_result(results[key])
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def predict_tables(self, impact_vectors):
+        """
+        Sorted tables (lists of row dicts) for a batch of impact vectors. Runs in a worker thread.
+        """
+        predictions = evaluate_scenarios(self.artifact, self.prediction_df, np.array(impact_vectors))
+        tables = scenario_tables(np.arange(len(impact_vectors)), self.teams, predictions).drop(columns='Scenario')
+        records = tables.to_dict('records')
+        n_teams = len(self.teams)
+        return [records[i * n_teams:(i + 1) * n_teams] for i in range(len(impact_vectors))]
+
+    def remember(self, key, table):
+        self.cache[key] = table
+        self.cache.move_to_end(key)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+
+async def read_request(reader):
+    """
+    Reads one HTTP/1.1 request. Returns (method, path, headers, body), or None when the client closed the connection.
+    """
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, path, _ = request_line.decode('latin1').split(' ', 2)
+    except ValueError:
+        raise BadRequest("Malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise BadRequest("Malformed Content-Length header")
+    if length < 0:
+        raise BadRequest("Malformed Content-Length header")
+    if length > MAX_BODY:
+        raise BadRequest("Request body too large")
+    body = await reader.readexactly(length) if length else b''
+    return method, path, headers, body
+
+
+def http_response(status, payload, keep_alive=True):
+    body = json.dumps(payload).encode()
+    head = (f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode() + body
+
+
+async def handle(predictor, method, path, body):
+    if path == '/health':
+        return 200, {'status': 'ok', **predictor.stats, 'cached_tables': len(predictor.cache)}
+    if path != '/predict':
+        return 404, {'error': f"No route for {path}"}
+    if method != 'POST':
+        return 405, {'error': "Use POST for /predict"}
+    try:
+        request = json.loads(body or b'{}')
+    except ValueError:
+        raise BadRequest("Body is not valid JSON")
+    if not isinstance(request, dict):
+        raise BadRequest("Body must be a JSON object")
+    return 200, {'table': await predictor.predict(request.get('transfer_impacts', {}))}
+
+
+def connection_handler(predictor):
+    async def serve_connection(reader, writer):
+        try:
+            while True:
+                keep_alive = True
+                try:
+                    request = await read_request(reader)
+                    if request is None:
+                        break
+                    method, path, headers, body = request
+                    keep_alive = headers.get('connection', '').lower() != 'close'
+                    status, payload = await handle(predictor, method, path, body)
+                except BadRequest as e:
+                    status, payload, keep_alive = 400, {'error': str(e)}, False
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception as e:
+                    # e.g. a failed batch prediction, which every request of the batch receives
+                    status, payload, keep_alive = 500, {'error': f"{type(e).__name__}: {e}"}, False
+                writer.write(http_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    return serve_connection
+
+
+async def serve(host, port, predictor):
+    batcher = asyncio.create_task(predictor.run())
+    server = await asyncio.start_server(connection_handler(predictor), host, port)
+    print(f"Serving predictions on http://{host}:{port} (POST /predict, GET /health)", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batcher.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--compact', action='store_true', help='Serve from the flat-array forests (see compact_forest.py)')
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH)
+    parser.add_argument('--batch-window', type=float, default=BATCH_WINDOW * 1000, help='Milliseconds')
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE)
+    args = parser.parse_args()
+
+    # --- Load the models once; they stay in memory for every request ---
+    df = load_features()
+    artifact = load_or_train(df, compact=args.compact)
+    predictor = TablePredictor(artifact, prediction_data(df), args.max_batch, args.batch_window / 1000, args.cache_size)
+    # Warm-up call so the first request doesn't pay for lazy initialisation
+    predictor.predict_tables([np.zeros(len(predictor.teams))])
+
+    try:
+        asyncio.run(serve(args.host, args.port, predictor))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
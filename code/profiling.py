@@ -0,0 +1,233 @@
+"""
+Per-step instrumentation for the pipeline scripts.
+
+Off by default. Set EPL_PROFILE=1 (or a file path), or run the pipeline with
+`run_pipeline.py --profile`, and every `with step('name'):` block appends one
+JSON line with its wall time, CPU time, RSS and row count to
+data/cache/profile.jsonl (or the given path). 'rss_mb' is the resident set
+size when the step ends and 'rss_growth_mb' its change over the step;
+'process_peak_rss_mb' is the process high-water mark so far, so it covers
+every earlier step as well, not just this one. Each script also records a
+'(script)' line with its totals when it exits (its wall time counts from
+when profiling was first imported). Reading and writing tables in
+storage.py are steps too.
+
+Set EPL_PROFILE_CPROFILE to a step name to also dump a cProfile of that step
+to data/cache/profile/<script>.<step>.prof (characters other than letters,
+digits, '.' and '-' become '_'); open it with `python -m pstats`,
+snakeviz, or flameprof for a flamegraph.
+
+When profiling is off, step() returns a shared no-op context manager.
+
+Usage:
+    EPL_PROFILE=1 python code/02_feature_engineering.py
+    python code/profiling.py                  # summary of the last profiled run
+    python code/profiling.py --compare        # ... against the run before it
+"""
+import argparse
+import atexit
+import cProfile
+import json
+import os
+import re
+import resource
+import sys
+import time
+import uuid
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_dir = os.path.dirname(script_dir)
+data_dir = os.path.join(project_dir, 'data')
+
+PROFILE_ENV = 'EPL_PROFILE'
+CPROFILE_ENV = 'EPL_PROFILE_CPROFILE'
+RUN_ENV = 'EPL_PROFILE_RUN'  # Shared run id, so the stages of one run_pipeline.py call group together
+DEFAULT_LOG = os.path.join(data_dir, 'cache', 'profile.jsonl')
+CPROFILE_DIR = os.path.join(data_dir, 'cache', 'profile')
+
+SCRIPT_STEP = '(script)'
+
+
+def log_path():
+    """
+    Where records go, or None when profiling is off.
+    """
+    value = os.environ.get(PROFILE_ENV, '')
+    if value.lower() in ('', '0', 'false', 'off'):
+        return None
+    return DEFAULT_LOG if value.lower() in ('1', 'true', 'on') else os.path.abspath(value)
+
+
+_LOG = log_path()
+_CPROFILE_STEP = os.environ.get(CPROFILE_ENV) if _LOG else None
+_RUN = os.environ.get(RUN_ENV) or uuid.uuid4().hex[:12]
+_SCRIPT = os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else 'python'
+
+
+def enabled():
+    return _LOG is not None
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1 << 20 if sys.platform == 'darwin' else 1 << 10
+    return resource.getrusage(who).ru_maxrss / scale
+
+
+def rss_mb():
+    """
+    Current resident set size; falls back to the peak where /proc is not available.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1 << 20)
+    except OSError:
+        return peak_rss_mb()
+
+
+def cpu_seconds(who=resource.RUSAGE_SELF):
+    usage = resource.getrusage(who)
+    return usage.ru_utime + usage.ru_stime
+
+
+def write_record(record, path=None):
+    path = path or _LOG
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+
+class Step:
+    """
+    Times one step. Set `rows` inside the block (or pass it) to record how many rows it handled.
+    """
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self.profiler = cProfile.Profile() if self.name == _CPROFILE_STEP else None
+        self.rss_before = rss_mb()
+        self.cpu_start = time.process_time()
+        self.wall_start = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self.profiler is not None:
+            self.profiler.disable()
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        rss = rss_mb()
+        if self.profiler is not None:
+            os.makedirs(CPROFILE_DIR, exist_ok=True)
+            name = re.sub(r'[^\w.-]+', '_', f"{os.path.splitext(_SCRIPT)[0]}.{self.name}")
+            self.profiler.dump_stats(os.path.join(CPROFILE_DIR, name + '.prof'))
+        write_record({
+            'run': _RUN, 'time': time.time(), 'script': _SCRIPT, 'step': self.name,
+            'wall_s': round(wall, 6), 'cpu_s': round(cpu, 6),
+            'rss_mb': round(rss, 1), 'rss_growth_mb': round(rss - self.rss_before, 1),
+            'process_peak_rss_mb': round(peak_rss_mb(), 1),
+            'rows': None if self.rows is None else int(self.rows),
+            'ok': exc[0] is None,
+        })
+        return False
+
+
+class _NoStep:
+    """
+    Step used when profiling is off. It is shared, so setting `rows` on it is ignored.
+    """
+    rows = property(lambda self: None, lambda self, rows: None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_STEP = _NoStep()
+
+
+def step(name, rows=None):
+    """
+    Context manager timing the enclosed block as step `name` when profiling is on.
+    """
+    if _LOG is None:
+        return _NO_STEP
+    return Step(name, rows)
+
+
+def _record_script():
+    write_record({
+        'run': _RUN, 'time': time.time(), 'script': _SCRIPT, 'step': SCRIPT_STEP,
+        'wall_s': round(time.perf_counter() - _WALL_START, 6), 'cpu_s': round(cpu_seconds(), 6),
+        'rss_mb': round(rss_mb(), 1), 'rss_growth_mb': None, 'process_peak_rss_mb': round(peak_rss_mb(), 1),
+        'rows': None, 'ok': True,
+    })
+
+
+_WALL_START = time.perf_counter()
+if _LOG is not None and _SCRIPT != os.path.basename(__file__):
+    atexit.register(_record_script)
+
+
+def read_records(path=DEFAULT_LOG):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(records):
+    """
+    Wall time, CPU time, RSS and rows per (script, step), summed over repeated steps, in first-seen order.
+    'rss_mb' is the largest RSS at the end of a call and 'process_peak_rss_mb' the process high-water mark.
+    """
+    summary = {}
+    for record in records:
+        key = (record['script'], record['step'])
+        entry = summary.setdefault(key, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'rss_mb': 0.0,
+                                         'process_peak_rss_mb': 0.0, 'rows': None})
+        entry['calls'] += 1
+        entry['wall_s'] += record['wall_s']
+        entry['cpu_s'] += record['cpu_s']
+        # Older records only have 'peak_rss_mb', the process high-water mark
+        process_peak = record.get('process_peak_rss_mb', record.get('peak_rss_mb', 0.0))
+        entry['rss_mb'] = max(entry['rss_mb'], record.get('rss_mb', process_peak))
+        entry['process_peak_rss_mb'] = max(entry['process_peak_rss_mb'], process_peak)
+        if record['rows'] is not None:
+            entry['rows'] = (entry['rows'] or 0) + record['rows']
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('log', nargs='?', default=DEFAULT_LOG, help='Profile log (default: %(default)s)')
+    parser.add_argument('--compare', action='store_true', help='Show the change in wall time against the previous run')
+    args = parser.parse_args()
+
+    records = read_records(args.log) if os.path.exists(args.log) else []
+    if not records:
+        print(f"No profile records in `{args.log}`; run with `run_pipeline.py --profile` or EPL_PROFILE=1 first")
+        return
+    runs = list(dict.fromkeys(record['run'] for record in records))
+    current = summarize(r for r in records if r['run'] == runs[-1])
+    previous = summarize(r for r in records if r['run'] == runs[-2]) if args.compare and len(runs) > 1 else {}
+
+    print(f"Run {runs[-1]} ({len(runs)} runs in {args.log})")
+    print(f"{'script':<28} {'step':<32} {'calls':>5} {'wall s':>9} {'cpu s':>9} {'RSS MB':>8} {'proc peak':>9} "
+          f"{'rows':>9}" + (f" {'vs prev':>8}" if args.compare else ''))
+    for (script, name), entry in current.items():
+        line = (f"{script:<28} {name:<32} {entry['calls']:>5} {entry['wall_s']:>9.3f} {entry['cpu_s']:>9.3f} "
+                f"{entry['rss_mb']:>8.1f} {entry['process_peak_rss_mb']:>9.1f} "
+                f"{'' if entry['rows'] is None else entry['rows']:>9}")
+        if args.compare:
+            before = previous.get((script, name))
+            line += f" {entry['wall_s'] / before['wall_s'] - 1:>+8.0%}" if before and before['wall_s'] else f" {'':>8}"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Elo and pi team ratings over the whole match history.
+
+The engine walks matches once in date order and keeps every rating in flat
+NumPy arrays indexed by an integer team id, so the cost is linear in the
+number of matches and an engine can be saved and fed new matches later.
+
+Premier League and Championship teams share one rating scale: a team's
+rating moves with it on promotion or relegation, and teams first seen in the
+Championship start below teams first seen in the Premier League. Other
+leagues pass their own starting ratings per division.
+
+- Elo: one rating per team, with home advantage and a goal-difference multiplier.
+- Pi (Constantinou & Fenton, 2013): a home and an away rating per team in
+  goal-difference units, each updated from the error of the expected goal difference.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from team_stats import build_team_matches
+
+ELO_K = 20
+ELO_HOME_ADVANTAGE = 60
+INITIAL_ELO = {'Premier League': 1500.0, 'Championship': 1350.0}
+
+PI_LEARNING_RATE = 0.035  # lambda: how fast ratings follow the goal-difference error
+PI_CROSS_RATE = 0.7  # gamma: how much a home result moves the away rating and vice versa
+PI_BASE, PI_SCALE = 10, 3
+INITIAL_PI = {'Premier League': 0.0, 'Championship': -0.5}
+
+# Per-match columns written by match_ratings(): ratings each side carried into the match
+MATCH_RATING_COLUMNS = ['home_elo', 'away_elo', 'home_pi_home', 'home_pi_away', 'away_pi_home', 'away_pi_away']
+
+
+def pi_goal_difference(rating):
+    """
+    Expected goal difference against an average team for a pi rating.
+    """
+    return math.copysign(PI_BASE ** (abs(rating) / PI_SCALE) - 1, rating)
+
+
+class RatingEngine:
+    """
+    Ratings of every team seen so far. Pickle it to carry the ratings over to a later run.
+    """
+
+    def __init__(self, capacity=64, initial_elo=None, initial_pi=None):
+        """
+        `initial_elo` and `initial_pi` map league -> starting rating (default: INITIAL_ELO and INITIAL_PI).
+        Teams first seen in a league not in the mapping start at its lowest rating.
+        """
+        self.initial_elo = INITIAL_ELO if initial_elo is None else initial_elo
+        self.initial_pi = INITIAL_PI if initial_pi is None else initial_pi
+        self.team_index = {}
+        self.elo = np.zeros(capacity)
+        self.pi_home = np.zeros(capacity)
+        self.pi_away = np.zeros(capacity)
+
+    def team_ids(self, teams, leagues):
+        """
+        Integer ids for `teams`, adding (and initialising by league) teams not seen before.
+        """
+        ids = np.empty(len(teams), dtype=np.int64)
+        for i, (team, league) in enumerate(zip(teams, leagues)):
+            team_id = self.team_index.get(team)
+            if team_id is None:
+                team_id = self.team_index[team] = len(self.team_index)
+                if team_id == len(self.elo):
+                    for name in ('elo', 'pi_home', 'pi_away'):
+                        setattr(self, name, np.resize(getattr(self, name), 2 * team_id))
+                self.elo[team_id] = self.initial_elo.get(league, min(self.initial_elo.values()))
+                self.pi_home[team_id] = self.pi_away[team_id] = self.initial_pi.get(league, min(self.initial_pi.values()))
+            ids[i] = team_id
+        return ids
+
+    def rate(self, home_ids, away_ids, home_goals, away_goals):
+        """
+        Updates the ratings with matches given in date order. Returns the pre-match
+        ratings as an (n_matches, 6) array in MATCH_RATING_COLUMNS order.
+        """
+        elo, pi_home, pi_away = self.elo, self.pi_home, self.pi_away
+        pre_match = np.empty((len(home_ids), len(MATCH_RATING_COLUMNS)))
+        for i, (home, away, scored, conceded) in enumerate(zip(home_ids.tolist(), away_ids.tolist(),
+                                                                home_goals.tolist(), away_goals.tolist())):
+            pre_match[i] = elo[home], elo[away], pi_home[home], pi_away[home], pi_home[away], pi_away[away]
+
+            # Elo
+            goal_difference = scored - conceded
+            expected = 1 / (1 + 10 ** ((elo[away] - elo[home] - ELO_HOME_ADVANTAGE) / 400))
+            result = 1.0 if goal_difference > 0 else 0.5 if goal_difference == 0 else 0.0
+            margin = abs(goal_difference)
+            multiplier = 1.0 if margin <= 1 else 1.5 if margin == 2 else (11 + margin) / 8
+            change = ELO_K * multiplier * (result - expected)
+            elo[home] += change
+            elo[away] -= change
+
+            # Pi
+            expected_difference = pi_goal_difference(pi_home[home]) - pi_goal_difference(pi_away[away])
+            error = goal_difference - expected_difference
+            weighted_error = math.copysign(PI_SCALE * math.log10(1 + abs(error)), error)
+            home_change = weighted_error * PI_LEARNING_RATE
+            pi_home[home] += home_change
+            pi_away[home] += home_change * PI_CROSS_RATE
+            pi_away[away] -= home_change
+            pi_home[away] -= home_change * PI_CROSS_RATE
+        return pre_match
+
+    def ratings(self):
+        """
+        Current ratings, one row per team.
+        """
+        n_teams = len(self.team_index)
+        return pd.DataFrame({
+            'Team': list(self.team_index),
+            'elo': self.elo[:n_teams],
+            'pi_home': self.pi_home[:n_teams],
+            'pi_away': self.pi_away[:n_teams],
+            'pi': (self.pi_home[:n_teams] + self.pi_away[:n_teams]) / 2,
+        })
+
+
+def match_ratings(df, engine=None):
+    """
+    Rates the matches in `df` (with a 'Season' column and parsed dates) in date
+    order, ties keeping the row order. Returns the matches with the pre-match
+    ratings of both sides, in date order, and the engine, which can be passed
+    back in with later matches.
+    """
+    engine = RatingEngine() if engine is None else engine
+    df = df.iloc[np.argsort(df['Date'].to_numpy(), kind='stable')]
+    home_ids = engine.team_ids(df['HomeTeam'].to_numpy(), df['League'].to_numpy())
+    away_ids = engine.team_ids(df['AwayTeam'].to_numpy(), df['League'].to_numpy())
+    pre_match = engine.rate(home_ids, away_ids, df['FTHG'].to_numpy(), df['FTAG'].to_numpy())
+
+    rated = df[['Date', 'Season', 'League', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'FTR']].reset_index(drop=True)
+    rated[MATCH_RATING_COLUMNS] = pre_match
+    return rated, engine
+
+
+def preseason_ratings(rated):
+    """
+    Each team's Elo and pi rating going into every season it played, from match_ratings() output.
+    """
+    team_matches = build_team_matches(rated)
+    match_row = team_matches['match_row'].to_numpy()
+    is_home = team_matches['is_home'].to_numpy()
+
+    def own_side(column):
+        return np.where(is_home, rated['home_' + column].to_numpy()[match_row],
+                        rated['away_' + column].to_numpy()[match_row])
+
+    team_matches['preseason_elo'] = own_side('elo')
+    team_matches['preseason_pi'] = (own_side('pi_home') + own_side('pi_away')) / 2
+
+    # Rows are date-sorted within each team-season, so the first row is the pre-season rating
+    first = team_matches.groupby(['Team', 'Season'], observed=True).head(1)
+    return first[['Team', 'Season', 'preseason_elo', 'preseason_pi']].astype({'Team': str, 'Season': str})
@@ -0,0 +1,203 @@
+"""
+Incremental pipeline runner.
+
+Each stage declares the files it reads and writes. Inputs are content-hashed
+and recorded in data/cache/pipeline_manifest.json after a successful run; on
+the next run a stage is skipped if its inputs (including its own script) and
+outputs are unchanged. Stages without outputs (the interactive prediction)
+always run.
+
+Usage:
+    python code/run_pipeline.py                  # preprocess -> features -> train
+    python code/run_pipeline.py --stages features
+    python code/run_pipeline.py --force
+    python code/run_pipeline.py --force --profile [--cprofile "team/season aggregation"]
+    python code/run_pipeline.py --max-memory 500     # stream steps 01-02 within 500 MB
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import uuid
+
+import profiling
+import storage
+from out_of_core import MEMORY_ENV
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_dir = os.path.dirname(script_dir)
+# The manifest lives in the data directory (data/, or EPL_DATA_DIR), so each data directory has its own
+manifest_path = os.path.join(storage.data_dir, 'cache', 'pipeline_manifest.json')
+# Step 02's per-season team/season stats (see team_stats.aggregate_team_seasons); cleared by --force
+team_season_cache = os.path.join(storage.data_dir, 'cache', 'team_seasons')
+
+# Paths are relative to the project directory; inputs may be glob patterns.
+# 'data:<path>' is relative to the data directory (data/, or EPL_DATA_DIR) and
+# 'table:<name>' refers to an intermediate dataset there, stored in the EPL_STORAGE_FORMAT format.
+STAGES = {
+    'preprocess': {
+        'script': 'code/01_data_preprocessing.py',
+        'inputs': ['data:premier_league/*.csv', 'data:championship/*.csv', 'code/match_loader.py',
+                   'code/odds_features.py', 'code/team_stats.py', 'code/storage.py', 'code/profiling.py',
+                   'code/out_of_core.py'],
+        'outputs': ['table:combined_data'],
+    },
+    'features': {
+        'script': 'code/02_feature_engineering.py',
+        'inputs': ['table:combined_data', 'code/features.py', 'code/team_stats.py', 'code/ratings.py',
+                   'code/odds_features.py', 'code/match_index.py', 'code/xg_store.py', 'data:xg_*.csv',
+                   'code/storage.py', 'code/profiling.py', 'code/out_of_core.py'],
+        'outputs': ['table:final_features_complete', 'table:match_ratings'],
+    },
+    'xg_features': {
+        'script': 'code/02b_add_xg_features.py',
+        'inputs': ['table:final_features_with_form', 'code/xg_store.py', 'data:xg_*.csv'],
+        'outputs': ['table:final_features_with_xg'],
+    },
+    'xg_merge': {
+        'script': 'code/02c_final_data_merge.py',
+        'inputs': ['table:final_features_with_form', 'code/xg_store.py', 'data:xg_*.csv'],
+        'outputs': ['table:final_features_complete'],
+    },
+    'train': {
+        'script': 'code/03_model_training.py',
+        'inputs': ['table:final_features_complete', 'code/prediction_model.py', 'code/model_store.py',
+                   'code/compact_forest.py'],
+        'outputs': [],
+    },
+}
+
+# 02b/02c are the older xG merge path from final_features_with_form.csv and are only run on request
+DEFAULT_STAGES = ['preprocess', 'features', 'train']
+
+
+def load_manifest():
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            return json.load(f)
+    return {'files': {}, 'stages': {}}
+
+
+def save_manifest(manifest):
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def file_hash(path, manifest):
+    """
+    SHA-256 of a file. The hash is reused from the manifest while the file's size and mtime are unchanged.
+    """
+    stat = os.stat(os.path.join(project_dir, path))
+    cached = manifest['files'].get(path)
+    if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+        return cached['sha256']
+
+    digest = hashlib.sha256()
+    with open(os.path.join(project_dir, path), 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    manifest['files'][path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+    return digest.hexdigest()
+
+
+def resolve(path, is_input):
+    """
+    Maps 'data:<path>' to its path in the data directory and 'table:<name>' to the file it is stored in.
+    Table inputs fall back to the CSV copy, as storage.read_table() does.
+    """
+    if path.startswith('data:'):
+        return os.path.relpath(os.path.join(storage.data_dir, path[len('data:'):]), project_dir)
+    if not path.startswith('table:'):
+        return path
+    name = path[len('table:'):]
+    table_file = storage.table_path(name)
+    if is_input and not os.path.exists(table_file):
+        table_file = storage.table_path(name, 'csv')
+    return os.path.relpath(table_file, project_dir)
+
+
+def expand(patterns):
+    paths = []
+    for pattern in patterns:
+        pattern = resolve(pattern, is_input=True)
+        matches = sorted(glob.glob(os.path.join(project_dir, pattern)))
+        paths += [os.path.relpath(p, project_dir) for p in matches]
+    return paths
+
+
+def stage_state(stage, manifest):
+    """
+    Hashes of a stage's script and inputs, and of its outputs (None for missing outputs).
+    """
+    inputs = expand([stage['script']] + stage['inputs'])
+    outputs = [resolve(path, is_input=False) for path in stage['outputs']]
+    return (
+        {path: file_hash(path, manifest) for path in inputs},
+        {path: file_hash(path, manifest) if os.path.exists(os.path.join(project_dir, path)) else None
+         for path in outputs},
+    )
+
+
+def is_up_to_date(name, stage, manifest):
+    if not stage['outputs']:
+        return False
+    recorded = manifest['stages'].get(name)
+    if recorded is None:
+        return False
+    inputs, outputs = stage_state(stage, manifest)
+    return recorded['inputs'] == inputs and recorded['outputs'] == outputs
+
+
+def run_stage(name, stage, manifest):
+    print(f"--- Running {name} ({stage['script']}) ---")
+    subprocess.run([sys.executable, os.path.join(project_dir, stage['script'])], cwd=project_dir, check=True)
+    inputs, outputs = stage_state(stage, manifest)
+    manifest['stages'][name] = {'inputs': inputs, 'outputs': outputs}
+    save_manifest(manifest)
+
+
+def run(stage_names, force=False):
+    if profiling.log_path():
+        # Stages run as subprocesses; a shared run id groups their records
+        os.environ.setdefault(profiling.RUN_ENV, uuid.uuid4().hex[:12])
+    if force:
+        # A forced run recomputes everything, including the per-season stats cached inside step 02
+        shutil.rmtree(team_season_cache, ignore_errors=True)
+    manifest = load_manifest()
+    for name in stage_names:
+        stage = STAGES[name]
+        if not force and is_up_to_date(name, stage, manifest):
+            print(f"--- Skipping {name}: inputs unchanged ---")
+            continue
+        run_stage(name, stage, manifest)
+    save_manifest(manifest)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=DEFAULT_STAGES,
+                        help='Stages to run, in order (default: %(default)s)')
+    parser.add_argument('--force', action='store_true', help='Re-run stages even if their inputs are unchanged, without the team/season cache')
+    parser.add_argument('--profile', nargs='?', const='1', metavar='PATH',
+                        help='Record per-step timings and memory as JSON lines (default: data/cache/profile.jsonl)')
+    parser.add_argument('--cprofile', metavar='STEP', help='With --profile, also dump a cProfile of this step')
+    parser.add_argument('--max-memory', type=float, metavar='MB',
+                        help='Run steps 01 and 02 out of core within this memory ceiling (see out_of_core.py)')
+    args = parser.parse_args()
+    if args.profile:
+        os.environ[profiling.PROFILE_ENV] = args.profile
+        if args.cprofile:
+            os.environ[profiling.CPROFILE_ENV] = args.cprofile
+    if args.max_memory:
+        # Same outputs either way, so the setting is not part of the stage hashes
+        os.environ[MEMORY_ENV] = f'{args.max_memory:g}'
+    run(args.stages, force=args.force)
+
+
+if __name__ == '__main__':
+    main()
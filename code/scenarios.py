@@ -0,0 +1,188 @@
+"""
+Batch evaluation of transfer-impact scenarios.
+
+A scenario is one transfer impact per team. Many scenarios are evaluated at
+once: the prediction features are stacked into a single array with one block
+of rows per scenario, each model predicts the whole batch in one call, and the
+results are ranked into league tables with array operations.
+
+Usage:
+    python code/scenarios.py --grid -10 10 1 --output sweep.csv
+    python code/scenarios.py --sample 5000 --scale 2 --base "data/transfer score.csv"
+    python code/scenarios.py --scenarios my_scenarios.csv
+(a scenarios CSV has one row per scenario and one column per team; an optional
+'scenario' column names the rows)
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from model_store import load_or_train
+from prediction_model import (
+    TARGETS, apply_transfer_impacts, load_features, predict_raw, prediction_data, read_transfer_scores,
+)
+
+# Scenarios predicted per model call; bounds the size of the stacked feature array
+BATCH_SCENARIOS = 5_000
+
+
+def impact_vector(teams, transfer_impacts):
+    """
+    Converts a team -> impact mapping to a vector in `teams` order (missing teams get 0).
+    """
+    return np.array([float(transfer_impacts.get(team, 0)) for team in teams])
+
+
+def read_scenarios(path, teams):
+    """
+    Reads a wide scenarios CSV into (scenario names, impacts matrix of shape (n_scenarios, n_teams)).
+    """
+    scenarios = pd.read_csv(path)
+    names = scenarios.pop('scenario').astype(str).to_numpy() if 'scenario' in scenarios else np.arange(len(scenarios))
+    unknown = set(scenarios.columns) - set(teams)
+    if unknown:
+        raise ValueError(f"Unknown teams in {path}: {sorted(unknown)}")
+    impacts = scenarios.reindex(columns=list(teams)).fillna(0).to_numpy(dtype=float)
+    return names, impacts
+
+
+def grid_scenarios(teams, values, base=None):
+    """
+    One scenario per (team, value): that team's impact is set to `value`, every other team keeps `base`.
+    """
+    teams = list(teams)
+    values = np.asarray(values, dtype=float)
+    base = np.zeros(len(teams)) if base is None else np.asarray(base, dtype=float)
+    impacts = np.tile(base, (len(teams) * len(values), 1))
+    rows = np.arange(len(impacts))
+    impacts[rows, np.repeat(np.arange(len(teams)), len(values))] = np.tile(values, len(teams))
+    names = [f'{team} {value:+g}' for team in teams for value in values]
+    return np.array(names), impacts
+
+
+def sample_scenarios(base, n_scenarios, scale=2.0, seed=42, low=-10, high=10):
+    """
+    Normal perturbations of `base` impacts, clipped to the rating range.
+    """
+    rng = np.random.default_rng(seed)
+    base = np.asarray(base, dtype=float)
+    impacts = np.clip(base + rng.normal(0, scale, size=(n_scenarios, len(base))), low, high)
+    return np.arange(n_scenarios), impacts
+
+
+def evaluate_scenarios(artifact, prediction_df, impacts, batch_scenarios=BATCH_SCENARIOS):
+    """
+    Predicts every scenario in `impacts` (n_scenarios x n_teams, in prediction_df row order).
+    Returns unrounded predictions keyed by target name, each of shape (n_scenarios, n_teams).
+    """
+    features = artifact['features']
+    impacts = np.atleast_2d(np.asarray(impacts, dtype=float))
+    n_scenarios, n_teams = impacts.shape
+    if n_teams != len(prediction_df):
+        raise ValueError(f"Expected {len(prediction_df)} impacts per scenario, got {n_teams}")
+
+    base_X = apply_transfer_impacts(prediction_df, {}, artifact['impact_factor'])[features].to_numpy(dtype=float)
+    adjusted_column = features.index('adjusted_prev_points')
+    prev_points = prediction_df['prev_season_points'].to_numpy(dtype=float)
+
+    predictions = {name: np.empty((n_scenarios, n_teams)) for name in TARGETS}
+    for start in range(0, n_scenarios, batch_scenarios):
+        batch = impacts[start:start + batch_scenarios]
+        X = np.tile(base_X, (len(batch), 1))
+        X[:, adjusted_column] = (prev_points[None, :] + batch * artifact['impact_factor']).ravel()
+        batch_predictions = predict_raw(artifact['models'], pd.DataFrame(X, columns=features), features)
+        for name, predicted in batch_predictions.items():
+            predictions[name][start:start + len(batch)] = predicted.reshape(len(batch), n_teams)
+    return predictions
+
+
+def table_order(predictions):
+    """
+    Team indices of each scenario's table, top first, ranked like the single predicted table:
+    by rounded points, then rounded goal difference, ties keeping the team order.
+    """
+    points = predictions['points'].round(0)
+    goal_difference = predictions['goals_scored'].round(0) - predictions['goals_conceded'].round(0)
+    team_order = np.broadcast_to(np.arange(points.shape[1]), points.shape)
+    return np.lexsort((team_order, -goal_difference, -points), axis=-1)
+
+
+def table_positions(predictions):
+    """
+    Each team's position (1 = top) in every scenario, shape (n_scenarios, n_teams) in team order.
+    """
+    order = table_order(predictions)
+    positions = np.empty_like(order)
+    np.put_along_axis(positions, order, np.arange(1, order.shape[1] + 1)[None, :], axis=1)
+    return positions
+
+
+def scenario_tables(names, teams, predictions):
+    """
+    Long table with one row per scenario and team, in table order (see table_order).
+    """
+    points = predictions['points'].round(0)
+    goals_for = predictions['goals_scored'].round(0)
+    goals_against = predictions['goals_conceded'].round(0)
+    goal_difference = goals_for - goals_against
+    n_scenarios, n_teams = points.shape
+    order = table_order(predictions)
+
+    def ranked(values):
+        return np.take_along_axis(values, order, axis=1).ravel()
+
+    return pd.DataFrame({
+        'Scenario': np.repeat(np.asarray(names), n_teams),
+        'Position': np.tile(np.arange(1, n_teams + 1), n_scenarios),
+        'Team': np.asarray(teams)[order].ravel(),
+        'Predicted Points': ranked(points),
+        'Predicted GF': ranked(goals_for),
+        'Predicted GA': ranked(goals_against),
+        'Predicted GD': ranked(goal_difference),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--scenarios', help='Wide CSV of scenarios (one column per team)')
+    source.add_argument('--grid', type=float, nargs=3, metavar=('LOW', 'HIGH', 'STEP'),
+                        help='Sweep each team over LOW..HIGH (inclusive) while the others keep the base impacts')
+    source.add_argument('--sample', type=int, metavar='N', help='Sample N scenarios around the base impacts')
+    parser.add_argument('--base', help="Transfer scores CSV used as the base impacts (default: 0 for every team)")
+    parser.add_argument('--scale', type=float, default=2.0, help='Standard deviation for --sample')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--compact', action='store_true', help='Use the flat-array forests (see compact_forest.py)')
+    parser.add_argument('--output', help='CSV path for the per-scenario tables (default: print a summary)')
+    args = parser.parse_args()
+
+    df = load_features()
+    artifact = load_or_train(df, compact=args.compact)
+    prediction_df = prediction_data(df)
+    teams = prediction_df['Team'].tolist()
+    base = impact_vector(teams, read_transfer_scores(os.path.abspath(args.base)) if args.base else {})
+
+    if args.scenarios:
+        names, impacts = read_scenarios(os.path.abspath(args.scenarios), teams)
+    elif args.grid:
+        low, high, step = args.grid
+        names, impacts = grid_scenarios(teams, np.arange(low, high + step / 2, step), base)
+    else:
+        names, impacts = sample_scenarios(base, args.sample, args.scale, args.seed)
+
+    predictions = evaluate_scenarios(artifact, prediction_df, impacts)
+    tables = scenario_tables(names, teams, predictions)
+
+    if args.output:
+        tables.to_csv(os.path.abspath(args.output), index=False)
+        print(f"{len(impacts)} scenario tables saved to `{os.path.abspath(args.output)}`")
+    else:
+        summary = tables.groupby('Team')[['Position', 'Predicted Points']].agg(['mean', 'min', 'max'])
+        print(f"Across {len(impacts)} scenarios:")
+        print(summary.sort_values(('Predicted Points', 'mean'), ascending=False).round(1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""
+Monte Carlo season simulator.
+
+Turns each team's predicted goals scored/conceded into Poisson scoring rates
+for every fixture of a double round-robin, plays the season many times with
+batched NumPy draws and aggregates the distribution of final positions.
+
+Usage:
+    python code/season_simulator.py predicted_table.csv --simulations 100000 --workers 4
+(the table needs 'Team', 'Predicted GF' and 'Predicted GA' columns)
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Ratio applied to home scoring rates (and divided out of away rates); 1.0 means no home advantage
+HOME_ADVANTAGE = 1.1
+BATCH_SIZE = 10_000
+TOP_4 = 4
+RELEGATION_PLACES = 3
+MAX_GOALS = 10  # Scorelines considered when computing expected points
+
+
+def double_round_robin(n_teams):
+    """
+    Home and away team indices for every fixture where each team hosts every other team once.
+    """
+    home, away = np.nonzero(~np.eye(n_teams, dtype=bool))
+    return home, away
+
+
+def fixture_rates(goals_for, goals_against, home_advantage=HOME_ADVANTAGE):
+    """
+    Expected home/away goals for every fixture. A team's attack is its predicted
+    goals per game relative to the league average, and likewise for defence.
+    """
+    goals_for = np.asarray(goals_for, dtype=float)
+    goals_against = np.asarray(goals_against, dtype=float)
+    n_games = 2 * (len(goals_for) - 1)
+    attack = goals_for / n_games
+    defence = goals_against / n_games
+    league_rate = attack.mean()
+
+    home, away = double_round_robin(len(goals_for))
+    home_rate = attack[home] * defence[away] / league_rate * home_advantage
+    away_rate = attack[away] * defence[home] / league_rate / home_advantage
+    return home, away, home_rate, away_rate
+
+
+def expected_points(home_rate, away_rate, max_goals=MAX_GOALS):
+    """
+    Expected home and away points of each fixture when both sides score Poisson goals.
+    """
+    goals = np.arange(max_goals + 1)
+    log_factorial = np.cumsum(np.log(np.maximum(goals, 1)))
+    home_pmf = np.exp(goals * np.log(home_rate[:, None]) - home_rate[:, None] - log_factorial)
+    away_pmf = np.exp(goals * np.log(away_rate[:, None]) - away_rate[:, None] - log_factorial)
+    outcome = home_pmf[:, :, None] * away_pmf[:, None, :]  # (fixture, home goals, away goals)
+    home_win = np.tril(outcome, -1).sum(axis=(1, 2))
+    away_win = np.triu(outcome, 1).sum(axis=(1, 2))
+    draw = np.trace(outcome, axis1=1, axis2=2)
+    return 3 * home_win + draw, 3 * away_win + draw
+
+
+def simulate_positions(home, away, home_rate, away_rate, n_teams, n_simulations, rng, batch_size=BATCH_SIZE,
+                       standings=None):
+    """
+    Plays `n_simulations` seasons and returns an (n_teams, n_teams) array counting
+    how often each team finished in each position (0 = champions), plus total points.
+    `standings` is an optional (points, goals for, goals against) tuple of arrays
+    the simulated fixtures are added to, for seasons already under way.
+    """
+    position_counts = np.zeros((n_teams, n_teams), dtype=np.int64)
+    points_total = np.zeros(n_teams)
+    start_points, start_for, start_against = (np.zeros(n_teams),) * 3 if standings is None else standings
+
+    # Fixture -> team incidence matrices, so season totals are a single matrix product per batch
+    home_incidence = np.zeros((len(home), n_teams))
+    home_incidence[np.arange(len(home)), home] = 1
+    away_incidence = np.zeros((len(away), n_teams))
+    away_incidence[np.arange(len(away)), away] = 1
+
+    for start in range(0, n_simulations, batch_size):
+        batch = min(batch_size, n_simulations - start)
+        home_goals = rng.poisson(home_rate, size=(batch, len(home)))
+        away_goals = rng.poisson(away_rate, size=(batch, len(away)))
+
+        home_points = np.where(home_goals > away_goals, 3, np.where(home_goals == away_goals, 1, 0))
+        away_points = np.where(away_goals > home_goals, 3, np.where(home_goals == away_goals, 1, 0))
+        points = home_points @ home_incidence + away_points @ away_incidence + start_points
+        goals_for = home_goals @ home_incidence + away_goals @ away_incidence + start_for
+        goals_against = away_goals @ home_incidence + home_goals @ away_incidence + start_against
+
+        # Rank on points, then goal difference, then goals scored, then a random draw
+        sort_key = (points * 1e6 + (goals_for - goals_against + 500) * 1e3 + goals_for
+                    + rng.random((batch, n_teams)))
+        order = np.argsort(-sort_key, axis=1)
+        positions = np.empty_like(order)
+        np.put_along_axis(positions, order, np.arange(n_teams)[None, :], axis=1)
+
+        position_counts += np.bincount(
+            (np.arange(n_teams)[None, :] * n_teams + positions).ravel(), minlength=n_teams * n_teams
+        ).reshape(n_teams, n_teams)
+        points_total += points.sum(axis=0)
+
+    return position_counts, points_total
+
+
+def _simulate_worker(args):
+    home, away, home_rate, away_rate, n_teams, n_simulations, seed_sequence, standings = args
+    return simulate_positions(home, away, home_rate, away_rate, n_teams, n_simulations,
+                              np.random.default_rng(seed_sequence), standings=standings)
+
+
+def simulate_season(teams, goals_for, goals_against, n_simulations=100_000, seed=42, workers=1,
+                    home_advantage=HOME_ADVANTAGE, remaining=None, standings=None):
+    """
+    Simulates the season and returns one row per team with expected points,
+    title/top-4/relegation probabilities and the probability of each finishing position.
+
+    With `workers` > 1 the simulations are split across a process pool; each worker gets
+    its own child seed of `seed`, so results are reproducible for a given seed and worker count.
+
+    For a season under way, `remaining` is an (n_teams, n_teams) boolean home x away
+    mask of the fixtures still to play and `standings` the (points, goals for, goals
+    against) already banked; `goals_for`/`goals_against` remain full-season rates.
+    """
+    teams = list(teams)
+    n_teams = len(teams)
+    home, away, home_rate, away_rate = fixture_rates(goals_for, goals_against, home_advantage)
+    if remaining is not None:
+        to_play = np.asarray(remaining, dtype=bool)[home, away]
+        home, away, home_rate, away_rate = home[to_play], away[to_play], home_rate[to_play], away_rate[to_play]
+    if standings is not None:
+        standings = tuple(np.asarray(values, dtype=float) for values in standings)
+
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    shares = [n_simulations // workers + (i < n_simulations % workers) for i in range(workers)]
+    jobs = [(home, away, home_rate, away_rate, n_teams, share, s, standings) for share, s in zip(shares, seeds)]
+    if workers == 1:
+        results = [_simulate_worker(jobs[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simulate_worker, jobs))
+
+    position_counts = sum(counts for counts, _ in results)
+    points_total = sum(points for _, points in results)
+    probabilities = position_counts / n_simulations
+
+    summary = pd.DataFrame({
+        'Team': teams,
+        'Expected Points': points_total / n_simulations,
+        'Title %': probabilities[:, 0] * 100,
+        'Top 4 %': probabilities[:, :TOP_4].sum(axis=1) * 100,
+        'Relegation %': probabilities[:, n_teams - RELEGATION_PLACES:].sum(axis=1) * 100,
+    })
+    position_columns = pd.DataFrame(probabilities * 100, columns=[f'P{p}' for p in range(1, n_teams + 1)])
+    summary = pd.concat([summary, position_columns], axis=1)
+    return summary.sort_values('Expected Points', ascending=False).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('table', help="CSV with 'Team', 'Predicted GF' and 'Predicted GA' columns")
+    parser.add_argument('--simulations', type=int, default=100_000)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--home-advantage', type=float, default=HOME_ADVANTAGE)
+    parser.add_argument('--output', help='Optional CSV path for the full position distribution')
+    args = parser.parse_args()
+
+    table = pd.read_csv(args.table)
+    summary = simulate_season(table['Team'], table['Predicted GF'], table['Predicted GA'],
+                              n_simulations=args.simulations, seed=args.seed, workers=args.workers,
+                              home_advantage=args.home_advantage)
+    print(summary[['Team', 'Expected Points', 'Title %', 'Top 4 %', 'Relegation %']].round(1).to_string())
+    if args.output:
+        summary.to_csv(os.path.abspath(args.output), index=False)
+
+
+if __name__ == '__main__':
+    main()
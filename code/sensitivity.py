@@ -0,0 +1,203 @@
+"""
+Sensitivity of the predicted table to the transfer-impact ratings, and
+permutation feature importances of the trained models.
+
+Sensitivity curves: every team is swept over a range of transfer impacts
+(-10..+10 by default) while the other teams keep the base impacts. All the
+sweeps and the base scenario are evaluated in one batched pass (see
+scenarios.py), giving each team's predicted points, goal difference and
+position at every impact value, and the change from the base table. The
+forests are piecewise constant, so a curve is a staircase: flat stretches are
+impact ranges that change nothing.
+
+Permutation importances: for each model, each feature column of the training
+rows is shuffled `--repeats` times and the increase in mean absolute error
+over the unshuffled prediction is recorded. All the shuffled copies for a
+model are stacked into one array and predicted in a single call; models run
+in parallel on a process pool. The rows are the ones the models were trained
+on, so this measures how much each model relies on a feature rather than how
+well it generalises (see backtest.py for that).
+
+Usage:
+    python code/sensitivity.py
+    python code/sensitivity.py --range -10 10 0.5 --base "data/transfer score.csv" --output curves.csv
+    python code/sensitivity.py --compact --repeats 20 --importances-output importances.csv
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from model_store import load_or_train
+from prediction_model import TARGETS, load_features, predict_raw, prediction_data, read_transfer_scores, training_data
+from profiling import step
+from scenarios import evaluate_scenarios, grid_scenarios, impact_vector, table_positions
+
+N_REPEATS = 10
+
+# Filled in before the worker pool starts and inherited by forked workers
+_shared = {}
+
+
+def sensitivity_curves(artifact, prediction_df, values, base):
+    """
+    One row per team and impact value: the team's predicted points, goal difference and position with
+    its impact set to that value (every other team keeping `base`), and the change from the base table.
+    """
+    teams = prediction_df['Team'].to_numpy()
+    values = np.asarray(values, dtype=float)
+    _, sweeps = grid_scenarios(teams, values, base)
+    # The base scenario goes first, so everything is predicted in one batch
+    predictions = evaluate_scenarios(artifact, prediction_df, np.vstack([base, sweeps]))
+    positions = table_positions(predictions)
+    goal_difference = predictions['goals_scored'] - predictions['goals_conceded']
+
+    swept = np.repeat(np.arange(len(teams)), len(values))
+    rows = np.arange(1, len(sweeps) + 1)
+    points = predictions['points'][rows, swept]
+    position = positions[rows, swept]
+    return pd.DataFrame({
+        'Team': teams[swept],
+        'Transfer Impact': np.tile(values, len(teams)),
+        'Predicted Points': points.round(2),
+        'Points Change': (points - predictions['points'][0, swept]).round(2),
+        'Predicted GD': goal_difference[rows, swept].round(2),
+        'Position': position,
+        'Base Position': positions[0, swept],
+        'Places Gained': positions[0, swept] - position,
+    })
+
+
+def curve_summary(curves):
+    """
+    Per team: base position, points at the ends of the range, average points per unit of impact
+    (least-squares slope) and the best and worst position reached, sorted by base position.
+    """
+    by_team = curves.groupby('Team', sort=False)
+    impact = curves['Transfer Impact'] - by_team['Transfer Impact'].transform('mean')
+    points = curves['Predicted Points'] - by_team['Predicted Points'].transform('mean')
+    slope = (impact * points).groupby(curves['Team'], sort=False).sum() / (impact ** 2).groupby(curves['Team'], sort=False).sum()
+
+    ends = by_team.agg(low=('Transfer Impact', 'idxmin'), high=('Transfer Impact', 'idxmax'))
+    summary = pd.DataFrame({
+        'Base Position': by_team['Base Position'].first(),
+        f"Points at {curves['Transfer Impact'].min():+g}": curves.loc[ends['low'], 'Predicted Points'].to_numpy(),
+        f"Points at {curves['Transfer Impact'].max():+g}": curves.loc[ends['high'], 'Predicted Points'].to_numpy(),
+        'Points per Impact': slope.round(2),
+        'Best Position': by_team['Position'].min(),
+        'Worst Position': by_team['Position'].max(),
+    })
+    summary.index.name = 'Team'
+    return summary.sort_values('Base Position')
+
+
+def permutation_job(job):
+    """
+    Mean absolute error of one model with each feature shuffled, `n_repeats` times per feature.
+    Runs in a worker process; returns (target name, feature, per-repeat MAE) rows.
+    """
+    name, features, n_repeats, seed = job
+    X, actual = _shared['X'], _shared['actual']
+    rng = np.random.default_rng(seed)
+    n_rows = len(X)
+
+    # One block of rows per (feature, repeat), with that feature's column shuffled
+    stacked = np.tile(X, (len(features) * n_repeats, 1))
+    for i in range(len(features)):
+        for repeat in range(n_repeats):
+            block = slice((i * n_repeats + repeat) * n_rows, (i * n_repeats + repeat + 1) * n_rows)
+            stacked[block, i] = rng.permutation(X[:, i])
+
+    predictions = predict_raw({name: _shared['models'][name]}, pd.DataFrame(stacked, columns=features), features)
+    results = []
+    for target_name, predicted in predictions.items():
+        errors = np.abs(predicted.reshape(len(features), n_repeats, n_rows) - actual[target_name]).mean(axis=2)
+        results += [(target_name, feature, errors[i]) for i, feature in enumerate(features)]
+    return results
+
+
+def permutation_importances(models, train_data, features, n_repeats=N_REPEATS, seed=42, workers=None):
+    """
+    Increase in training MAE per target and feature when the feature is shuffled (mean and std over repeats).
+    """
+    _shared['models'] = models
+    _shared['X'] = train_data[features].to_numpy(dtype=float)
+    _shared['actual'] = {name: train_data[target].to_numpy(dtype=float) for name, target in TARGETS.items()}
+    base_predictions = predict_raw(models, train_data, features)
+    base_errors = {name: np.abs(predicted - _shared['actual'][name]).mean() for name, predicted in base_predictions.items()}
+
+    jobs = [(name, list(features), n_repeats, seed + i) for i, name in enumerate(models)]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers == 1:
+        results = list(map(permutation_job, jobs))
+    else:
+        context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+        if context.get_start_method() != 'fork':
+            raise RuntimeError("Parallel permutation importances need the 'fork' start method; use --workers 1")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            results = list(pool.map(permutation_job, jobs))
+
+    importances = pd.DataFrame([
+        {'Target': target_name, 'Feature': feature, 'Base MAE': base_errors[target_name],
+         'MAE Increase': (errors - base_errors[target_name]).mean(),
+         'MAE Increase Std': (errors - base_errors[target_name]).std()}
+        for model_results in results for target_name, feature, errors in model_results
+    ])
+    return importances.sort_values(['Target', 'MAE Increase'], ascending=[True, False]).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--range', type=float, nargs=3, default=[-10, 10, 1], metavar=('LOW', 'HIGH', 'STEP'),
+                        help='Transfer impacts each team is swept over (inclusive; default: -10 10 1)')
+    parser.add_argument('--base', help="Transfer scores CSV used as the base impacts (default: 0 for every team)")
+    parser.add_argument('--compact', action='store_true', help='Use the flat-array forests (see compact_forest.py)')
+    parser.add_argument('--repeats', type=int, default=N_REPEATS, help='Shuffles per feature for the importances')
+    parser.add_argument('--no-importances', action='store_true', help='Only compute the sensitivity curves')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='CSV path for the full sensitivity curves')
+    parser.add_argument('--importances-output', help='CSV path for the permutation importances')
+    args = parser.parse_args()
+
+    df = load_features()
+    artifact = load_or_train(df, compact=args.compact)
+    prediction_df = prediction_data(df)
+    teams = prediction_df['Team'].tolist()
+    base = impact_vector(teams, read_transfer_scores(os.path.abspath(args.base)) if args.base else {})
+
+    start = time.perf_counter()
+    low, high, impact_step = args.range
+    values = np.arange(low, high + impact_step / 2, impact_step)
+    with step('sensitivity curves', rows=len(teams) * len(values)):
+        curves = sensitivity_curves(artifact, prediction_df, values, base)
+    summary = curve_summary(curves)
+    print(f"Sensitivity to transfer impact ({len(teams)} teams x {len(values)} values, "
+          f"{time.perf_counter() - start:.2f}s):")
+    print(summary.to_string())
+    if args.output:
+        curves.to_csv(os.path.abspath(args.output), index=False)
+        print(f"Sensitivity curves saved to `{os.path.abspath(args.output)}`")
+
+    if args.no_importances:
+        return
+    start = time.perf_counter()
+    train_data = training_data(df)
+    with step('permutation importances', rows=len(train_data)):
+        importances = permutation_importances(artifact['models'], train_data, artifact['features'],
+                                              args.repeats, args.seed, args.workers)
+    print(f"\nPermutation importances (increase in training MAE, {args.repeats} shuffles per feature, "
+          f"{time.perf_counter() - start:.2f}s):")
+    table = importances.pivot(index='Feature', columns='Target', values='MAE Increase')
+    print(table.sort_values('points', ascending=False).round(3).to_string())
+    if args.importances_output:
+        importances.to_csv(os.path.abspath(args.importances_output), index=False)
+        print(f"Permutation importances saved to `{os.path.abspath(args.importances_output)}`")
+
+
+if __name__ == '__main__':
+    main()
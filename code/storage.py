@@ -0,0 +1,170 @@
+"""
+Storage backend for the intermediate datasets in data/.
+
+CSV is the default and matches what the scripts have always written. Set
+EPL_STORAGE_FORMAT=parquet (or feather) to store the intermediate tables in
+a typed columnar format instead; this needs pyarrow. Reads fall back to the
+CSV file when no columnar copy exists yet, so the committed CSVs keep working.
+
+EPL_DATA_DIR points the pipeline at another data directory (raw season
+folders, xG files and intermediate tables), e.g. synthetic data for scaling
+tests; the default is data/.
+"""
+import os
+
+import pandas as pd
+
+from profiling import step
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_dir = os.path.dirname(script_dir)
+data_dir = os.environ.get('EPL_DATA_DIR') or os.path.join(project_dir, 'data')
+
+FORMATS = {'csv': '.csv', 'parquet': '.parquet', 'feather': '.feather'}
+
+# Raw match columns (football-data.co.uk); anything numeric not listed here is an odds-derived probability
+MATCH_CATEGORY_COLUMNS = ['Div', 'Time', 'HomeTeam', 'AwayTeam', 'FTR', 'HTR', 'Referee', 'League', 'Season']
+MATCH_INT_COLUMNS = [
+    'FTHG', 'FTAG', 'HTHG', 'HTAG', 'HS', 'AS', 'HST', 'AST',
+    'HF', 'AF', 'HC', 'AC', 'HY', 'AY', 'HR', 'AR'
+]
+
+MATCH_SCHEMA = {
+    'datetime': ['Date'],
+    'category': MATCH_CATEGORY_COLUMNS,
+    'int8': MATCH_INT_COLUMNS,
+    'default_float': 'float32',
+}
+
+FEATURE_SCHEMA = {
+    'category': ['Team', 'Season', 'League', 'prev_season_league'],
+    'int16': [
+        'Games Played', 'Wins', 'Draws', 'Losses', 'Goals Scored', 'Goals Conceded',
+        'Points', 'Goal Difference', 'Form Points Last 10', 'Home Points', 'Away Points'
+    ],
+    'int8': ['promoted_from_championship'],
+    'default_float': 'float64',
+}
+
+RATING_SCHEMA = {
+    'datetime': ['Date'],
+    'category': ['Season', 'League', 'HomeTeam', 'AwayTeam', 'FTR'],
+    'int8': ['FTHG', 'FTAG'],
+    'default_float': 'float64',
+}
+
+PREDICTION_SCHEMA = {
+    'category': ['Team'],
+    'int8': ['Position'],
+    'default_float': 'float64',
+}
+
+# Keyed by table name; tables in subfolders (e.g. leagues/<group>/final_features) use their base name
+SCHEMAS = {
+    'combined_data': MATCH_SCHEMA,
+    'match_ratings': RATING_SCHEMA,
+    'final_features_complete': FEATURE_SCHEMA,
+    'final_features_with_form': FEATURE_SCHEMA,
+    'final_features_with_xg': FEATURE_SCHEMA,
+    'final_features': FEATURE_SCHEMA,
+    'predicted_table': PREDICTION_SCHEMA,
+}
+
+
+def storage_format():
+    fmt = os.environ.get('EPL_STORAGE_FORMAT', 'csv').lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown EPL_STORAGE_FORMAT '{fmt}', expected one of {sorted(FORMATS)}")
+    return fmt
+
+
+def table_path(name, fmt=None):
+    return os.path.join(data_dir, name + FORMATS[fmt or storage_format()])
+
+
+def apply_schema(df, schema):
+    """
+    Casts a DataFrame to the compact dtypes in `schema`. Integer columns with
+    missing values use the nullable integer type of the same width.
+    """
+    df = df.copy()
+    for column in schema.get('datetime', []):
+        if column in df and not pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = pd.to_datetime(df[column], dayfirst=True, format='mixed')
+    for column in schema.get('category', []):
+        if column in df:
+            # Labels are stored as text, the same way they come back from CSV (e.g. a filled-in 0)
+            if df[column].dtype == object:
+                df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+            df[column] = df[column].astype('category')
+    for dtype in ('int8', 'int16'):
+        for column in schema.get(dtype, []):
+            if column in df:
+                df[column] = df[column].astype(dtype.capitalize() if df[column].isna().any() else dtype)
+    default_float = schema.get('default_float')
+    if default_float:
+        for column in df.columns:
+            if pd.api.types.is_float_dtype(df[column]):
+                df[column] = df[column].astype(default_float)
+    # Leftover text columns (e.g. stray header columns) become categories too
+    for column in df.columns:
+        if df[column].dtype == object:
+            df[column] = df[column].astype('category')
+    return df
+
+
+def write_table(df, name):
+    """
+    Writes `df` as data/<name> in the configured format and returns the path.
+    """
+    fmt = storage_format()
+    path = table_path(name, fmt)
+    with step(f'write {name}', rows=len(df)):
+        if fmt == 'csv':
+            df.to_csv(path, index=False)
+        else:
+            typed = apply_schema(df, SCHEMAS.get(os.path.basename(name), {}))
+            if fmt == 'parquet':
+                typed.to_parquet(path, index=False)
+            else:
+                typed.reset_index(drop=True).to_feather(path)
+    return path
+
+
+def read_table(name, columns=None):
+    """
+    Reads data/<name> in the configured format, falling back to CSV.
+    Only `columns` are loaded when given.
+    """
+    fmt = storage_format()
+    path = table_path(name, fmt)
+    with step(f'read {name}') as timed:
+        if fmt == 'csv' or not os.path.exists(path):
+            df = pd.read_csv(table_path(name, 'csv'), usecols=columns)
+        elif fmt == 'parquet':
+            df = pd.read_parquet(path, columns=columns)
+        else:
+            df = pd.read_feather(path, columns=columns)
+        timed.rows = len(df)
+    return df
+
+
+def iter_table_chunks(name, chunksize, columns=None, **read_options):
+    """
+    Reads the CSV copy of data/<name> in chunks of at most `chunksize` rows (see out_of_core.py).
+    """
+    yield from pd.read_csv(table_path(name, 'csv'), usecols=columns, chunksize=chunksize, **read_options)
+
+
+def write_table_chunks(chunks, name):
+    """
+    Writes an iterable of DataFrames with the same columns as one CSV table data/<name>,
+    holding one chunk at a time. Returns the path and the number of rows written.
+    """
+    path = table_path(name, 'csv')
+    rows = 0
+    with open(path, 'w', newline='') as f:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(f, index=False, header=i == 0)
+            rows += len(chunk)
+    return path, rows
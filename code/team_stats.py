@@ -0,0 +1,183 @@
+import hashlib
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+# Columns produced for every team/season, in the order 02_feature_engineering.py saves them
+TEAM_SEASON_COLUMNS = [
+    'Team', 'Season', 'League', 'Games Played', 'Wins', 'Draws', 'Losses',
+    'Goals Scored', 'Goals Conceded', 'Points', 'Goal Difference', 'Form Points Last 10'
+]
+
+FORM_WINDOW = 10
+
+DATE_FORMATS = ['%d/%m/%y', '%d/%m/%Y', '%Y-%m-%d']
+
+# Match columns the team/season stats depend on; only these are hashed for the per-season cache
+MATCH_COLUMNS = ['Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'FTR', 'League']
+
+# Hash of this module, part of every per-season cache key, so cached stats are recomputed when the code changes
+with open(__file__, 'rb') as _f:
+    CODE_HASH = hashlib.sha256(_f.read()).hexdigest()
+
+
+def parse_match_dates(dates):
+    """
+    Parses football-data.co.uk dates, which use either two or four digit years,
+    or ISO dates as written by 01_data_preprocessing.py.
+    Dates that are already parsed (e.g. from columnar storage) are returned as they are.
+    """
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates
+    for date_format in DATE_FORMATS[:-1]:
+        try:
+            return pd.to_datetime(dates, format=date_format)
+        except ValueError:
+            pass
+    return pd.to_datetime(dates, format=DATE_FORMATS[-1])
+
+
+def season_labels(dates):
+    """
+    Maps match dates to 'YYYY/YYYY' season labels. Seasons start in August.
+    """
+    dates = pd.DatetimeIndex(dates)
+    start_year = np.where(dates.month < 8, dates.year - 1, dates.year)
+    return pd.Index(start_year.astype(str)) + '/' + pd.Index((start_year + 1).astype(str))
+
+
+def add_season_column(df):
+    """
+    Parses the 'Date' column in place and adds the matching 'Season' column.
+    """
+    df['Date'] = parse_match_dates(df['Date'])
+    df['Season'] = season_labels(df['Date'])
+    return df
+
+
+def build_team_matches(df, teams=None):
+    """
+    Explodes the match table into a long table with one row per team per match,
+    seen from that team's side (home rows first, then away rows).
+
+    Teams are interned to integer ids using the order of `teams`
+    (defaults to the order in which teams first appear as the home side).
+    Matches involving a team that is not in `teams` are dropped for that side.
+    """
+    if teams is None:
+        teams = pd.unique(df['HomeTeam'])
+    team_index = pd.Index(np.asarray(teams, dtype=object))
+    season_ids, seasons = pd.factorize(np.asarray(df['Season'], dtype=object))
+
+    home_ids = team_index.get_indexer(df['HomeTeam'])
+    away_ids = team_index.get_indexer(df['AwayTeam'])
+    ftr = df['FTR'].to_numpy()
+    home_win = ftr == 'H'
+    draw = ftr == 'D'
+    away_win = ftr == 'A'
+
+    def both_sides(home_values, away_values):
+        return np.concatenate([np.asarray(home_values), np.asarray(away_values)])
+
+    team_matches = pd.DataFrame({
+        'team_id': both_sides(home_ids, away_ids),
+        'season_id': both_sides(season_ids, season_ids),
+        'Date': both_sides(df['Date'], df['Date']),
+        'League': both_sides(df['League'], df['League']),
+        'is_home': both_sides(np.ones(len(df), dtype=bool), np.zeros(len(df), dtype=bool)),
+        'match_row': both_sides(np.arange(len(df)), np.arange(len(df))),
+        'Wins': both_sides(home_win, away_win).astype(np.int64),
+        'Draws': both_sides(draw, draw).astype(np.int64),
+        'Losses': both_sides(away_win, home_win).astype(np.int64),
+        'GF': both_sides(df['FTHG'], df['FTAG']),
+        'GA': both_sides(df['FTAG'], df['FTHG']),
+    })
+    team_matches['Points'] = team_matches['Wins'] * 3 + team_matches['Draws']
+    team_matches['Team'] = pd.Categorical.from_codes(team_matches['team_id'], categories=team_index)
+    team_matches['Season'] = pd.Categorical.from_codes(team_matches['season_id'], categories=seasons)
+    team_matches = team_matches[team_matches['team_id'] >= 0]
+
+    # Sort each team-season's matches by date; the original row breaks ties so the order is deterministic
+    order = np.lexsort((
+        team_matches['match_row'].to_numpy(),
+        team_matches['Date'].to_numpy(),
+        team_matches['team_id'].to_numpy(),
+        team_matches['season_id'].to_numpy(),
+    ))
+    return team_matches.iloc[order].reset_index(drop=True)
+
+
+def aggregate_team_seasons(df, form_window=FORM_WINDOW, cache_dir=None):
+    """
+    Calculates the core stats and last-N form for every team/season in one pass.
+
+    Rows are ordered season by season (in order of first appearance) and,
+    within a season, by the order in which teams first appear as the home side.
+
+    If `cache_dir` is given, each season's stats are cached there keyed by a hash
+    of that season's matches (and of this module), and only seasons whose matches
+    changed are recomputed.
+    """
+    if cache_dir is None:
+        return aggregate_team_matches(build_team_matches(df), form_window=form_window)
+
+    teams = pd.Index(np.asarray(pd.unique(df['HomeTeam']), dtype=object))
+    os.makedirs(cache_dir, exist_ok=True)
+    season_stats = []
+    for season, season_df in df.groupby('Season', sort=False):
+        key = season_hash(season_df, teams, form_window)
+        cache_path = os.path.join(cache_dir, season.replace('/', '-') + '.pkl')
+        cached = None
+        if os.path.exists(cache_path):
+            with open(cache_path, 'rb') as f:
+                cached = pickle.load(f)
+        if cached is not None and cached['hash'] == key:
+            stats = cached['stats']
+        else:
+            stats = aggregate_team_matches(build_team_matches(season_df, teams=teams), form_window=form_window)
+            with open(cache_path, 'wb') as f:
+                pickle.dump({'hash': key, 'stats': stats}, f)
+        season_stats.append(stats)
+
+    return pd.concat(season_stats, ignore_index=True)
+
+
+def season_hash(season_df, teams, form_window=FORM_WINDOW):
+    """
+    Content hash of one season's matches, plus which of its teams are tracked and in what order,
+    the form window and the code that computes the stats.
+    """
+    digest = hashlib.sha256(CODE_HASH.encode())
+    digest.update(pd.util.hash_pandas_object(season_df[MATCH_COLUMNS], index=False).to_numpy().tobytes())
+    season_teams = np.union1d(season_df['HomeTeam'].unique(), season_df['AwayTeam'].unique())
+    digest.update('\n'.join(teams[teams.isin(season_teams)]).encode())
+    digest.update(str(form_window).encode())
+    return digest.hexdigest()
+
+
+def aggregate_team_matches(team_matches, form_window=FORM_WINDOW):
+    """
+    Folds a long team-match table from build_team_matches() into team/season stats.
+    """
+    keys = ['season_id', 'team_id']
+    grouped = team_matches.groupby(keys, sort=True)
+
+    stats = grouped[['Wins', 'Draws', 'Losses', 'GF', 'GA', 'Points']].sum()
+    stats['Games Played'] = grouped.size()
+    stats['League'] = grouped['League'].first()
+
+    # Matches are date-sorted within each group, so the last N rows are the most recent form
+    from_end = grouped.cumcount(ascending=False)
+    recent = team_matches[from_end.to_numpy() < form_window]
+    stats['Form Points Last 10'] = recent.groupby(keys, sort=True)['Points'].sum()
+
+    stats = stats.reset_index()
+    teams = team_matches['Team'].cat.categories
+    seasons = team_matches['Season'].cat.categories
+    stats['Team'] = teams[stats['team_id'].to_numpy()]
+    stats['Season'] = seasons[stats['season_id'].to_numpy()]
+    stats = stats.rename(columns={'GF': 'Goals Scored', 'GA': 'Goals Conceded'})
+    stats['Goal Difference'] = stats['Goals Scored'] - stats['Goals Conceded']
+    return stats[TEAM_SEASON_COLUMNS]
@@ -0,0 +1,115 @@
+"""
+Team/season xG feature store.
+
+xG and xGA come from CSV files with one row per team and season (more metric
+columns can be added to a file). Team names are canonicalized to the
+football-data.co.uk spelling used by the match data, and rows are held in a
+hash index on (Team, Season), so joining them onto the feature table is an
+indexed lookup rather than a merge.
+
+Sources are listed in priority order: a team/season found in more than one
+file takes its values from the first.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from storage import data_dir
+
+XG_SOURCES = [
+    os.path.join(data_dir, 'xg_team_seasons.csv'),
+    os.path.join(data_dir, 'xg_data.csv'),
+]
+
+KEY_COLUMNS = ['Team', 'Season']
+
+# Other spellings of team names -> the football-data.co.uk name
+TEAM_ALIASES = {
+    'Man Utd': 'Man United',
+    'Manchester United': 'Man United',
+    'Manchester City': 'Man City',
+    'Tottenham Hotspur': 'Tottenham',
+    'Spurs': 'Tottenham',
+    'Newcastle United': 'Newcastle',
+    'West Ham United': 'West Ham',
+    'Wolverhampton Wanderers': 'Wolves',
+    'Brighton & Hove Albion': 'Brighton',
+    'Brighton and Hove Albion': 'Brighton',
+    'Nottingham Forest': "Nott'm Forest",
+    'Leeds United': 'Leeds',
+    'Leicester City': 'Leicester',
+    'AFC Bournemouth': 'Bournemouth',
+    'Ipswich Town': 'Ipswich',
+    'Luton Town': 'Luton',
+    'Norwich City': 'Norwich',
+    'West Bromwich Albion': 'West Brom',
+    'Sheffield Utd': 'Sheffield United',
+}
+
+# Metric -> lag column holding the team's value from its previous row in the feature table
+LAG_COLUMNS = {
+    'xG': 'prev_season_xG',
+    'xGA': 'prev_season_xGA',
+    'xG_diff': 'prev_season_xG_diff',
+}
+
+
+def canonical_teams(teams):
+    teams = pd.Series(np.asarray(teams, dtype=object))
+    return teams.map(TEAM_ALIASES).fillna(teams)
+
+
+class XGStore:
+
+    def __init__(self, table):
+        self.table = table
+        # Metric values as one float array, converted once for every lookup
+        self.values = table.to_numpy(dtype=float)
+
+    @classmethod
+    def from_files(cls, paths=XG_SOURCES):
+        frames = []
+        for path in paths:
+            if os.path.exists(path):
+                frame = pd.read_csv(path)
+                frame['Team'] = canonical_teams(frame['Team']).to_numpy()
+                frames.append(frame)
+        if not frames:
+            raise FileNotFoundError(f"None of the xG sources exist: {paths}")
+        table = pd.concat(frames, ignore_index=True).drop_duplicates(KEY_COLUMNS, keep='first')
+        table['xG_diff'] = table['xG'] - table['xGA']
+        # Only numeric columns are metrics; text columns in a source (e.g. notes) are left out
+        return cls(table.set_index(KEY_COLUMNS).select_dtypes('number'))
+
+    @property
+    def metrics(self):
+        return list(self.table.columns)
+
+    def covers(self, teams):
+        """
+        Whether the store has rows for any of `teams`.
+        """
+        teams = canonical_teams(pd.unique(np.asarray(teams, dtype=object)))
+        return bool(teams.isin(self.table.index.get_level_values('Team')).any())
+
+    def lookup(self, teams, seasons):
+        """
+        Metrics for each (team, season) pair, NaN where the store has no row.
+        """
+        keys = pd.MultiIndex.from_arrays([canonical_teams(teams), np.asarray(seasons, dtype=object)])
+        positions = self.table.index.get_indexer(keys)
+        values = self.values[positions]
+        values[positions < 0] = np.nan
+        return pd.DataFrame(values, columns=self.metrics)
+
+    def add_features(self, df, lag_columns=LAG_COLUMNS):
+        """
+        Adds every metric (plus 'xG_diff') to a feature table keyed by 'Team' and 'Season',
+        and the lag columns, each from the team's previous row in `df`.
+        """
+        df = df.copy()
+        df[self.metrics] = self.lookup(df['Team'], df['Season']).to_numpy()
+        lags = df.groupby('Team', sort=False, observed=True)[list(lag_columns)].shift(1)
+        df[list(lag_columns.values())] = lags.to_numpy()
+        return df